@@ -0,0 +1,83 @@
+"""
+Beat similarity grouping benchmark.
+
+Compares the former pairwise Python loop with audio_analyzer.group_similar_beats on synthetic beat features.
+
+    python -m benchmarks.beat_grouping
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.backend.clip_builder.data_analysis.audio_analyzer import group_similar_beats
+
+
+def group_similar_beats_pairwise(features: np.ndarray, similarity_threshold: float) -> np.ndarray:
+    # step 8 of analyze_music_for_editing before vectorization
+    n_beats = len(features)
+    group_ids = [-1] * n_beats
+    current_group = 0
+
+    for i in range(n_beats):
+        if group_ids[i] != -1:
+            continue
+        group_ids[i] = current_group
+        vi = features[i]
+        for j in range(i + 1, n_beats):
+            vj = features[j]
+            sim = float(np.dot(vi, vj) / (np.linalg.norm(vi) * np.linalg.norm(vj) + 1e-8))
+            if sim >= similarity_threshold:
+                group_ids[j] = current_group
+        current_group += 1
+
+    return np.array(group_ids)
+
+
+def synthetic_beat_features(n_beats: int, n_features: int = 7, n_patterns: int = 16, seed: int = 0) -> np.ndarray:
+    # repeating patterns + noise, close to z-scored onset/energy/MFCC features of a real track
+    rng = np.random.default_rng(seed)
+    patterns = rng.normal(size=(n_patterns, n_features))
+    features = patterns[rng.integers(0, n_patterns, size=n_beats)] + 0.5 * rng.normal(size=(n_beats, n_features))
+    return (features - features.mean(axis=0)) / (features.std(axis=0) + 1e-8)
+
+
+def measure(func, *args) -> tuple[float, np.ndarray]:
+    started_at = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - started_at, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Beat similarity grouping benchmark")
+    parser.add_argument("--bpm", type=float, default=128)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument(
+        "--max-pairwise-minutes", type=float, default=20, help="Skip slow pairwise run for longer tracks"
+    )
+    args = parser.parse_args()
+
+    print(f"{'minutes':>8} {'beats':>7} {'pairwise, s':>12} {'blockwise, s':>13} {'speedup':>8} {'same groups':>12}")
+
+    for minutes in [1, 5, 10, 20, 60, 120]:
+        n_beats = int(minutes * args.bpm)
+        features = synthetic_beat_features(n_beats)
+
+        blockwise_time, blockwise_groups = measure(group_similar_beats, features, args.threshold)
+
+        if minutes > args.max_pairwise_minutes:
+            print(f"{minutes:>8} {n_beats:>7} {'-':>12} {blockwise_time:>13.4f} {'-':>8} {'-':>12}")
+            continue
+
+        pairwise_time, pairwise_groups = measure(group_similar_beats_pairwise, features, args.threshold)
+        same = bool(np.array_equal(pairwise_groups, blockwise_groups))
+
+        print(
+            f"{minutes:>8} {n_beats:>7} {pairwise_time:>12.4f} {blockwise_time:>13.4f} "
+            f"{pairwise_time / blockwise_time:>7.1f}x {str(same):>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Timeline serialization benchmark.
+
+Compares the former YAML storage (pure Python yaml.dump / yaml.safe_load) with the libyaml YAML import/export
+and the json primary storage of TimelineConfig on synthetic timelines. Times include to_dict/from_dict.
+
+    python -m benchmarks.timeline_serialization
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+
+import yaml
+
+from src.backend.clip_builder.effects_descriptor import EffectArgs, EffectMethod, EffectType
+from src.backend.clip_builder.timeline_config import (
+    AudioSegment,
+    TimelineConfig,
+    TimelineSegmentConfig,
+    VideoItem,
+    VideoSegmentEffect,
+    YamlDumper,
+    YamlLoader,
+)
+
+
+def synthetic_effects(rng: random.Random) -> list[VideoSegmentEffect]:
+    effects = [
+        VideoSegmentEffect(
+            id=str(uuid.uuid4()),
+            effect_type=EffectType.ZOOM,
+            method=EffectMethod.ZOOM_BUMP,
+            args=EffectArgs.ZOOM.ZOOM_BUMP(zoom_factor=1.2, bump_count=rng.randint(1, 4), reverse=rng.random() > 0.5),
+        ),
+        VideoSegmentEffect(
+            id=str(uuid.uuid4()),
+            effect_type=EffectType.FLASH,
+            method=EffectMethod.BURST_FLASH,
+            args=EffectArgs.FLASH.BURST_FLASH(flashes_count=rng.randint(1, 6), color=(255, 255, 255)),
+        ),
+        VideoSegmentEffect(
+            id=str(uuid.uuid4()),
+            effect_type=EffectType.CROP,
+            method=EffectMethod.LINE_CROP,
+            args=EffectArgs.CROP.LINE_CROP(line_number=rng.randint(1, 3), total_lines=3),
+        ),
+    ]
+
+    return effects[: rng.randint(0, len(effects))]
+
+
+def synthetic_timeline(n_segments: int, fps: int = 25, seed: int = 0) -> TimelineConfig:
+    # beat length segments with a couple of effects each, close to generated timelines of long tracks
+    rng = random.Random(seed)
+    segments = []
+    audio_segments = []
+    start_time = 0.0
+    start_frame = 0
+
+    for i in range(n_segments):
+        duration_frame = rng.randint(10, 40)
+        duration = duration_frame / fps
+        is_split_screen = rng.random() > 0.8
+
+        segments.append(
+            TimelineSegmentConfig(
+                id=str(uuid.uuid4()),
+                index=i,
+                effects=synthetic_effects(rng),
+                duration=duration,
+                videos=[
+                    VideoItem(
+                        id=str(uuid.uuid4()),
+                        path=f"./output/projects/benchmark/source/{uuid.uuid4()}.mp4",
+                        start_time=round(rng.uniform(0, 120), 3),
+                    )
+                    for _ in range(2 if is_split_screen else 1)
+                ],
+                is_split_screen=is_split_screen,
+                start_time=start_time,
+                end_time=start_time + duration,
+                etag=str(uuid.uuid4()),
+                start_frame=start_frame,
+                end_frame=start_frame + duration_frame,
+                duration_frame=duration_frame,
+            )
+        )
+
+        audio_segments.append(
+            AudioSegment(
+                index=i,
+                duration=duration,
+                start_time=start_time,
+                end_time=start_time + duration,
+                energy=rng.random(),
+                intensity_band=rng.choice(["low", "medium", "high"]),
+                energy_delta=rng.uniform(-1, 1),
+                trend=rng.choice(["rising", "falling", "flat"]),
+                similar_group=rng.randint(0, 16),
+                reverse_candidate=rng.random() > 0.9,
+            )
+        )
+
+        start_time += duration
+        start_frame += duration_frame
+
+    return TimelineConfig(
+        effects=[],
+        segments=segments,
+        duration=start_time,
+        fps=fps,
+        size=(1280, 720),
+        audio_segments=audio_segments,
+    )
+
+
+def save_pure_yaml(timeline: TimelineConfig, path: str):
+    # TimelineConfig.save before json storage
+    with open(path, "w") as f:
+        f.write(yaml.dump(timeline.to_dict(), sort_keys=False, indent=2))
+
+
+def load_pure_yaml(path: str) -> TimelineConfig:
+    with open(path, "r") as f:
+        return TimelineConfig.from_dict(value=yaml.safe_load(f))
+
+
+def measure(func, *args, repeat: int = 1) -> float:
+    best = None
+
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Timeline serialization benchmark")
+    parser.add_argument("--repeat", type=int, default=1, help="Best of N runs")
+    args = parser.parse_args()
+
+    formats = [
+        ("yaml (pure)", ".yaml", save_pure_yaml, load_pure_yaml),
+        ("yaml (libyaml)", ".yaml", TimelineConfig.save_yaml, TimelineConfig.load_yaml),
+        ("json (orjson)", ".json", TimelineConfig.save, TimelineConfig.load),
+    ]
+
+    print(f"libyaml available: {YamlLoader is not yaml.SafeLoader and YamlDumper is not yaml.SafeDumper}")
+    print(f"{'segments':>9} {'format':>15} {'save, s':>9} {'load, s':>9} {'size, KB':>9} {'same':>5}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_segments in [100, 1000, 10000]:
+            timeline = synthetic_timeline(n_segments)
+            expected = timeline.to_dict()
+
+            for name, suffix, save, load in formats:
+                path = os.path.join(tmp_dir, f"timeline-{n_segments}{suffix}")
+
+                save_time = measure(save, timeline, path, repeat=args.repeat)
+                load_time = measure(load, path, repeat=args.repeat)
+                same = load(path).to_dict() == expected
+
+                print(
+                    f"{n_segments:>9} {name:>15} {save_time:>9.4f} {load_time:>9.4f} "
+                    f"{os.path.getsize(path) / 1024:>9.1f} {str(same):>5}"
+                )
+
+
+if __name__ == "__main__":
+    main()
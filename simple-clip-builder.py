@@ -37,6 +37,41 @@ def get_args():
         "--debug", "-d", action="store_true", required=False, help="Show segments info on video for adjusting clip"
     )
 
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=1,
+        required=False,
+        help="Number of worker processes used to render timeline segments in parallel",
+    )
+
+    parser.add_argument(
+        "--backend",
+        "-b",
+        type=str,
+        choices=["moviepy", "ffmpeg"],
+        default="moviepy",
+        required=False,
+        help="Segment render backend. ffmpeg compiles segments into filter graphs and falls back to moviepy",
+    )
+
+    parser.add_argument(
+        "--streaming",
+        "-s",
+        action="store_true",
+        required=False,
+        help="Render in a single encoder pass without intermediate segment files",
+    )
+
+    parser.add_argument(
+        "--reuse-frame-buffers",
+        "-rb",
+        action="store_true",
+        required=False,
+        help="Effects write frames into preallocated buffers instead of allocating new frames",
+    )
+
     return parser.parse_args()
 
 
@@ -70,6 +105,10 @@ async def main():
         fps=int(args.fps),
         debug=args.debug,
         timeline_config_path=get_first_path(args, file_ext=["yaml", "yml"]),
+        workers=args.workers,
+        backend=args.backend,
+        streaming=args.streaming,
+        reuse_frame_buffers=args.reuse_frame_buffers,
     )
 
 
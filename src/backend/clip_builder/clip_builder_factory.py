@@ -8,11 +8,16 @@ async def build_from_cli(
     fps: int = 25,
     debug: bool = False,
     timeline_config_path: str | None = None,
+    workers: int = 1,
+    backend: str = "moviepy",
+    streaming: bool = False,
+    reuse_frame_buffers: bool = False,
 ):
     project = VideoProject(resolution=video_resolution, fps=fps, source_files_dir_path=input_dir)
 
-    clip_builder = project.get_clip_builder()
+    clip_builder = project.get_clip_builder(workers=workers, backend=backend)
     clip_builder.set_debug(debug)
+    clip_builder.reuse_frame_buffers = reuse_frame_buffers
 
     # Use config as separate object to be able to load it from external file
     timeline_config = (
@@ -23,6 +28,10 @@ async def build_from_cli(
 
     timeline_config.save(project.setup.timeline_path)
 
+    if streaming:
+        await project.build_clip_with_audio_streaming(clip_builder, timeline_config)
+        return
+
     clip_path = await clip_builder.build_clip(timeline_config)
 
     project.save_clip_with_audio(clip_path=clip_path)
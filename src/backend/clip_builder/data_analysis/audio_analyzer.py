@@ -1,6 +1,10 @@
+import json
+import subprocess
+from typing import Iterator
+
 import numpy as np
 import librosa
-from numpy.linalg import norm
+import soundfile
 
 
 class IntensityBand:
@@ -148,6 +152,228 @@ class AudioAnalyzeResult:
         )
 
 
+class AudioFeatures:
+    """Frame level features of a track, frame i is centered at i * hop_length samples"""
+
+    def __init__(
+        self, sample_rate: int, duration: float, onset_env: np.ndarray, rms: np.ndarray, mfcc: np.ndarray
+    ):
+        self.sample_rate = sample_rate
+        self.duration = duration
+        self.onset_env = onset_env
+        self.rms = rms
+        self.mfcc = mfcc
+
+
+# tracks longer than this are analyzed in streaming mode unless the mode is set explicitly
+STREAMING_MIN_DURATION = 10 * 60
+
+
+def extract_audio_features(audio_path: str, hop_length: int, n_mfcc: int) -> AudioFeatures:
+    """Decodes the whole track into memory"""
+    y, sr = librosa.load(audio_path, sr=None)
+
+    return AudioFeatures(
+        sample_rate=sr,
+        duration=librosa.get_duration(y=y, sr=sr),
+        onset_env=librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop_length),
+        rms=librosa.feature.rms(y=y, hop_length=hop_length)[0],
+        mfcc=librosa.feature.mfcc(y=y, sr=sr, hop_length=hop_length, n_mfcc=n_mfcc),
+    )
+
+
+def read_soundfile_info(audio_path: str):
+    """soundfile info of the track, None for formats libsndfile can not read (m4a, aac, ...)"""
+    try:
+        return soundfile.info(audio_path)
+    except RuntimeError:
+        return None
+
+
+def probe_audio(audio_path: str) -> tuple[int, float]:
+    """Sample rate and duration of the first audio stream, read by ffprobe"""
+    output = subprocess.run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-select_streams",
+            "a:0",
+            "-show_entries",
+            "stream=sample_rate:format=duration",
+            "-of",
+            "json",
+            audio_path,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+    value = json.loads(output)
+    return int(value["streams"][0]["sample_rate"]), float(value["format"]["duration"])
+
+
+def get_audio_duration(audio_path: str) -> float:
+    info = read_soundfile_info(audio_path)
+    return info.duration if info is not None else probe_audio(audio_path)[1]
+
+
+class FfmpegAudioStream:
+    """
+    Mono blocks of a track decoded by ffmpeg, for formats librosa.stream can not read. Blocks are laid out
+    as in librosa.stream: block_length frames each, consecutive blocks overlap by frame_length - hop_length
+    samples and the last block is padded with zeros.
+    """
+
+    def __init__(self, audio_path: str, sample_rate: int, block_length: int, frame_length: int, hop_length: int):
+        self.audio_path = audio_path
+        self.sample_rate = sample_rate
+        self.block_length = block_length
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        # decoded samples, the length of the track once the stream is exhausted
+        self.n_samples = 0
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        block_size = (self.block_length - 1) * self.hop_length + self.frame_length
+        step = self.block_length * self.hop_length
+
+        args = [
+            "ffmpeg",
+            "-v",
+            "error",
+            "-i",
+            self.audio_path,
+            "-vn",
+            "-ac",
+            "1",
+            "-ar",
+            str(self.sample_rate),
+            "-f",
+            "f32le",
+            "-",
+        ]
+        process = subprocess.Popen(args, stdout=subprocess.PIPE)
+
+        # overlap carried over from the previous block
+        carried = np.zeros(0, dtype=np.float32)
+
+        try:
+            while True:
+                data = process.stdout.read((block_size - len(carried)) * 4)
+                samples = np.frombuffer(data, dtype="<f4")
+
+                # the carried overlap alone holds no frame which was not yielded yet
+                if len(samples) == 0:
+                    break
+
+                self.n_samples += len(samples)
+                block = np.concatenate([carried, samples])
+
+                if len(block) < block_size:
+                    yield np.pad(block, (0, block_size - len(block)))
+                    break
+
+                yield block
+                carried = block[step:]
+        finally:
+            process.stdout.close()
+            return_code = process.wait()
+
+        if return_code != 0:
+            raise subprocess.CalledProcessError(return_code, args)
+
+
+def fit_frames(values: np.ndarray, n_frames: int, mode: str = "constant") -> np.ndarray:
+    """Trims or pads the frame axis (last) to n_frames, the final frames can be missing after the last block"""
+    if values.shape[-1] >= n_frames:
+        return values[..., :n_frames]
+
+    pad_width = [(0, 0)] * (values.ndim - 1) + [(0, n_frames - values.shape[-1])]
+    return np.pad(values, pad_width, mode=mode)
+
+
+def extract_audio_features_streaming(
+    audio_path: str, hop_length: int, n_mfcc: int, n_fft: int = 2048, block_length: int = 1024
+) -> AudioFeatures:
+    """
+    Decodes the track block by block, peak memory is bounded by a few blocks of block_length frames.
+
+    Blocks overlap so that non-centered STFT frames are contiguous across blocks, soundfile formats are read by
+    librosa.stream and the others are decoded through an ffmpeg pipe. Onset strength carries the last mel column
+    of the previous block, so the frame difference is not lost on block borders. Features are shifted by
+    n_fft // (2 * hop_length) frames to match centered frames of the in-memory analysis. RMS is computed from the
+    samples, the first frames over zero padding as in the in-memory analysis, so it matches that one. Log mel is
+    not clipped to 80 dB below the track maximum, as the maximum is unknown until the end, so onset and mfcc
+    values on near silent parts can differ slightly.
+    """
+    info = read_soundfile_info(audio_path)
+
+    if info is not None:
+        sr = info.samplerate
+        stream = librosa.stream(
+            audio_path,
+            block_length=block_length,
+            frame_length=n_fft,
+            hop_length=hop_length,
+            mono=True,
+            fill_value=0,
+        )
+    else:
+        sr, _ = probe_audio(audio_path)
+        stream = FfmpegAudioStream(
+            audio_path, sample_rate=sr, block_length=block_length, frame_length=n_fft, hop_length=hop_length
+        )
+
+    mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft)
+    center_frames = n_fft // (2 * hop_length)
+
+    onset_blocks = []
+    rms_blocks = []
+    mfcc_blocks = []
+    previous_mel_db = None
+
+    for y_block in stream:
+        S = np.abs(librosa.stft(y_block, n_fft=n_fft, hop_length=hop_length, center=False))
+        mel_db = librosa.power_to_db(mel_basis @ S**2, top_db=None)
+
+        if previous_mel_db is not None:
+            mel_db_with_previous = np.concatenate([previous_mel_db, mel_db], axis=1)
+        else:
+            mel_db_with_previous = mel_db
+
+        if len(rms_blocks) == 0:
+            # centered frames before the first full window
+            y_head = np.concatenate([np.zeros(n_fft // 2, dtype=y_block.dtype), y_block])
+            rms_head = librosa.feature.rms(y=y_head, frame_length=n_fft, hop_length=hop_length, center=False)[0]
+            rms_blocks.append(rms_head[:center_frames])
+
+        onset_blocks.append(np.maximum(0, np.diff(mel_db_with_previous, axis=1)).mean(axis=0))
+        rms_blocks.append(librosa.feature.rms(y=y_block, frame_length=n_fft, hop_length=hop_length, center=False)[0])
+        mfcc_blocks.append(librosa.feature.mfcc(S=mel_db, n_mfcc=n_mfcc))
+        previous_mel_db = mel_db[:, -1:]
+
+    if len(mfcc_blocks) == 0:
+        raise Exception(f"No audio decoded from {audio_path}")
+
+    n_samples = info.frames if info is not None else stream.n_samples
+    n_frames = 1 + n_samples // hop_length
+
+    # same alignment as librosa.onset.onset_strength with center=True: lag + centering frames of zeros
+    onset_env = np.pad(np.concatenate(onset_blocks), (1 + center_frames, 0))
+    rms = np.concatenate(rms_blocks)
+    mfcc = np.pad(np.concatenate(mfcc_blocks, axis=1), ((0, 0), (center_frames, 0)), mode="edge")
+
+    return AudioFeatures(
+        sample_rate=sr,
+        duration=n_samples / sr,
+        onset_env=fit_frames(onset_env, n_frames),
+        rms=fit_frames(rms, n_frames),
+        mfcc=fit_frames(mfcc, n_frames, mode="edge"),
+    )
+
+
 def subdivide_beats(beat_times: np.ndarray, subdivision: int = 2) -> np.ndarray:
     """Create sub-beat grid between beats (for double-time, etc.)."""
     if len(beat_times) < 2:
@@ -164,21 +390,71 @@ def subdivide_beats(beat_times: np.ndarray, subdivision: int = 2) -> np.ndarray:
     return np.array(grid)
 
 
+def group_similar_beats(features: np.ndarray, similarity_threshold: float, max_block_items: int = 2**22) -> np.ndarray:
+    """
+    Groups beats by cosine similarity of their feature vectors.
+
+    Beats are visited in order, a beat without group opens a new one and pulls every later beat with
+    similarity >= threshold into it (a later group can take a beat over). Similarity rows are computed
+    as matrix blocks, so only the leader loop stays in Python and memory is bounded by max_block_items.
+    """
+    n_beats = len(features)
+    group_ids = np.full(n_beats, -1, dtype=np.int64)
+
+    if n_beats == 0:
+        return group_ids
+
+    norms = np.linalg.norm(features, axis=1)
+    block_size = max(1, min(n_beats, max_block_items // n_beats))
+
+    block_start = 0
+    block: np.ndarray | None = None
+    current_group = 0
+
+    for i in range(n_beats):
+        if group_ids[i] != -1:
+            continue
+
+        if block is None or i >= block_start + block_size:
+            block_start = i
+            rows = slice(i, i + block_size)
+            block = (features[rows] @ features.T) / (np.outer(norms[rows], norms) + 1e-8)
+
+        group_ids[i] = current_group
+        similar = block[i - block_start, i + 1 :] >= similarity_threshold
+        group_ids[i + 1 :][similar] = current_group
+        current_group += 1
+
+    return group_ids
+
+
 def analyze_music_for_editing(
-    audio_path: str, hop_length: int = 512, n_mfcc: int = 5, similarity_threshold: float = 0.8
+    audio_path: str,
+    hop_length: int = 512,
+    n_mfcc: int = 5,
+    similarity_threshold: float = 0.8,
+    streaming: bool | None = None,
 ) -> AudioAnalyzeResult:
-    # 1. Load
-    y, sr = librosa.load(audio_path, sr=None)
-    duration = librosa.get_duration(y=y, sr=sr)
+    # 1. Load. Long tracks are decoded block by block, when streaming is not set explicitly
+    if streaming is None:
+        streaming = get_audio_duration(audio_path) > STREAMING_MIN_DURATION
+
+    if streaming:
+        features = extract_audio_features_streaming(audio_path, hop_length=hop_length, n_mfcc=n_mfcc)
+    else:
+        features = extract_audio_features(audio_path, hop_length=hop_length, n_mfcc=n_mfcc)
+
+    sr = features.sample_rate
+    duration = features.duration
 
     # 2. Beat / rhythm grid
-    onset_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop_length)
+    onset_env = features.onset_env
     tempo, beat_frames = librosa.beat.beat_track(onset_envelope=onset_env, sr=sr, hop_length=hop_length)
     beat_times = librosa.frames_to_time(beat_frames, sr=sr, hop_length=hop_length)
 
     # 3. Energy + simple timbre features per frame
-    rms = librosa.feature.rms(y=y, hop_length=hop_length)[0]
-    mfcc = librosa.feature.mfcc(y=y, sr=sr, hop_length=hop_length, n_mfcc=n_mfcc)
+    rms = features.rms
+    mfcc = features.mfcc
 
     frame_times = librosa.frames_to_time(np.arange(len(onset_env)), sr=sr, hop_length=hop_length)
 
@@ -243,20 +519,7 @@ def analyze_music_for_editing(
 
     # 8. Very simple grouping for duplication (similar beats)
     n_beats = len(beat_times)
-    group_ids = [-1] * n_beats
-    current_group = 0
-
-    for i in range(n_beats):
-        if group_ids[i] != -1:
-            continue
-        group_ids[i] = current_group
-        vi = feat_norm[i]
-        for j in range(i + 1, n_beats):
-            vj = feat_norm[j]
-            sim = float(np.dot(vi, vj) / (norm(vi) * norm(vj) + 1e-8))
-            if sim >= similarity_threshold:
-                group_ids[j] = current_group
-        current_group += 1
+    group_ids = group_similar_beats(feat_norm, similarity_threshold)
 
     # 9. Reverse candidates: strong up-down or down-up changes
     reverse_candidates = []
@@ -0,0 +1,258 @@
+import logging
+import subprocess
+from dataclasses import dataclass
+from typing import Iterator, Literal
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# grab: sequential decode, skipped frames are only grabbed without conversion into an image
+# seek: jump to every sampled frame, pays off when samples are far apart compared to keyframe interval
+# ffmpeg: ffmpeg selects and scales sampled frames, python receives only small frames
+# auto: seek for samples at least SEEK_MIN_STEP_SECONDS apart, grab otherwise
+FrameSamplingMode = Literal["auto", "grab", "seek", "ffmpeg"]
+
+SEEK_MIN_STEP_SECONDS = 2.0
+
+# first step back when a seek lands after the requested frame, doubled until it lands before
+SEEK_BACKOFF_FRAMES = 16
+
+
+@dataclass
+class FrameSamplingStats:
+    mode: str
+    frames_grabbed: int = 0  # passed by decoder without conversion into an image
+    frames_decoded: int = 0  # decoded into an image
+    frames_analyzed: int = 0
+    seeks: int = 0
+
+    def to_json(self):
+        return {
+            "mode": self.mode,
+            "frames_grabbed": self.frames_grabbed,
+            "frames_decoded": self.frames_decoded,
+            "frames_analyzed": self.frames_analyzed,
+            "seeks": self.seeks,
+        }
+
+    def add(self, other: "FrameSamplingStats"):
+        self.frames_grabbed += other.frames_grabbed
+        self.frames_decoded += other.frames_decoded
+        self.frames_analyzed += other.frames_analyzed
+        self.seeks += other.seeks
+
+
+class FrameSampler:
+    """
+    Yields every frame_step-th frame of a video as (frame index, BGR image) scaled by scale.
+
+    Sampling step is set either in frames or in seconds with time_step.
+    """
+
+    def __init__(
+        self,
+        video_path: str,
+        frame_step: int | None = None,
+        time_step: float | None = None,
+        scale: float = 1.0,
+        mode: FrameSamplingMode = "auto",
+        default_fps: float = 25.0,
+    ):
+        self.video_path = video_path
+        self.scale = scale
+
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open video: {video_path}")
+
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or default_fps
+        self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+
+        self.frame_step = max(1, frame_step if frame_step is not None else int(self.fps * time_step))
+
+        if mode == "auto":
+            mode = "seek" if self.frame_step >= SEEK_MIN_STEP_SECONDS * self.fps else "grab"
+
+        self.mode = mode
+        self.stats = FrameSamplingStats(mode=mode)
+
+        # number of source frames the sampler went through, exact after sequential decode
+        self.end_frame = self.frame_count
+
+    def get_scaled_size(self) -> tuple[int, int]:
+        # same rounding as cv2.resize with fx/fy
+        return max(1, round(self.width * self.scale)), max(1, round(self.height * self.scale))
+
+    def frames(self, start_frame: int = 0, end_frame: int | None = None) -> Iterator[tuple[int, np.ndarray]]:
+        """Sampled frames with start_frame <= index < end_frame, indexes are multiples of frame_step"""
+        if self.mode == "ffmpeg":
+            yield from self.ffmpeg_frames(start_frame, end_frame)
+        elif self.mode == "seek":
+            yield from self.seek_frames(start_frame, end_frame)
+        else:
+            yield from self.grab_frames(start_frame, end_frame)
+
+    def resize(self, frame: np.ndarray) -> np.ndarray:
+        if self.scale == 1.0:
+            return frame
+        return cv2.resize(frame, (0, 0), fx=self.scale, fy=self.scale)
+
+    def get_first_sampled_frame(self, start_frame: int) -> int:
+        return -(-start_frame // self.frame_step) * self.frame_step
+
+    def seek(self, cap: cv2.VideoCapture, frame_idx: int) -> bool:
+        """
+        Grabs frame frame_idx, the next retrieve returns it. CAP_PROP_POS_FRAMES seeks land a few frames off
+        for some codecs and containers, so the index of the grabbed frame is read back from its timestamp.
+        The capture grabs forward when it landed early and seeks further back when it landed late.
+        """
+        backoff = 0
+
+        while True:
+            target = max(0, frame_idx - backoff)
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            self.stats.seeks += 1
+
+            if not cap.grab():
+                return False
+
+            position = self.get_grabbed_frame(cap)
+            if position <= frame_idx or target == 0:
+                break
+
+            backoff = max(SEEK_BACKOFF_FRAMES, backoff * 2)
+
+        while position < frame_idx:
+            if not cap.grab():
+                return False
+
+            self.stats.frames_grabbed += 1
+            position += 1
+
+        return True
+
+    def get_grabbed_frame(self, cap: cv2.VideoCapture) -> int:
+        """Index of the last grabbed frame by its timestamp, by the frame counter when it has none"""
+        position_msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+
+        if position_msec > 0:
+            return round(position_msec * self.fps / 1000)
+
+        return max(0, int(cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1)
+
+    def grab_frames(self, start_frame: int, end_frame: int | None) -> Iterator[tuple[int, np.ndarray]]:
+        cap = cv2.VideoCapture(self.video_path)
+        frame_idx = start_frame
+
+        try:
+            while end_frame is None or frame_idx < end_frame:
+                needs_seek = frame_idx == start_frame and start_frame > 0
+                grabbed = self.seek(cap, frame_idx) if needs_seek else cap.grab()
+                if not grabbed:
+                    break
+
+                if frame_idx % self.frame_step == 0:
+                    ret, frame = cap.retrieve()
+                    if not ret:
+                        break
+
+                    self.stats.frames_decoded += 1
+                    self.stats.frames_analyzed += 1
+                    yield frame_idx, self.resize(frame)
+                else:
+                    self.stats.frames_grabbed += 1
+
+                frame_idx += 1
+        finally:
+            cap.release()
+
+        self.end_frame = frame_idx
+
+    def seek_frames(self, start_frame: int, end_frame: int | None) -> Iterator[tuple[int, np.ndarray]]:
+        cap = cv2.VideoCapture(self.video_path)
+        last_frame = self.frame_count if end_frame is None else min(end_frame, self.frame_count)
+
+        try:
+            for frame_idx in range(self.get_first_sampled_frame(start_frame), last_frame, self.frame_step):
+                if not self.seek(cap, frame_idx):
+                    break
+
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+
+                self.stats.frames_decoded += 1
+                self.stats.frames_analyzed += 1
+                yield frame_idx, self.resize(frame)
+        finally:
+            cap.release()
+
+    def ffmpeg_frames(self, start_frame: int, end_frame: int | None) -> Iterator[tuple[int, np.ndarray]]:
+        width, height = self.get_scaled_size()
+        first_frame = self.get_first_sampled_frame(start_frame)
+
+        filters = [
+            f"select='not(mod(n\\,{self.frame_step}))'",
+            f"scale={width}:{height}:flags=bilinear",
+        ]
+
+        # input seeking decodes from the preceding keyframe and drops frames before start, so it stays frame exact
+        seek_args = ["-ss", str(first_frame / self.fps)] if first_frame > 0 else []
+        limit_args = []
+        if end_frame is not None:
+            limit_args = ["-frames:v", str(max(0, -(-(end_frame - first_frame) // self.frame_step)))]
+
+        if first_frame > 0:
+            self.stats.seeks += 1
+
+        process = subprocess.Popen(
+            [
+                "ffmpeg",
+                "-v",
+                "error",
+                *seek_args,
+                "-i",
+                self.video_path,
+                "-an",
+                "-vf",
+                ",".join(filters),
+                "-fps_mode",
+                "vfr",
+                *limit_args,
+                "-f",
+                "rawvideo",
+                "-pix_fmt",
+                "bgr24",
+                "-",
+            ],
+            stdout=subprocess.PIPE,
+        )
+
+        frame_size = width * height * 3
+        frame_idx = first_frame
+
+        try:
+            while True:
+                data = process.stdout.read(frame_size)
+                if len(data) < frame_size:
+                    break
+
+                self.stats.frames_decoded += 1
+                self.stats.frames_analyzed += 1
+                yield frame_idx, np.frombuffer(data, dtype=np.uint8).reshape((height, width, 3))
+                frame_idx += self.frame_step
+        finally:
+            process.stdout.close()
+            process.kill()
+            process.wait()
+
+    def log_stats(self):
+        logger.info(
+            f"Sampled {self.video_path} in {self.stats.mode} mode: {self.stats.frames_analyzed} frames analyzed, "
+            f"{self.stats.frames_decoded} decoded, {self.stats.frames_grabbed} grabbed, {self.stats.seeks} seeks"
+        )
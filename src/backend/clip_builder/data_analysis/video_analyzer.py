@@ -1,12 +1,23 @@
+import logging
+import math
+from concurrent.futures import ProcessPoolExecutor
+
 import cv2
 import numpy as np
 from dataclasses import dataclass
 from typing import List, Literal, Self
 from skimage.metrics import structural_similarity as ssim
 
+from .frame_sampler import FrameSampler, FrameSamplingMode, FrameSamplingStats
+
+logger = logging.getLogger(__name__)
+
 
 IntensityLevel = Literal["low", "medium", "high"]
 
+# static: analyze_on_static_scenes, content: analyze_video_scenes
+SceneDetection = Literal["static", "content"]
+
 
 @dataclass
 class SceneInfo:
@@ -48,6 +59,31 @@ class SceneInfo:
         )
 
 
+@dataclass
+class SceneAnalysisResult:
+    scenes: List[SceneInfo]
+    sampling: FrameSamplingStats
+
+
+@dataclass
+class SceneMetrics:
+    """Per sampled frame metrics of analyze_video_scenes, metrics of the first frame are 0"""
+
+    times: List[float]
+
+    hist_diffs: List[float]
+    ssim_diffs: List[float]
+    edge_diffs: List[float]
+    flow_mags: List[float]
+
+    motions: List[float]
+    edge_densities: List[float]
+    brightnesses: List[float]
+
+
+# frames are downscaled before analysis for speed
+SCENE_ANALYSIS_SCALE = 0.3
+
 # w_hist, w_ssim, w_edge, w_flow
 # They directly change combined_diff, so they affect where cuts are:
 # Increase w_hist → cuts driven more by color/lighting changes.
@@ -65,7 +101,10 @@ def analyze_video_scenes(
     w_ssim: float = 0.3,
     w_edge: float = 0.2,
     w_flow: float = 0.1,
-) -> List[SceneInfo]:
+    sampling: FrameSamplingMode = "auto",
+    shards: int = 1,  # split long video into time shards analyzed in worker processes
+    min_shard_duration: float = 60,  # sec
+) -> SceneAnalysisResult:
     """
     Detect scenes using a combination of:
       - color histogram diff
@@ -77,11 +116,113 @@ def analyze_video_scenes(
     All exposed parameters influence scene count / placement.
     """
 
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise RuntimeError(f"Cannot open video: {video_path}")
+    sampler = FrameSampler(
+        video_path, frame_step=frame_step, scale=SCENE_ANALYSIS_SCALE, mode=sampling, default_fps=24
+    )
+    shard_ranges = get_shard_ranges(sampler, shards, min_shard_duration)
 
-    fps = cap.get(cv2.CAP_PROP_FPS) or 24
+    if len(shard_ranges) == 1:
+        metrics = collect_scene_metrics(sampler)
+        stats = sampler.stats
+    else:
+        with ProcessPoolExecutor(max_workers=len(shard_ranges)) as executor:
+            shard_results = list(
+                executor.map(
+                    collect_scene_metrics_in_worker,
+                    [video_path] * len(shard_ranges),
+                    [sampler.frame_step] * len(shard_ranges),
+                    [sampler.mode] * len(shard_ranges),
+                    [start for start, _ in shard_ranges],
+                    [end for _, end in shard_ranges],
+                )
+            )
+
+        metrics = merge_shard_metrics([m for m, _ in shard_results])
+        stats = FrameSamplingStats(mode=sampler.mode)
+        for _, shard_stats in shard_results:
+            stats.add(shard_stats)
+
+    logger.info(
+        f"Scene metrics of {video_path} in {len(shard_ranges)} shards: {stats.frames_analyzed} frames analyzed, "
+        f"{stats.frames_decoded} decoded, {stats.frames_grabbed} grabbed, {stats.seeks} seeks"
+    )
+
+    scenes = detect_scenes(
+        metrics,
+        scene_k_sigma=scene_k_sigma,
+        min_scene_duration=min_scene_duration,
+        w_hist=w_hist,
+        w_ssim=w_ssim,
+        w_edge=w_edge,
+        w_flow=w_flow,
+    )
+
+    return SceneAnalysisResult(scenes=scenes, sampling=stats)
+
+
+def get_shard_ranges(
+    sampler: FrameSampler, shards: int, min_shard_duration: float
+) -> list[tuple[int, int | None]]:
+    """
+    Splits sampled frames into (start_frame, end_frame) ranges, starts are multiples of frame_step.
+
+    Shards are never shorter than min_shard_duration, the last one is open ended as frame count from
+    metadata can be inexact.
+    """
+    n_shards = max(1, min(shards, int(sampler.frame_count / sampler.fps / min_shard_duration)))
+    n_samples = math.ceil(sampler.frame_count / sampler.frame_step)
+
+    starts = [round(n_samples * i / n_shards) * sampler.frame_step for i in range(n_shards)]
+    ends = starts[1:] + [None]
+
+    return list(zip(starts, ends))
+
+
+def collect_scene_metrics_in_worker(
+    video_path: str, frame_step: int, sampling: FrameSamplingMode, start_frame: int, end_frame: int | None
+) -> tuple[SceneMetrics, FrameSamplingStats]:
+    """
+    Metrics of one shard. Shards after the first one start one sample earlier, so the first sample of
+    the shard is compared with the same previous frame as in the sequential run.
+    """
+    sampler = FrameSampler(
+        video_path, frame_step=frame_step, scale=SCENE_ANALYSIS_SCALE, mode=sampling, default_fps=24
+    )
+    overlap_start_frame = max(0, start_frame - frame_step)
+
+    metrics = collect_scene_metrics(sampler, overlap_start_frame, end_frame)
+
+    if overlap_start_frame < start_frame and len(metrics.times) > 0:
+        # drop overlap sample, its metrics are computed without previous frame
+        metrics = SceneMetrics(
+            times=metrics.times[1:],
+            hist_diffs=metrics.hist_diffs[1:],
+            ssim_diffs=metrics.ssim_diffs[1:],
+            edge_diffs=metrics.edge_diffs[1:],
+            flow_mags=metrics.flow_mags[1:],
+            motions=metrics.motions[1:],
+            edge_densities=metrics.edge_densities[1:],
+            brightnesses=metrics.brightnesses[1:],
+        )
+
+    return metrics, sampler.stats
+
+
+def merge_shard_metrics(shard_metrics: list[SceneMetrics]) -> SceneMetrics:
+    return SceneMetrics(
+        times=[t for m in shard_metrics for t in m.times],
+        hist_diffs=[v for m in shard_metrics for v in m.hist_diffs],
+        ssim_diffs=[v for m in shard_metrics for v in m.ssim_diffs],
+        edge_diffs=[v for m in shard_metrics for v in m.edge_diffs],
+        flow_mags=[v for m in shard_metrics for v in m.flow_mags],
+        motions=[v for m in shard_metrics for v in m.motions],
+        edge_densities=[v for m in shard_metrics for v in m.edge_densities],
+        brightnesses=[v for m in shard_metrics for v in m.brightnesses],
+    )
+
+
+def collect_scene_metrics(sampler: FrameSampler, start_frame: int = 0, end_frame: int | None = None) -> SceneMetrics:
+    """Runs per-frame metrics over sampled frames from start_frame to end_frame"""
 
     # Per-frame metrics
     times: List[float] = []
@@ -102,24 +243,10 @@ def analyze_video_scenes(
     prev_hist = None
     prev_flow = None
 
-    frame_idx = 0
-
-    scale = 0.3
-
-    while True:
-        ret, frame_normal = cap.read()
-        if not ret:
-            break
-
-        if frame_idx % frame_step != 0:
-            frame_idx += 1
-            continue
-
-        t = frame_idx / fps
+    for frame_idx, frame in sampler.frames(start_frame, end_frame):
+        t = frame_idx / sampler.fps
         times.append(t)
 
-        frame = cv2.resize(frame_normal, (0, 0), fx=scale, fy=scale)
-
         # increase contrast
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         clahe = cv2.createCLAHE(clipLimit=3.5, tileGridSize=(4, 4))
@@ -195,19 +322,40 @@ def analyze_video_scenes(
 
         prev_gray = gray
         prev_frame = frame
-        frame_idx += 1
 
-    cap.release()
+    return SceneMetrics(
+        times=times,
+        hist_diffs=hist_diffs,
+        ssim_diffs=ssim_diffs,
+        edge_diffs=edge_diffs,
+        flow_mags=flow_mags,
+        motions=motions,
+        edge_densities=edge_densities,
+        brightnesses=brightnesses,
+    )
+
+
+def detect_scenes(
+    metrics: SceneMetrics,
+    scene_k_sigma: float,
+    min_scene_duration: float,
+    w_hist: float,
+    w_ssim: float,
+    w_edge: float,
+    w_flow: float,
+) -> List[SceneInfo]:
+    """Normalizes metrics, finds scene cuts by threshold, merges short scenes and rates scene intensity"""
+    times = metrics.times
 
     n = len(times)
     if n == 0:
         return []
 
     # make numpy arrays
-    hist_arr = np.array(hist_diffs)
-    ssim_arr = np.array(ssim_diffs)
-    edge_arr = np.array(edge_diffs)
-    flow_arr = np.array(flow_mags)
+    hist_arr = np.array(metrics.hist_diffs)
+    ssim_arr = np.array(metrics.ssim_diffs)
+    edge_arr = np.array(metrics.edge_diffs)
+    flow_arr = np.array(metrics.flow_mags)
 
     # because first frame has 0.0 for all metrics, lengths should match n
     # but if off by one due to first-frame logic, pad or trim
@@ -228,9 +376,9 @@ def analyze_video_scenes(
     edge_arr = ensure_len(edge_arr, n)
     flow_arr = ensure_len(flow_arr, n)
 
-    motions_arr = ensure_len(np.array(motions), n)
-    edge_density_arr = ensure_len(np.array(edge_densities), n)
-    brightness_arr = ensure_len(np.array(brightnesses), n)
+    motions_arr = ensure_len(np.array(metrics.motions), n)
+    edge_density_arr = ensure_len(np.array(metrics.edge_densities), n)
+    brightness_arr = ensure_len(np.array(metrics.brightnesses), n)
 
     # ----- normalize each diff metric to 0–1 -----
     def norm(x: np.ndarray) -> np.ndarray:
@@ -352,12 +500,25 @@ def analyze_video_scenes(
                 duration=end_t - start_t,
                 intensity_score=float(score_norm),
                 intensity_level=level(score_norm),
+                is_static=False,
+                hist_diff=0.0,
+                diff_norm=0.0,
             )
         )
 
     return scenes
 
 
+@dataclass
+class StaticSceneMetrics:
+    """Per sampled frame metrics of analyze_on_static_scenes, the first sampled frame has none"""
+
+    times: List[float]
+    diff_norms: List[float]
+    hist_diffs: List[float]
+    end_time: float  # end of the analyzed range, the last scene closes there
+
+
 def analyze_on_static_scenes(
     video_path: str,
     time_step: float = 0.3,  # analyze every time_step seconds
@@ -366,57 +527,132 @@ def analyze_on_static_scenes(
     STATIC_THRESHOLD: float = 0.01,  # <2% frame change = static
     MOTION_CUT_THRESHOLD: float = 0.15,  # >15% change = strong change
     HARD_CUT_THRESHOLD: float = 0.2,  # >15% hist diff = hard cut
-) -> List[SceneInfo]:
+    sampling: FrameSamplingMode = "auto",
+    shards: int = 1,  # split long video into time shards analyzed in worker processes
+    min_shard_duration: float = 60,  # sec
+) -> SceneAnalysisResult:
+    """
+    Splits video into static and changing scenes. Frame metrics can be collected in time shards, scenes are
+    then detected over the merged metrics, so the result does not depend on the number of shards.
+    """
+    sampler = FrameSampler(video_path, time_step=time_step, scale=scale, mode=sampling, default_fps=25.0)
+    shard_ranges = get_shard_ranges(sampler, shards, min_shard_duration)
 
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise RuntimeError("Cannot open video")
+    if len(shard_ranges) == 1:
+        metrics = collect_static_scene_metrics(sampler)
+        stats = sampler.stats
+    else:
+        with ProcessPoolExecutor(max_workers=len(shard_ranges)) as executor:
+            shard_results = list(
+                executor.map(
+                    collect_static_scene_metrics_in_worker,
+                    [video_path] * len(shard_ranges),
+                    [sampler.frame_step] * len(shard_ranges),
+                    [scale] * len(shard_ranges),
+                    [sampler.mode] * len(shard_ranges),
+                    [start for start, _ in shard_ranges],
+                    [end for _, end in shard_ranges],
+                )
+            )
 
-    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
-    frame_idx = 0
-    frame_step = int(fps * time_step)
+        shard_metrics = [m for m, _ in shard_results]
+        metrics = StaticSceneMetrics(
+            times=[t for m in shard_metrics for t in m.times],
+            diff_norms=[v for m in shard_metrics for v in m.diff_norms],
+            hist_diffs=[v for m in shard_metrics for v in m.hist_diffs],
+            end_time=shard_metrics[-1].end_time,
+        )
+        stats = FrameSamplingStats(mode=sampler.mode)
+        for _, shard_stats in shard_results:
+            stats.add(shard_stats)
 
-    prev_gray = None
-    prev_hist = None
+    logger.info(
+        f"Static scene metrics of {video_path} in {len(shard_ranges)} shards: {stats.frames_analyzed} frames "
+        f"analyzed, {stats.frames_decoded} decoded, {stats.frames_grabbed} grabbed, {stats.seeks} seeks"
+    )
 
-    scenes: List[SceneInfo] = []
-    scene_start_t = 0.0
-    scene_is_static = True  # assume static first
-    scene_counter = 0
+    scenes = detect_static_scenes(
+        metrics,
+        scene_duration_threshold=scene_duration_threshold,
+        STATIC_THRESHOLD=STATIC_THRESHOLD,
+        MOTION_CUT_THRESHOLD=MOTION_CUT_THRESHOLD,
+        HARD_CUT_THRESHOLD=HARD_CUT_THRESHOLD,
+    )
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    return SceneAnalysisResult(scenes=scenes, sampling=stats)
 
-        if frame_idx % frame_step != 0:
-            frame_idx += 1
-            continue
 
-        t = frame_idx / fps
+def collect_static_scene_metrics_in_worker(
+    video_path: str,
+    frame_step: int,
+    scale: float,
+    sampling: FrameSamplingMode,
+    start_frame: int,
+    end_frame: int | None,
+) -> tuple[StaticSceneMetrics, FrameSamplingStats]:
+    """
+    Metrics of one shard. Shards after the first one start one sample earlier, the first sample has no
+    metrics, so the first sample of the shard is compared with the same previous frame as in the sequential run.
+    """
+    sampler = FrameSampler(video_path, frame_step=frame_step, scale=scale, mode=sampling, default_fps=25.0)
+    metrics = collect_static_scene_metrics(sampler, max(0, start_frame - frame_step), end_frame)
+
+    return metrics, sampler.stats
+
 
+def collect_static_scene_metrics(
+    sampler: FrameSampler, start_frame: int = 0, end_frame: int | None = None
+) -> StaticSceneMetrics:
+    fps = sampler.fps
+
+    times: List[float] = []
+    diff_norms: List[float] = []
+    hist_diffs: List[float] = []
+
+    prev_gray = None
+    prev_hist = None
+
+    for frame_idx, frame_small in sampler.frames(start_frame, end_frame):
         # --- preprocessing ---
-        frame_small = cv2.resize(frame, (0, 0), fx=scale, fy=scale)
         gray = cv2.cvtColor(frame_small, cv2.COLOR_BGR2GRAY)
 
         # histogram on gray gives best speed
         hist = cv2.calcHist([gray], [0], None, [32], [0, 256])
         cv2.normalize(hist, hist)
 
-        if prev_gray is None:
-            # first frame → start scene
-            prev_gray = gray
-            prev_hist = hist
-            frame_idx += 1
-            continue
+        if prev_gray is not None:
+            # movement metric
+            diff = float(np.mean(np.abs(gray.astype(float) - prev_gray.astype(float))))
+
+            times.append(frame_idx / fps)
+            diff_norms.append(diff / 255.0)
+            # histogram diff (hard cuts)
+            hist_diffs.append(float(cv2.compareHist(prev_hist, hist, cv2.HISTCMP_BHATTACHARYYA)))
+
+        # update previous frame
+        prev_gray = gray
+        prev_hist = hist
 
-        # movement metric
-        diff = float(np.mean(np.abs(gray.astype(float) - prev_gray.astype(float))))
-        diff_norm = diff / 255.0
+    return StaticSceneMetrics(
+        times=times, diff_norms=diff_norms, hist_diffs=hist_diffs, end_time=sampler.end_frame / fps
+    )
 
-        # histogram diff (hard cuts)
-        hist_diff = float(cv2.compareHist(prev_hist, hist, cv2.HISTCMP_BHATTACHARYYA))
 
+def detect_static_scenes(
+    metrics: StaticSceneMetrics,
+    scene_duration_threshold: float,
+    STATIC_THRESHOLD: float,
+    MOTION_CUT_THRESHOLD: float,
+    HARD_CUT_THRESHOLD: float,
+) -> List[SceneInfo]:
+    scenes: List[SceneInfo] = []
+    scene_start_t = 0.0
+    scene_is_static = True  # assume static first
+    scene_counter = 0
+    hist_diff = 0.0
+    diff_norm = 0.0
+
+    for t, diff_norm, hist_diff in zip(metrics.times, metrics.diff_norms, metrics.hist_diffs):
         # --- classify frame ---
         if hist_diff > HARD_CUT_THRESHOLD and diff_norm > MOTION_CUT_THRESHOLD:
             frame_type = "hard_cut"
@@ -460,18 +696,13 @@ def analyze_on_static_scenes(
             scene_start_t = t
             scene_is_static = frame_type == "static"
 
-        # update previous frame
-        prev_gray = gray
-        prev_hist = hist
-        frame_idx += 1
-
     # close last scene
     scenes.append(
         SceneInfo(
             index=scene_counter,
             start_time=scene_start_t,
-            end_time=frame_idx / fps,
-            duration=frame_idx / fps - scene_start_t,
+            end_time=metrics.end_time,
+            duration=metrics.end_time - scene_start_t,
             is_static=scene_is_static,
             intensity_level="low",
             intensity_score=0,
@@ -480,7 +711,6 @@ def analyze_on_static_scenes(
         )
     )
 
-    cap.release()
     return scenes
 
 
@@ -1,5 +1,5 @@
-from moviepy import CompositeVideoClip, VideoClip
-from ..effects.flash import get_flash_clips as get_flash_clips_effect
+from moviepy import VideoClip
+from ..effects.flash import flash_frames
 import random
 
 
@@ -23,10 +23,7 @@ def flash(
     else:
         flash_color = color
 
-    return CompositeVideoClip(
-        clips=[clip]
-        + get_flash_clips_effect(clip.size, flashing_times=[time], flash_duration=flash_duration, color=flash_color)
-    )
+    return flash_frames(clip, flashing_times=[time], flash_duration=flash_duration, color=flash_color)
 
 
 def burst_flash(
@@ -45,9 +42,4 @@ def burst_flash(
     else:
         flash_color = color
 
-    return CompositeVideoClip(
-        clips=[clip]
-        + get_flash_clips_effect(
-            clip.size, flashing_times=flashing_times, flash_duration=sub_duration / 3.0, color=flash_color
-        )
-    )
+    return flash_frames(clip, flashing_times=flashing_times, flash_duration=sub_duration / 3.0, color=flash_color)
@@ -1,9 +1,11 @@
 from moviepy import VideoClip
 
-from ..effects.zoom_effects import EasingType, PanZoomEffectCriteria, pan_zoom_frame
+from ..effects.zoom_effects import EasingType, PanZoomEffectCriteria, apply_pan_zoom_criteria
 
 
-def zoom_in__fixed_zoom__zoom_out(clip: VideoClip, zoom_factor: float, zoom_in_duration: float) -> VideoClip:
+def zoom_in__fixed_zoom__zoom_out_criteria(
+    clip_duration: float, zoom_factor: float, zoom_in_duration: float
+) -> list[PanZoomEffectCriteria]:
     zoom_in_criteria = PanZoomEffectCriteria(
         start_zoom=1.0, end_zoom=zoom_factor, start_time=0, duration=zoom_in_duration, easing="ease_out"
     )
@@ -12,7 +14,7 @@ def zoom_in__fixed_zoom__zoom_out(clip: VideoClip, zoom_factor: float, zoom_in_d
         start_zoom=zoom_factor,
         end_zoom=zoom_factor,
         start_time=zoom_in_duration,
-        duration=clip.duration - 2.0 * zoom_in_duration,
+        duration=clip_duration - 2.0 * zoom_in_duration,
         easing=None,
     )
 
@@ -24,56 +26,61 @@ def zoom_in__fixed_zoom__zoom_out(clip: VideoClip, zoom_factor: float, zoom_in_d
         easing="ease_in",
     )
 
-    for criteria in [zoom_in_criteria, middle_zoom, zoom_out_criteria]:
-        clip = pan_zoom_frame(clip, criteria)
+    return [zoom_in_criteria, middle_zoom, zoom_out_criteria]
 
-    return clip
 
+def zoom_in__fixed_zoom__zoom_out(clip: VideoClip, zoom_factor: float, zoom_in_duration: float) -> VideoClip:
+    return apply_pan_zoom_criteria(
+        clip, zoom_in__fixed_zoom__zoom_out_criteria(clip.duration, zoom_factor, zoom_in_duration)
+    )
 
-def zoom_in__zoom_out(clip: VideoClip, zoom_factor: float) -> VideoClip:
+
+def zoom_in__zoom_out_criteria(clip_duration: float, zoom_factor: float) -> list[PanZoomEffectCriteria]:
     zoom_in_criteria = PanZoomEffectCriteria(
-        start_zoom=1.0, end_zoom=zoom_factor, start_time=0, duration=clip.duration / 2.0, easing="ease_out"
+        start_zoom=1.0, end_zoom=zoom_factor, start_time=0, duration=clip_duration / 2.0, easing="ease_out"
     )
 
     zoom_out_criteria = PanZoomEffectCriteria(
         start_zoom=zoom_factor,
         end_zoom=1.0,
-        start_time=clip.duration / 2.0,
-        duration=clip.duration / 2.0,
+        start_time=clip_duration / 2.0,
+        duration=clip_duration / 2.0,
         easing="ease_in",
     )
 
-    for criteria in [zoom_in_criteria, zoom_out_criteria]:
-        clip = pan_zoom_frame(clip, criteria)
+    return [zoom_in_criteria, zoom_out_criteria]
 
-    return clip
 
+def zoom_in__zoom_out(clip: VideoClip, zoom_factor: float) -> VideoClip:
+    return apply_pan_zoom_criteria(clip, zoom_in__zoom_out_criteria(clip.duration, zoom_factor))
 
-def zoom_out__zoom_in(clip: VideoClip, zoom_factor: float) -> VideoClip:
+
+def zoom_out__zoom_in_criteria(clip_duration: float, zoom_factor: float) -> list[PanZoomEffectCriteria]:
     zoom_in_criteria = PanZoomEffectCriteria(
-        start_zoom=zoom_factor, end_zoom=1.0, start_time=0, duration=clip.duration / 2.0, easing="ease_out"
+        start_zoom=zoom_factor, end_zoom=1.0, start_time=0, duration=clip_duration / 2.0, easing="ease_out"
     )
 
     zoom_out_criteria = PanZoomEffectCriteria(
         start_zoom=1.0,
         end_zoom=zoom_factor,
-        start_time=clip.duration / 2.0,
-        duration=clip.duration / 2.0,
+        start_time=clip_duration / 2.0,
+        duration=clip_duration / 2.0,
         easing="ease_in",
     )
 
-    for criteria in [zoom_out_criteria, zoom_in_criteria]:
-        clip = pan_zoom_frame(clip, criteria)
+    return [zoom_out_criteria, zoom_in_criteria]
+
 
-    return clip
+def zoom_out__zoom_in(clip: VideoClip, zoom_factor: float) -> VideoClip:
+    return apply_pan_zoom_criteria(clip, zoom_out__zoom_in_criteria(clip.duration, zoom_factor))
 
 
-def zoom_in_at_clip_starts(
-    clip: VideoClip,
+def zoom_in_at_clip_starts_criteria(
+    clip_duration: float,
     zoom_factor: float,
     zoom_duration: float,
     easing: EasingType = "ease_out",
-) -> VideoClip:
+) -> list[PanZoomEffectCriteria]:
     zoom_in_criteria = PanZoomEffectCriteria(
         start_zoom=1.0, end_zoom=zoom_factor, start_time=0, duration=zoom_duration, easing=easing
     )
@@ -82,35 +89,57 @@ def zoom_in_at_clip_starts(
         start_zoom=zoom_factor,
         end_zoom=zoom_factor,
         start_time=zoom_duration,
-        duration=clip.duration - zoom_duration,
+        duration=clip_duration - zoom_duration,
         easing=None,
     )
 
-    for criteria in [zoom_in_criteria, static_zoom_criteria]:
-        clip = pan_zoom_frame(clip, criteria)
-
-    return clip
+    return [zoom_in_criteria, static_zoom_criteria]
 
 
-def zoom_in_at_clip_ends(
+def zoom_in_at_clip_starts(
     clip: VideoClip,
     zoom_factor: float,
     zoom_duration: float,
     easing: EasingType = "ease_out",
 ) -> VideoClip:
+    return apply_pan_zoom_criteria(
+        clip, zoom_in_at_clip_starts_criteria(clip.duration, zoom_factor, zoom_duration, easing)
+    )
+
+
+def zoom_in_at_clip_ends_criteria(
+    clip_duration: float,
+    zoom_factor: float,
+    zoom_duration: float,
+    easing: EasingType = "ease_out",
+) -> list[PanZoomEffectCriteria]:
     zoom_in_criteria = PanZoomEffectCriteria(
         start_zoom=1.0,
         end_zoom=zoom_factor,
-        start_time=clip.duration - zoom_duration,
+        start_time=clip_duration - zoom_duration,
         duration=zoom_duration,
         easing=easing,
     )
 
-    return pan_zoom_frame(clip, zoom_in_criteria)
+    return [zoom_in_criteria]
 
 
-def zoom_bump(clip: VideoClip, zoom_factor: float, bump_count: int, reverse: bool = False):
-    bump_duration = clip.duration / bump_count
+def zoom_in_at_clip_ends(
+    clip: VideoClip,
+    zoom_factor: float,
+    zoom_duration: float,
+    easing: EasingType = "ease_out",
+) -> VideoClip:
+    return apply_pan_zoom_criteria(
+        clip, zoom_in_at_clip_ends_criteria(clip.duration, zoom_factor, zoom_duration, easing)
+    )
+
+
+def zoom_bump_criteria(
+    clip_duration: float, zoom_factor: float, bump_count: int, reverse: bool = False
+) -> list[PanZoomEffectCriteria]:
+    bump_duration = clip_duration / bump_count
+    criteria_list = []
 
     for i in range(bump_count):
 
@@ -150,7 +179,10 @@ def zoom_bump(clip: VideoClip, zoom_factor: float, bump_count: int, reverse: boo
                 easing="ease_out",
             )
 
-        for criteria in [zoom_in_criteria, zoom_out_criteria]:
-            clip = pan_zoom_frame(clip, criteria)
+        criteria_list.extend([zoom_in_criteria, zoom_out_criteria])
+
+    return criteria_list
 
-    return clip
+
+def zoom_bump(clip: VideoClip, zoom_factor: float, bump_count: int, reverse: bool = False):
+    return apply_pan_zoom_criteria(clip, zoom_bump_criteria(clip.duration, zoom_factor, bump_count, reverse))
@@ -1,23 +1,46 @@
+from typing import Callable
+
+import cv2
 from moviepy import VideoClip
 
+from .frame_buffer import get_output_frame
+
 
 def fit_video_into_frame_size(size: tuple[int, int], clip: VideoClip):
+    """
+    Scales the clip to cover the frame and crops it around the center.
+
+    Only the part of the source which stays visible is resized, straight into the output frame.
+    """
     video_width, video_height = size
+    clip_width, clip_height = clip.size
 
-    clip_aspect = clip.w / clip.h
+    clip_aspect = clip_width / clip_height
     aspect_ratio = video_width / video_height
 
     if clip_aspect < aspect_ratio:
-        scaled_clip: VideoClip = clip.resized(width=video_width)
+        crop_width = clip_width
+        crop_height = min(clip_height, max(1, round(clip_width / aspect_ratio)))
     else:
-        scaled_clip: VideoClip = clip.resized(height=video_height)
+        crop_width = min(clip_width, max(1, round(clip_height * aspect_ratio)))
+        crop_height = clip_height
 
-    return scaled_clip.cropped(
-        x_center=scaled_clip.w / 2,
-        y_center=scaled_clip.h / 2,
-        width=video_width,
-        height=video_height,
-    )
+    x1 = (clip_width - crop_width) // 2
+    y1 = (clip_height - crop_height) // 2
+    x2 = x1 + crop_width
+    y2 = y1 + crop_height
+
+    if (crop_width, crop_height) == (clip_width, clip_height) == (video_width, video_height):
+        return clip
+
+    interpolation = cv2.INTER_AREA if crop_width > video_width else cv2.INTER_LINEAR
+
+    def make_frame(get_frame, t):
+        frame = get_frame(t)
+        dst = get_output_frame(clip, (video_height, video_width, *frame.shape[2:]), frame.dtype)
+        return cv2.resize(frame[y1:y2, x1:x2], (video_width, video_height), dst=dst, interpolation=interpolation)
+
+    return clip.transform(make_frame, apply_to=["mask"])
 
 
 def crop(clip: VideoClip, top_left_point: tuple[int, int], size: tuple[int, int]):
@@ -29,17 +52,32 @@ def crop(clip: VideoClip, top_left_point: tuple[int, int], size: tuple[int, int]
     )
 
 
-def line_crop(clip: VideoClip, line_number: int, total_lines: int, is_vertical_line: bool) -> VideoClip:
+def get_line_box(
+    size: tuple[int, int], line_number: int, total_lines: int, is_vertical_line: bool
+) -> tuple[int, int, int, int]:
+    width, height = size
 
     if is_vertical_line:
-        offset = clip.w / total_lines * (line_number - 1)
-        crop_w = clip.w / total_lines
-        crop_h = clip.w
+        offset = width / total_lines * (line_number - 1)
+        return int(offset), 0, int(offset + width / total_lines), height
+
+    offset = height / total_lines * (line_number - 1)
+    return 0, int(offset), width, int(offset + height / total_lines)
+
+
+def line_crop(
+    clip: VideoClip, get_line_number: Callable[[float], int], total_lines: int, is_vertical_line: bool
+) -> VideoClip:
+    """Keeps one line (stripe) of the frame on black, line number can change over time"""
+
+    def make_frame(get_frame, t):
+        frame = get_frame(t)
+        x1, y1, x2, y2 = get_line_box(clip.size, get_line_number(t), total_lines, is_vertical_line)
 
-        return crop(clip, top_left_point=(offset, 0), size=(crop_w, crop_h)).with_position((offset, 0))
+        output = get_output_frame(clip, frame.shape, frame.dtype)
+        output.fill(0)
+        output[y1:y2, x1:x2] = frame[y1:y2, x1:x2]
 
-    offset = clip.h / total_lines * (line_number - 1)
-    crop_w = clip.w
-    crop_h = clip.h / total_lines
+        return output
 
-    return crop(clip, top_left_point=(0, offset), size=(crop_w, crop_h)).with_position((0, offset))
+    return clip.transform(make_frame)
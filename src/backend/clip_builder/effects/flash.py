@@ -1,19 +1,55 @@
-from moviepy import ColorClip, VideoClip, vfx
-
-
-def get_flash_clips(
-    size: tuple[int, int], flashing_times: list[float], flash_duration, color: tuple[int, int, int] = (255, 255, 255)
-) -> list[VideoClip]:
-    clips = []
-    for t in flashing_times:
-        clips.append(
-            ColorClip(
-                size=size,
-                color=color,
-                duration=flash_duration,
-            )
-            .with_position((0, 0))
-            .with_start(t)
-            .with_effects(effects=[vfx.CrossFadeOut(flash_duration)])
-        )
-    return clips
+import numpy as np
+from moviepy import VideoClip
+
+from .frame_buffer import get_output_frame
+
+
+# alpha in fixed point, 256 = flash color only
+FLASH_ALPHA_ONE = 256
+
+
+def flash_frames(
+    clip: VideoClip, flashing_times: list[float], flash_duration: float, color: tuple[int, int, int] = (255, 255, 255)
+) -> VideoClip:
+    """
+    Blends color over the clip at every flashing time, the flash starts at full color and fades out linearly
+    over flash_duration.
+
+    Only frames inside flash windows are blended, with integer arithmetic, other frames are returned as is.
+    """
+    windows = [(t, t + flash_duration) for t in flashing_times]
+
+    # color * alpha for every alpha level, so blending is one multiply, one add and one shift per pixel
+    color_ramp = np.arange(FLASH_ALPHA_ONE + 1, dtype=np.uint16)[:, None] * np.array(color, dtype=np.uint16)[None, :]
+
+    # uint16 blend buffer reused between frames
+    blended: np.ndarray | None = None
+
+    def get_alpha(t: float) -> int:
+        for start, end in windows:
+            if start <= t < end:
+                return int(FLASH_ALPHA_ONE * (end - t) / flash_duration)
+        return 0
+
+    def make_frame(get_frame, t):
+        nonlocal blended
+
+        frame = get_frame(t)
+        alpha = get_alpha(t)
+
+        if alpha == 0:
+            return frame
+
+        if blended is None or blended.shape != frame.shape:
+            blended = np.empty(frame.shape, dtype=np.uint16)
+
+        np.multiply(frame, FLASH_ALPHA_ONE - alpha, out=blended, dtype=np.uint16, casting="unsafe")
+        blended += color_ramp[alpha]
+        blended >>= 8
+
+        output = get_output_frame(clip, frame.shape, np.uint8)
+        np.copyto(output, blended, casting="unsafe")
+
+        return output
+
+    return clip.transform(make_frame)
@@ -0,0 +1,154 @@
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from moviepy import VideoClip
+
+
+@dataclass
+class FrameBufferStats:
+    frames_decoded: int = 0
+    frames_spilled: int = 0
+    seeks_avoided: int = 0
+
+
+class FrameRingBuffer:
+    """
+    Decoded frames by frame index, so reverse playback reads frames from memory instead of seeking the reader
+    backwards for every frame.
+
+    Frames above max_memory_bytes spill into a memmapped temporary file in spill_dir, the oldest frames are
+    dropped once max_spill_bytes is used up as well. The temporary file is removed when the buffer is released.
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int = 256 * 1024**2,
+        spill_dir: str | None = None,
+        max_spill_bytes: int = 2 * 1024**3,
+        stats: FrameBufferStats | None = None,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self.stats = FrameBufferStats() if stats is None else stats
+
+        self.frames: OrderedDict[int, np.ndarray] = OrderedDict()
+        self.memory_bytes = 0
+
+        self.frame_shape: tuple[int, ...] | None = None
+        self.frame_dtype = None
+        self.spill: np.memmap | None = None
+        self.spill_slots: dict[int, int] = {}
+        self.spill_slot_owners: list[int | None] = []
+        self.next_spill_slot = 0
+
+    def get(self, index: int) -> np.ndarray | None:
+        frame = self.frames.get(index)
+
+        if frame is None and index in self.spill_slots:
+            frame = self.spill[self.spill_slots[index]]
+
+        if frame is not None:
+            self.stats.seeks_avoided += 1
+
+        return frame
+
+    def put(self, index: int, frame: np.ndarray):
+        self.stats.frames_decoded += 1
+
+        if self.frame_shape is None:
+            self.frame_shape = frame.shape
+            self.frame_dtype = frame.dtype
+
+        # reader buffers are reused between reads, so the frame is copied
+        if frame.shape != self.frame_shape or frame.dtype != self.frame_dtype or index in self.frames:
+            return
+
+        self.frames[index] = frame.copy()
+        self.memory_bytes += frame.nbytes
+
+        while self.memory_bytes > self.max_memory_bytes and len(self.frames) > 0:
+            oldest_index, oldest_frame = self.frames.popitem(last=False)
+            self.memory_bytes -= oldest_frame.nbytes
+            self.spill_frame(oldest_index, oldest_frame)
+
+    def spill_frame(self, index: int, frame: np.ndarray):
+        if self.spill_dir is None:
+            return
+
+        if self.spill is None:
+            slots = self.max_spill_bytes // frame.nbytes
+            if slots == 0:
+                return
+
+            self.spill = np.memmap(
+                tempfile.TemporaryFile(dir=self.spill_dir), dtype=frame.dtype, mode="w+", shape=(slots, *frame.shape)
+            )
+            self.spill_slot_owners = [None] * slots
+
+        slot = self.next_spill_slot
+        self.next_spill_slot = (slot + 1) % len(self.spill_slot_owners)
+
+        previous_owner = self.spill_slot_owners[slot]
+        if previous_owner is not None:
+            del self.spill_slots[previous_owner]
+
+        self.spill[slot] = frame
+        self.spill_slots[index] = slot
+        self.spill_slot_owners[slot] = index
+        self.stats.frames_spilled += 1
+
+
+class FrameBufferPool:
+    """
+    Preallocated output frames handed out round robin per shape and dtype.
+
+    An effect writes its output frame into an acquired buffer instead of allocating a new array. A buffer comes
+    back after buffers_per_shape acquisitions of the same shape, which is more than effects stacked on a segment
+    read at once, and the writer consumes a frame before the next one is requested.
+    allocations stops growing once every shape of the pipeline is allocated, that is the allocation-free state.
+    """
+
+    def __init__(self, buffers_per_shape: int = 8):
+        self.buffers_per_shape = buffers_per_shape
+        self.buffers: dict[tuple, list[np.ndarray]] = {}
+        self.next_buffer: dict[tuple, int] = {}
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self, shape: tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        key = (tuple(shape), np.dtype(dtype).str)
+        buffers = self.buffers.setdefault(key, [])
+        index = self.next_buffer.get(key, 0)
+        self.next_buffer[key] = (index + 1) % self.buffers_per_shape
+
+        if index < len(buffers):
+            self.reuses += 1
+            return buffers[index]
+
+        buffer = np.empty(shape, dtype=dtype)
+        buffers.append(buffer)
+        self.allocations += 1
+        return buffer
+
+
+def with_frame_buffer_pool(clip: VideoClip, pool: FrameBufferPool | None) -> VideoClip:
+    """
+    Lets effects applied to the clip write frames into pool buffers. The pool travels with the clip,
+    as moviepy copies clip attributes into every derived clip, so effect signatures stay unchanged.
+    """
+    clip = clip.copy()
+    clip.frame_buffer_pool = pool
+    return clip
+
+
+def get_output_frame(clip: VideoClip, shape: tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+    """Destination frame for an effect of the clip, a new array when the clip has no pool"""
+    pool: FrameBufferPool | None = getattr(clip, "frame_buffer_pool", None)
+
+    if pool is None:
+        return np.empty(shape, dtype=dtype)
+
+    return pool.acquire(shape, dtype)
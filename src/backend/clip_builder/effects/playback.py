@@ -1,4 +1,150 @@
-from moviepy import VideoClip, vfx, concatenate_videoclips
+import math
+
+import numpy as np
+from moviepy import VideoClip
+
+from .frame_buffer import FrameRingBuffer
+
+
+class TimeRemap:
+    """
+    Piecewise linear map from output time to source time.
+
+    Piece i starts at output time output_starts[i] and plays source from source_starts[i] with speeds[i].
+    Speed 0 holds a frame, pieces after an infinite one are never reached.
+    """
+
+    def __init__(self, output_starts: list[float], source_starts: list[float], speeds: list[float], duration: float):
+        self.output_starts = np.array(output_starts, dtype=np.float64)
+        self.source_starts = np.array(source_starts, dtype=np.float64)
+        self.speeds = np.array(speeds, dtype=np.float64)
+        self.duration = duration
+
+    def __call__(self, t: np.ndarray) -> np.ndarray:
+        i = np.clip(np.searchsorted(self.output_starts, t, side="right") - 1, 0, len(self.output_starts) - 1)
+        return self.source_starts[i] + (t - self.output_starts[i]) * self.speeds[i]
+
+    def scaled_to(self, duration: float) -> "TimeRemap":
+        """Same as with_speed_scaled(final_duration=duration) on the remapped clip"""
+        factor = self.duration / duration
+        return TimeRemap(self.output_starts / factor, self.source_starts, self.speeds * factor, duration)
+
+    def scaled_source(self, factor: float) -> "TimeRemap":
+        """Remap of a source which was speed scaled by factor before"""
+        return TimeRemap(self.output_starts, self.source_starts * factor, self.speeds * factor, self.duration)
+
+    def cut(self, duration: float, source_end: float) -> "TimeRemap":
+        """Same as with_duration(duration), a remap shorter than duration holds source_end frame"""
+        keep = self.output_starts < duration
+        output_starts = list(self.output_starts[keep])
+        source_starts = list(self.source_starts[keep])
+        speeds = list(self.speeds[keep])
+
+        if self.duration < duration:
+            output_starts.append(self.duration)
+            source_starts.append(source_end)
+            speeds.append(0.0)
+
+        return TimeRemap(output_starts, source_starts, speeds, duration)
+
+    @staticmethod
+    def concatenate(remaps: list["TimeRemap"], source_offsets: list[float]) -> "TimeRemap":
+        output_starts = []
+        source_starts = []
+        speeds = []
+        output_offset = 0.0
+
+        for remap, source_offset in zip(remaps, source_offsets):
+            output_starts.extend(remap.output_starts + output_offset)
+            source_starts.extend(remap.source_starts + source_offset)
+            speeds.extend(remap.speeds)
+            output_offset += remap.duration
+
+        return TimeRemap(output_starts, source_starts, speeds, output_offset)
+
+
+def ramp_speed_remap(source_duration: float, start_speed: float, end_speed: float, ramps: int) -> TimeRemap:
+    """Source split into ramps equal parts, each played with constant speed from start_speed towards end_speed"""
+    sub_duration = 1.0 * source_duration / ramps
+    speed_diff = 1.0 * (start_speed - end_speed) / ramps
+
+    output_starts = []
+    source_starts = []
+    speeds = []
+    output_time = 0.0
+
+    for i in range(ramps):
+        speed = start_speed - (i * speed_diff)
+
+        output_starts.append(output_time)
+        source_starts.append(i * sub_duration)
+        speeds.append(speed)
+
+        output_time += sub_duration / speed if speed > 0 else math.inf
+
+    return TimeRemap(output_starts, source_starts, speeds, output_time)
+
+
+def apply_time_remap(
+    clip: VideoClip,
+    remap: TimeRemap,
+    duration: float,
+    fps: float | None = None,
+    mirror_at: float | None = None,
+    frame_buffer: FrameRingBuffer | None = None,
+) -> VideoClip:
+    """
+    Source timestamps are computed once for every output frame, frame lookup is an index into that array.
+
+    With mirror_at output frames after mirror_at play frames before it backwards. A frame buffer keeps decoded
+    forward frames, so the backward part is served from it instead of seeking the source backwards.
+    """
+    fps = fps or clip.fps
+    n_frames = max(1, math.ceil(duration * fps - 1e-6))
+    frame_times = np.arange(n_frames) / fps
+
+    # output frame -> frame whose source time is used, differs from output frame only in the mirrored part
+    frame_indexes = np.arange(n_frames)
+
+    if mirror_at is None:
+        source_times = remap(frame_times)
+    else:
+        n_forward = max(1, min(n_frames, math.ceil(mirror_at * fps - 1e-6)))
+        mirrored = np.clip(2 * n_forward - 1 - np.arange(n_forward, n_frames), 0, n_forward - 1)
+        frame_indexes = np.concatenate([frame_indexes[:n_forward], mirrored])
+        source_times = remap(frame_times)[frame_indexes]
+
+    # last frame of the source at most, so cut or held tails never read past the end
+    source_times = np.clip(source_times, 0.0, max(0.0, clip.duration - 1.0 / fps))
+
+    def get_output_frame(t) -> int:
+        # same frame rounding as video readers
+        return min(max(int(t * fps + 0.00001), 0), n_frames - 1)
+
+    def source_time(t):
+        return float(source_times[get_output_frame(t)])
+
+    if frame_buffer is None:
+        return clip.time_transform(source_time, apply_to=["mask"]).with_duration(duration)
+
+    def make_frame(get_frame, t):
+        output_frame = get_output_frame(t)
+        frame_index = int(frame_indexes[output_frame])
+
+        frame = frame_buffer.get(frame_index)
+
+        if frame is None:
+            frame = get_frame(float(source_times[output_frame]))
+            frame_buffer.put(frame_index, frame)
+
+        return frame
+
+    buffered_clip = clip.transform(make_frame).with_duration(duration)
+
+    if clip.mask is not None:
+        buffered_clip = buffered_clip.with_mask(clip.mask.time_transform(source_time).with_duration(duration))
+
+    return buffered_clip
 
 
 def ramp_speed(
@@ -7,46 +153,39 @@ def ramp_speed(
     end_speed: float = 0.0,
     ramps: int = 5,
     scale_speed_to_original_duration: bool = False,
+    fps: float | None = None,
 ) -> VideoClip:
-    sub_duration = 1.0 * clip.duration / ramps
-    speed_diff = 1.0 * (start_speed - end_speed) / ramps
-
-    clips = []
-
-    for i in range(ramps):
-        clips.append(
-            clip[i * sub_duration : i * sub_duration + sub_duration].with_speed_scaled(
-                factor=start_speed - (i * speed_diff)
-            )
-        )
-
-    res = concatenate_videoclips(clips=clips, method="compose")
+    remap = ramp_speed_remap(clip.duration, start_speed, end_speed, ramps)
 
     if scale_speed_to_original_duration:
-        res = res.with_speed_scaled(final_duration=clip.duration)
+        remap = remap.scaled_to(clip.duration)
     else:
         # just cut extra duration
-        res = res.with_duration(clip.duration)
+        remap = remap.cut(clip.duration, source_end=clip.duration)
 
-    return res
+    return apply_time_remap(clip, remap, clip.duration, fps=fps)
 
 
-def forward_reverse(clip: VideoClip, start_speed: float = 1.0, fast_slow_mode: bool = True) -> VideoClip:
+def forward_reverse(
+    clip: VideoClip,
+    start_speed: float = 1.0,
+    fast_slow_mode: bool = True,
+    fps: float | None = None,
+    frame_buffer: FrameRingBuffer | None = None,
+) -> VideoClip:
     sub_duration = clip.duration / 2.0
-    sub_clip: VideoClip = clip.with_speed_scaled(final_duration=sub_duration)
 
+    # first half plays the whole clip twice faster
     if fast_slow_mode:
-        sub_clip = ramp_speed(
-            sub_clip, start_speed=start_speed, end_speed=0.1, ramps=5, scale_speed_to_original_duration=False
-        )
+        remap = ramp_speed_remap(sub_duration, start_speed=start_speed, end_speed=0.1, ramps=5)
+        remap = remap.cut(sub_duration, source_end=sub_duration)
+    else:
+        remap = TimeRemap([0.0], [0.0], [1.0], sub_duration)
+
+    remap = remap.scaled_source(clip.duration / sub_duration)
 
-    return concatenate_videoclips(
-        clips=[
-            sub_clip,
-            sub_clip.with_effects(effects=[vfx.TimeMirror()]),
-        ],
-        method="compose",
-    ).with_duration(clip.duration)
+    # second half is the first one backwards
+    return apply_time_remap(clip, remap, clip.duration, fps=fps, mirror_at=sub_duration, frame_buffer=frame_buffer)
 
 
 def ramp_speed_segments(
@@ -54,25 +193,27 @@ def ramp_speed_segments(
     speeds: list[float] = [1, 0],
     ramps_count_between_speed: int = 5,
     scale_speed_to_original_duration: bool = False,
+    fps: float | None = None,
 ) -> VideoClip:
     sub_duration = clip.duration / (len(speeds) - 1)
 
-    clips = []
+    remaps = []
+    source_offsets = []
 
     for i in range(len(speeds) - 1):
         start_speed = speeds[i]
         end_speed = speeds[i + 1]
 
-        sub_clip = clip[i * sub_duration : i * sub_duration + sub_duration]
-
-        clips.append(ramp_speed(sub_clip, start_speed, end_speed, ramps_count_between_speed))
+        remap = ramp_speed_remap(sub_duration, start_speed, end_speed, ramps_count_between_speed)
+        remaps.append(remap.cut(sub_duration, source_end=sub_duration))
+        source_offsets.append(i * sub_duration)
 
-    res = concatenate_videoclips(clips, method="compose")
+    remap = TimeRemap.concatenate(remaps, source_offsets)
 
     if scale_speed_to_original_duration:
-        res = res.with_speed_scaled(final_duration=clip.duration)
+        remap = remap.scaled_to(clip.duration)
     else:
         # just cut extra duration
-        res = res.with_duration(clip.duration)
+        remap = remap.cut(clip.duration, source_end=clip.duration)
 
-    return res
+    return apply_time_remap(clip, remap, clip.duration, fps=fps)
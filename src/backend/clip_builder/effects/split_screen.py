@@ -1,19 +1,40 @@
-from moviepy import *
-import random
+from moviepy import VideoClip
+import cv2
+import numpy as np
 
-color_presets = [(255, 255, 255), (255, 133, 255), (113, 233, 255)]
 
+class SplitScreenCellGeometry:
+    """
+    Where a cell takes pixels from and where it puts them, computed once per segment.
 
-def set_clip_position(
+    Source box is the part of the source frame which stays visible after scaling the source to cover the cell
+    and cropping it around the center, so a frame is cropped first and only the visible part is resized.
+    """
+
+    def __init__(
+        self,
+        source_box: tuple[int, int, int, int],
+        size: tuple[int, int],
+        position: tuple[int, int],
+        mirror_x: bool,
+    ):
+        self.source_box = source_box  # x1, y1, x2, y2 in source frame
+        self.size = size  # width, height of the cell picture
+        self.position = position  # top left corner on canvas, can be outside canvas
+        self.mirror_x = mirror_x
+
+
+def get_cell_geometry(
     video_width,
     video_height,
-    clip: VideoClip,
+    clip_size: tuple[int, int],
     position: tuple[int, int],
     position_layout: tuple[int, int],
     offset_x: int = 0,
     offset_y: int = 0,
     scale_factor: float = 1.0,
-) -> VideoClip:
+    mirror_x: bool = False,
+) -> SplitScreenCellGeometry:
     cols, rows = position_layout
 
     cell_width = int(video_width / cols)
@@ -22,24 +43,73 @@ def set_clip_position(
     clip_width = int(cell_width * scale_factor)
     clip_height = int(cell_height * scale_factor)
 
+    source_width, source_height = clip_size
+
+    # source is scaled to the cell width or height, the other side can be larger or smaller than the cell
     if clip_width > clip_height:
-        scaled_clip: VideoClip = clip.resized(width=clip_width)
+        scale = clip_width / source_width
     else:
-        scaled_clip: VideoClip = clip.resized(height=clip_height)
+        scale = clip_height / source_height
 
-    cropped_clip = scaled_clip.cropped(
-        x_center=max(scaled_clip.w, clip_width) / 2,
-        y_center=max(scaled_clip.h, clip_height) / 2,
-        width=clip_width,
-        height=clip_height,
-    )
+    width = min(clip_width, round(source_width * scale))
+    height = min(clip_height, round(source_height * scale))
+
+    # centered crop of the scaled frame mapped back to source pixels
+    crop_width = min(source_width, max(1, round(width / scale)))
+    crop_height = min(source_height, max(1, round(height / scale)))
+    x1 = (source_width - crop_width) // 2
+    y1 = (source_height - crop_height) // 2
 
     p_col, p_row = position
 
-    clip_x = int((p_col - 1) * cell_width) + (cell_width - cropped_clip.w) // 2 + offset_x  # top left corner
-    clip_y = int((p_row - 1) * cell_height) + (cell_height - cropped_clip.h) // 2 + offset_y  # top left corner
+    clip_x = int((p_col - 1) * cell_width) + (cell_width - width) // 2 + offset_x  # top left corner
+    clip_y = int((p_row - 1) * cell_height) + (cell_height - height) // 2 + offset_y  # top left corner
 
-    return cropped_clip.with_position((clip_x, clip_y))
+    return SplitScreenCellGeometry(
+        source_box=(x1, y1, x1 + crop_width, y1 + crop_height),
+        size=(width, height),
+        position=(clip_x, clip_y),
+        mirror_x=mirror_x,
+    )
+
+
+class SplitScreenCell:
+    """Renders one cell into the canvas through a preallocated cell buffer"""
+
+    def __init__(self, clip: VideoClip, geometry: SplitScreenCellGeometry, canvas_size: tuple[int, int]):
+        self.clip = clip
+        self.geometry = geometry
+
+        width, height = geometry.size
+        self.buffer = np.empty((height, width, 3), dtype=np.uint8)
+
+        # part of the cell picture which lands on canvas, cells scaled above 1 can overflow canvas edges
+        x, y = geometry.position
+        canvas_width, canvas_height = canvas_size
+        self.canvas_box = (max(0, x), max(0, y), min(canvas_width, x + width), min(canvas_height, y + height))
+        self.buffer_box = (
+            self.canvas_box[0] - x,
+            self.canvas_box[1] - y,
+            self.canvas_box[2] - x,
+            self.canvas_box[3] - y,
+        )
+
+        x1, y1, x2, y2 = geometry.source_box
+        self.interpolation = cv2.INTER_AREA if (x2 - x1) > width else cv2.INTER_LINEAR
+
+    def render(self, frame: np.ndarray, canvas: np.ndarray):
+        x1, y1, x2, y2 = self.geometry.source_box
+        self.buffer = cv2.resize(
+            frame[y1:y2, x1:x2, :3], self.geometry.size, dst=self.buffer, interpolation=self.interpolation
+        )
+
+        picture = self.buffer[:, ::-1] if self.geometry.mirror_x else self.buffer
+
+        cx1, cy1, cx2, cy2 = self.canvas_box
+        bx1, by1, bx2, by2 = self.buffer_box
+
+        if cx2 > cx1 and cy2 > cy1:
+            canvas[cy1:cy2, cx1:cx2] = picture[by1:by2, bx1:bx2]
 
 
 def get_positions_from_layout(position_layout: tuple[int, int]):
@@ -60,10 +130,12 @@ class SplitScreenCriteria:
         clip: VideoClip,
         position: tuple[int, int] | None = None,
         scale_factor: float = 1,
+        mirror_x: bool = False,
     ):
         self.clip = clip
         self.position = position
         self.scale_factor = scale_factor
+        self.mirror_x = mirror_x
 
 
 def split_screen_clips(
@@ -74,24 +146,41 @@ def split_screen_clips(
     clips_margin: int = 0,
     clip_duration: float | None = None,
 ) -> VideoClip:
+    """
+    Cells are drawn in criteria order on a black canvas. The canvas is allocated once and reused for every
+    frame, a frame is valid until the next one is requested. Each distinct clip is decoded once per frame.
+    """
     default_positions = get_positions_from_layout(position_layout)
 
-    positioned_clips = []
+    cells: list[SplitScreenCell] = []
     for i, clip_criteria in enumerate(clips_criteria):
         clip_position = clip_criteria.position if clip_criteria.position is not None else default_positions[i]
 
-        pos_clip = set_clip_position(
-            clip=clip_criteria.clip,
+        geometry = get_cell_geometry(
+            clip_size=clip_criteria.clip.size,
             position=clip_position,
             position_layout=position_layout,
             video_height=video_height,
             video_width=video_width,
             scale_factor=clip_criteria.scale_factor,
+            mirror_x=clip_criteria.mirror_x,
         )
-        positioned_clips.append(pos_clip)
+        cells.append(SplitScreenCell(clip_criteria.clip, geometry, canvas_size=(video_width, video_height)))
 
     duration = clips_criteria[0].clip.duration if clip_duration is None else clip_duration
 
-    return CompositeVideoClip(
-        clips=positioned_clips, size=(video_width, video_height), bg_color=(0, 0, 0)  # random.choice(color_presets),
-    ).with_duration(duration)
+    canvas = np.zeros((video_height, video_width, 3), dtype=np.uint8)
+
+    def make_frame(t):
+        frames: dict[int, np.ndarray] = {}
+
+        for cell in cells:
+            clip_id = id(cell.clip)
+            if clip_id not in frames:
+                frames[clip_id] = cell.clip.get_frame(t)
+
+            cell.render(frames[clip_id], canvas)
+
+        return canvas
+
+    return VideoClip(frame_function=make_frame, duration=duration)
@@ -1,8 +1,11 @@
 from typing import Callable, Literal
 from moviepy import VideoClip, CompositeVideoClip
+import bisect
 import cv2
 import math
 
+from .frame_buffer import get_output_frame
+
 EasingType = Literal["ease_in", "ease_out"]
 
 
@@ -26,50 +29,146 @@ class PanZoomEffectCriteria:
         self.easing: EasingType | None = easing
 
 
-def pan_zoom_frame(clip: VideoClip, criteria: PanZoomEffectCriteria) -> VideoClip:
-    video_width = clip.size[0]
-    video_height = clip.size[1]
+def get_eased_progress(criteria: PanZoomEffectCriteria, t: float) -> float:
+    linear_progress = (t - criteria.start_time) / criteria.duration
+    linear_progress = max(0.0, min(1.0, linear_progress))
 
-    start = criteria.start_time
-    end = criteria.start_time + criteria.duration
+    if criteria.easing == "ease_in":
+        return 1 - math.cos((linear_progress * math.pi) / 2)
+    elif criteria.easing == "ease_out":
+        return math.sin(linear_progress * math.pi / 2)
+    else:
+        return linear_progress
 
-    def make_frame(get_frame, t):
-        frame = get_frame(t)
-        if t < start or t >= end:
-            return frame
 
-        linear_progress = (t - start) / criteria.duration
-        linear_progress = max(0.0, min(1.0, linear_progress))
+def get_crop_box(criteria: PanZoomEffectCriteria, video_width: int, video_height: int, t: float) -> tuple[int, ...]:
+    """Crop box (x1, y1, x2, y2) of one pan/zoom at time t, which is resized back to full frame"""
+    eased = get_eased_progress(criteria, t)
+
+    # zoom interpolation
+    zoom = criteria.start_zoom + (criteria.end_zoom - criteria.start_zoom) * eased
+    new_w = int(video_width / zoom)
+    new_h = int(video_height / zoom)
+
+    # pan interpolation
+    pan_x = criteria.start_pan_position[0] + int(criteria.end_pan_position[0] * eased)
+    pan_y = criteria.start_pan_position[1] + int(criteria.end_pan_position[1] * eased)
+
+    # cropping box relative to center + pan
+    x1 = (video_width - new_w) // 2 + pan_x
+    y1 = (video_height - new_h) // 2 + pan_y
+    x1, y1 = min(max(0, x1), video_width - new_w), min(max(0, y1), video_height - new_h)
+
+    x2 = x1 + new_w
+    y2 = y1 + new_h
+    x2, y2 = min(video_width, x2), min(video_height, y2)
+
+    return x1, y1, x2, y2
+
+
+class PanZoomPlan:
+    """
+    All pan/zooms of a clip as one time-indexed schedule.
+
+    Criteria are kept in the order they were applied, so later criteria zoom into the result of earlier ones.
+    Active criteria at t are found with one bisect over window bounds, their crop boxes are composed into one
+    box of the source frame, so every frame is cropped and resized at most once.
+    """
+
+    def __init__(self, size: tuple[int, int], criteria_list: list[PanZoomEffectCriteria]):
+        self.width = size[0]
+        self.height = size[1]
+        self.criteria_list = criteria_list
+
+        self.bounds = sorted(
+            {c.start_time for c in criteria_list} | {c.start_time + c.duration for c in criteria_list}
+        )
+        # outermost (last applied) first, as boxes are composed from the output frame towards the source
+        self.active: list[list[PanZoomEffectCriteria]] = [
+            [c for c in reversed(criteria_list) if c.start_time <= t < c.start_time + c.duration]
+            for t in self.bounds
+        ]
+
+    def extended(self, criteria_list: list[PanZoomEffectCriteria]) -> "PanZoomPlan":
+        return PanZoomPlan((self.width, self.height), self.criteria_list + criteria_list)
+
+    def get_active_criteria(self, t: float) -> list[PanZoomEffectCriteria]:
+        index = bisect.bisect_right(self.bounds, t) - 1
+        return [] if index < 0 else self.active[index]
+
+    def get_source_box(self, t: float) -> tuple[int, int, int, int] | None:
+        active = self.get_active_criteria(t)
+
+        if len(active) == 0:
+            return None
+
+        if len(active) == 1:
+            return get_crop_box(active[0], self.width, self.height, t)
 
-        if criteria.easing == "ease_in":
-            eased = 1 - math.cos((linear_progress * math.pi) / 2)
-        elif criteria.easing == "ease_out":
-            eased = math.sin(linear_progress * math.pi / 2)
-        else:
-            eased = linear_progress
+        x1, y1, x2, y2 = 0.0, 0.0, float(self.width), float(self.height)
 
-        # zoom interpolation
-        zoom = criteria.start_zoom + (criteria.end_zoom - criteria.start_zoom) * eased
-        new_w = int(video_width / zoom)
-        new_h = int(video_height / zoom)
+        for criteria in active:
+            bx1, by1, bx2, by2 = get_crop_box(criteria, self.width, self.height, t)
+            scale_x = (bx2 - bx1) / self.width
+            scale_y = (by2 - by1) / self.height
+            x1, x2 = bx1 + x1 * scale_x, bx1 + x2 * scale_x
+            y1, y2 = by1 + y1 * scale_y, by1 + y2 * scale_y
 
-        # pan interpolation
-        pan_x = criteria.start_pan_position[0] + int(criteria.end_pan_position[0] * eased)
-        pan_y = criteria.start_pan_position[1] + int(criteria.end_pan_position[1] * eased)
+        x1, y1 = int(round(x1)), int(round(y1))
+        x2, y2 = max(x1 + 1, int(round(x2))), max(y1 + 1, int(round(y2)))
 
-        # cropping box relative to center + pan
-        x1 = (video_width - new_w) // 2 + pan_x
-        y1 = (video_height - new_h) // 2 + pan_y
-        x1, y1 = min(max(0, x1), video_width - new_w), min(max(0, y1), video_height - new_h)
+        return x1, y1, min(self.width, x2), min(self.height, y2)
 
-        x2 = x1 + new_w
-        y2 = y1 + new_h
-        x2, y2 = min(video_width, x2), min(video_height, y2)
+    def apply(self, frame, t: float, dst=None):
+        box = self.get_source_box(t)
+
+        if box is None:
+            return frame
+
+        x1, y1, x2, y2 = box
+        return cv2.resize(frame[y1:y2, x1:x2], (self.width, self.height), dst=dst)
 
-        cropped = frame[y1:y2, x1:x2]
 
-        # resize back to original
-        frame = cv2.resize(cropped, (video_width, video_height))
+def apply_planned_frame(clip: VideoClip, plan: PanZoomPlan, frame, t: float):
+    if len(plan.get_active_criteria(t)) == 0:
         return frame
 
-    return clip.transform(make_frame, apply_to=["mask", "audio"])
+    dst = get_output_frame(clip, (plan.height, plan.width, *frame.shape[2:]), frame.dtype)
+    return plan.apply(frame, t, dst=dst)
+
+
+def apply_pan_zoom_plan(clip: VideoClip, plan: PanZoomPlan) -> VideoClip:
+    def make_frame(get_frame, t):
+        return apply_planned_frame(clip, plan, get_frame(t), t)
+
+    planned_clip = clip.transform(make_frame, apply_to=["mask", "audio"])
+    set_applied_pan_zoom_plan(planned_clip, plan, clip.get_frame)
+
+    return planned_clip
+
+
+def set_applied_pan_zoom_plan(clip: VideoClip, plan: PanZoomPlan, source_get_frame: Callable):
+    # following pan/zooms extend the plan instead of nesting transforms. Frame function identity tells
+    # whether anything else changed frames of the clip after the plan was applied, copies keep the attribute
+    clip.pan_zoom_plan = (plan, source_get_frame, clip.frame_function)
+
+
+def pan_zoom_frame(clip: VideoClip, criteria: PanZoomEffectCriteria) -> VideoClip:
+    return apply_pan_zoom_criteria(clip, [criteria])
+
+
+def apply_pan_zoom_criteria(clip: VideoClip, criteria_list: list[PanZoomEffectCriteria]) -> VideoClip:
+    applied = getattr(clip, "pan_zoom_plan", None)
+
+    if applied is None or applied[2] is not clip.frame_function or clip.mask is not None:
+        return apply_pan_zoom_plan(clip, PanZoomPlan(clip.size, criteria_list))
+
+    plan, source_get_frame, _ = applied
+    extended_plan = plan.extended(criteria_list)
+
+    planned_clip = clip.with_updated_frame_function(
+        lambda t: apply_planned_frame(clip, extended_plan, source_get_frame(t), t)
+    )
+    set_applied_pan_zoom_plan(planned_clip, extended_plan, source_get_frame)
+
+    return planned_clip
@@ -0,0 +1,510 @@
+import logging
+import subprocess
+from dataclasses import dataclass
+from typing import Callable
+
+from .effect_presets import pan as pan_effect_preset
+from .effect_presets import zoom as zoom_effect_preset
+from .effect_presets.flash import pick_random_color
+from .effects.split_screen import get_positions_from_layout
+from .effects.zoom_effects import PanZoomEffectCriteria
+from .effects_descriptor import EffectArgs, EffectMethod, EffectType
+from .timeline_config import TimelineSegmentConfig, VideoSegmentEffect
+from .video_resolution import VideoResolution
+
+logger = logging.getLogger(__name__)
+
+
+class FilterGraphUnsupported(Exception):
+    """Raised when a segment uses something that can not be expressed as ffmpeg filters"""
+
+
+@dataclass
+class FilterGraphInput:
+    path: str
+    start_time: float
+    duration: float
+
+
+@dataclass
+class SegmentFilterGraph:
+    inputs: list[FilterGraphInput]
+    filters: list[str]
+    output_label: str
+
+    def to_ffmpeg_args(self, output_path: str, fps: int, encoder_params: list[str]) -> list[str]:
+        args = ["ffmpeg", "-y", "-loglevel", "error"]
+
+        for i in self.inputs:
+            args += ["-ss", f"{i.start_time:.6f}", "-t", f"{i.duration + 1.0:.6f}", "-i", i.path]
+
+        return (
+            args
+            + ["-filter_complex", ";".join(self.filters), "-map", f"[{self.output_label}]", "-an", "-r", str(fps)]
+            + encoder_params
+            + [output_path]
+        )
+
+
+@dataclass
+class _Stream:
+    label: str
+    duration: float
+    size: tuple[int, int] | None
+
+
+class SegmentFilterGraphCompiler:
+    """
+    Compiles a timeline segment with its effects into ffmpeg filter_complex graph.
+
+    Mirrors VideoClipBuilder.write_segment_clip + apply_effects, so frames never
+    leave ffmpeg. Raises FilterGraphUnsupported for anything that has no filter equivalent.
+    """
+
+    def __init__(
+        self,
+        fps: int,
+        resolution: VideoResolution,
+        debug: bool = False,
+        resolve_source: Callable[[str], tuple[str, bool]] | None = None,
+        preview: bool = False,
+    ):
+        self.fps = fps
+        self.resolution = resolution
+        self.debug = debug
+        self.preview = preview
+        self.resolve_source = resolve_source
+        self.inputs: list[FilterGraphInput] = []
+        self.filters: list[str] = []
+        self.label_counter = 0
+
+    def compile(
+        self, segment_config: TimelineSegmentConfig, global_effects: list[VideoSegmentEffect]
+    ) -> SegmentFilterGraph:
+        if segment_config.videos is None or len(segment_config.videos) == 0:
+            raise FilterGraphUnsupported("Videos list is empty or null")
+
+        if segment_config.is_split_screen:
+            stream = self.split_screen(segment_config)
+        else:
+            stream = self.source(segment_config.videos[0].path, segment_config.videos[0].start_time, segment_config)
+
+        for e in global_effects + segment_config.effects:
+            stream = self.apply_effect(stream, e)
+
+        if self.debug:
+            stream = self.add_debug_info(stream, segment_config)
+
+        stream = self.chain(stream, f"trim=duration={stream.duration:.6f},format=yuv420p")
+
+        return SegmentFilterGraph(inputs=self.inputs, filters=self.filters, output_label=stream.label)
+
+    # --- graph helpers ---
+
+    def new_label(self) -> str:
+        self.label_counter += 1
+        return f"s{self.label_counter}"
+
+    def add(self, input_labels: list[str], chain: str, outputs: int = 1) -> list[str]:
+        output_labels = [self.new_label() for _ in range(outputs)]
+        self.filters.append(
+            "".join(f"[{l}]" for l in input_labels) + chain + "".join(f"[{l}]" for l in output_labels)
+        )
+        return output_labels
+
+    def chain(self, stream: _Stream, chain: str, size: tuple[int, int] | None = None) -> _Stream:
+        label = self.add([stream.label], chain)[0]
+        return _Stream(label=label, duration=stream.duration, size=stream.size if size is None else size)
+
+    def split(self, stream: _Stream, count: int) -> list[_Stream]:
+        if count == 1:
+            return [stream]
+
+        labels = self.add([stream.label], f"split={count}", outputs=count)
+        return [_Stream(label=l, duration=stream.duration, size=stream.size) for l in labels]
+
+    def black_canvas(self, duration: float) -> str:
+        width, height = self.resolution.size
+        return self.add([], f"color=c=black:s={width}x{height}:r={self.fps}:d={duration:.6f}")[0]
+
+    def require_size(self, stream: _Stream, effect: VideoSegmentEffect) -> tuple[int, int]:
+        if stream.size is None:
+            raise FilterGraphUnsupported(
+                f"{effect.method.value} requires known frame size, apply fit_video_into_frame_size before it"
+            )
+        return stream.size
+
+    def normalize_frame_rate(self, stream: _Stream) -> _Stream:
+        return self.chain(
+            stream,
+            f"fps={self.fps},tpad=stop_mode=clone:stop_duration={stream.duration:.6f},"
+            f"trim=duration={stream.duration:.6f},setpts=PTS-STARTPTS",
+        )
+
+    # --- sources ---
+
+    def source(self, path: str, start_time: float, segment_config: TimelineSegmentConfig) -> _Stream:
+        duration = float(segment_config.duration_frame) / float(self.fps)
+        source_path, is_preview_proxy = (path, False) if self.resolve_source is None else self.resolve_source(path)
+
+        self.inputs.append(FilterGraphInput(path=source_path, start_time=start_time, duration=duration))
+        input_label = f"{len(self.inputs) - 1}:v"
+
+        chain = "setpts=PTS-STARTPTS"
+        if (self.debug or self.preview) and not is_preview_proxy:
+            # same downscale as VideoClipBuilder.open_clip in debug and preview modes
+            chain += ",scale=w='trunc(iw/20)*2':h='trunc(ih/20)*2':flags=fast_bilinear"
+
+        label = self.add([input_label], chain)[0]
+        return self.normalize_frame_rate(_Stream(label=label, duration=duration, size=None))
+
+    def split_screen(self, segment_config: TimelineSegmentConfig) -> _Stream:
+        videos = segment_config.videos
+
+        if len(videos) <= 2:
+            position_layout = (1, 3) if self.resolution.is_vertical else (3, 1)
+        else:
+            position_layout = (1, len(videos)) if self.resolution.is_vertical else (len(videos), 1)
+
+        clip_positions = get_positions_from_layout(position_layout)
+
+        if len(videos) == 1:
+            s = self.split(self.source(videos[0].path, videos[0].start_time, segment_config), 3)
+            cells = [(s[0], clip_positions[0], 0.95, False), (s[1], clip_positions[1], 1.1, False)]
+            cells.append((s[2], clip_positions[2], 0.95, True))
+        elif len(videos) == 2:
+            s1 = self.split(self.source(videos[0].path, videos[0].start_time, segment_config), 2)
+            s2 = self.source(videos[1].path, videos[1].start_time, segment_config)
+            cells = [(s1[0], clip_positions[0], 0.95, False), (s2, clip_positions[1], 1.1, False)]
+            cells.append((s1[1], clip_positions[2], 0.95, True))
+        else:
+            cells = [
+                (self.source(v.path, v.start_time, segment_config), clip_positions[i], 1, False)
+                for i, v in enumerate(videos)
+            ]
+
+        duration = segment_config.duration
+        canvas = self.black_canvas(duration)
+
+        for stream, position, scale_factor, mirror_x in cells:
+            cell_label, x, y = self.split_screen_cell(stream, position, position_layout, scale_factor, mirror_x)
+            canvas = self.add([canvas, cell_label], f"overlay=x='{x}':y='{y}':eof_action=repeat")[0]
+
+        return _Stream(label=canvas, duration=duration, size=self.resolution.size)
+
+    def split_screen_cell(
+        self,
+        stream: _Stream,
+        position: tuple[int, int],
+        position_layout: tuple[int, int],
+        scale_factor: float,
+        mirror_x: bool,
+    ) -> tuple[str, str, str]:
+        # same geometry as effects.split_screen.get_cell_geometry
+        video_width, video_height = self.resolution.size
+        cols, rows = position_layout
+
+        cell_width = int(video_width / cols)
+        cell_height = int(video_height / rows)
+
+        clip_width = int(cell_width * scale_factor)
+        clip_height = int(cell_height * scale_factor)
+
+        chain = "hflip," if mirror_x else ""
+
+        if clip_width > clip_height:
+            chain += f"scale=w={clip_width}:h=-1"
+        else:
+            chain += f"scale=w=-1:h={clip_height}"
+
+        chain += f",crop=w='min(iw,{clip_width})':h='min(ih,{clip_height})'"
+
+        p_col, p_row = position
+        x = f"{int((p_col - 1) * cell_width)}+floor(({cell_width}-w)/2)"
+        y = f"{int((p_row - 1) * cell_height)}+floor(({cell_height}-h)/2)"
+
+        return self.chain(stream, chain).label, x, y
+
+    # --- effects ---
+
+    def apply_effect(self, stream: _Stream, e: VideoSegmentEffect) -> _Stream:
+        if e.effect_type == EffectType.CROP and e.method == EffectMethod.FIT_VIDEO_INTO_FRAME_SIZE:
+            width, height = self.resolution.size
+            return self.chain(
+                stream,
+                f"scale=w={width}:h={height}:force_original_aspect_ratio=increase,crop={width}:{height}",
+                size=(width, height),
+            )
+
+        if e.effect_type in [EffectType.ZOOM, EffectType.PAN]:
+            return self.pan_zoom(stream, self.get_pan_zoom_criteria(stream, e))
+
+        if e.effect_type == EffectType.FLASH:
+            return self.flash(stream, e)
+
+        if e.effect_type == EffectType.CROP and e.method == EffectMethod.LINE_CROP:
+            effect_args: EffectArgs.CROP.LINE_CROP = e.args
+            self.require_size(stream, e)
+            line_index = str(effect_args.line_number - 1)
+            return self.line_crop(stream, effect_args.total_lines, effect_args.is_vertical, line_index)
+
+        if e.effect_type == EffectType.CROP and e.method == EffectMethod.BURST_LINE_CROP:
+            effect_args: EffectArgs.CROP.BURST_LINE_CROP = e.args
+            self.require_size(stream, e)
+            total_lines = effect_args.total_lines
+            window = f"min(trunc(t/{stream.duration / total_lines:.6f}),{total_lines - 1})"
+            line_index = f"({total_lines - 1}-{window})" if effect_args.reverse_ordering else window
+            return self.line_crop(stream, total_lines, effect_args.is_vertical, line_index)
+
+        if e.effect_type == EffectType.PLAYBACK and e.method == EffectMethod.FORWARD_REVERSE:
+            effect_args: EffectArgs.PLAYBACK.FORWARD_REVERSE = e.args
+            return self.forward_reverse(stream, float(effect_args.start_speed))
+
+        if e.effect_type == EffectType.PLAYBACK and e.method == EffectMethod.RAMP_SPEED_SEGMENTS:
+            effect_args: EffectArgs.PLAYBACK.RAMP_SPEED_SEGMENTS = e.args
+            return self.ramp_speed_segments(
+                stream,
+                speeds=effect_args.speeds,
+                ramps_count_between_speed=effect_args.ramps_count_between_speed,
+                scale_speed_to_original_duration=effect_args.scale_speed_to_original_duration,
+            )
+
+        raise FilterGraphUnsupported(f"Effect {e.effect_type} {e.method} has no ffmpeg filter equivalent")
+
+    def get_pan_zoom_criteria(self, stream: _Stream, e: VideoSegmentEffect) -> list[PanZoomEffectCriteria]:
+        duration = stream.duration
+
+        if e.method == EffectMethod.ZOOM_IN__ZOOM_OUT:
+            effect_args: EffectArgs.ZOOM.ZOOM_IN__ZOOM_OUT = e.args
+            return zoom_effect_preset.zoom_in__zoom_out_criteria(duration, effect_args.zoom_factor)
+
+        if e.method == EffectMethod.ZOOM_OUT__ZOOM_IN:
+            effect_args: EffectArgs.ZOOM.ZOOM_OUT__ZOOM_IN = e.args
+            return zoom_effect_preset.zoom_out__zoom_in_criteria(duration, effect_args.zoom_factor)
+
+        if e.method == EffectMethod.ZOOM_IN_AT_CLIP_STARTS:
+            effect_args: EffectArgs.ZOOM.ZOOM_IN_AT_CLIP_STARTS = e.args
+            return zoom_effect_preset.zoom_in_at_clip_starts_criteria(
+                duration, effect_args.zoom_factor, effect_args.zoom_duration, effect_args.easing
+            )
+
+        if e.method == EffectMethod.ZOOM_IN_AT_CLIP_ENDS:
+            effect_args: EffectArgs.ZOOM.ZOOM_IN_AT_CLIP_ENDS = e.args
+            return zoom_effect_preset.zoom_in_at_clip_ends_criteria(
+                duration, effect_args.zoom_factor, effect_args.zoom_duration, effect_args.easing
+            )
+
+        if e.method == EffectMethod.ZOOM_BUMP:
+            effect_args: EffectArgs.ZOOM.ZOOM_BUMP = e.args
+            return zoom_effect_preset.zoom_bump_criteria(
+                duration, effect_args.zoom_factor, effect_args.bump_count, effect_args.reverse
+            )
+
+        if e.method == EffectMethod.PAN_SIDE_TO_SIDE:
+            effect_args: EffectArgs.PAN.PAN_SIDE_TO_SIDE = e.args
+            size = self.require_size(stream, e)
+            return [pan_effect_preset.pan_side_to_side_criteria(duration, size, effect_args.pan, effect_args.easing)]
+
+        raise FilterGraphUnsupported(f"Effect {e.effect_type} {e.method} has no ffmpeg filter equivalent")
+
+    def pan_zoom(self, stream: _Stream, criteria_list: list[PanZoomEffectCriteria]) -> _Stream:
+        if stream.size is None:
+            raise FilterGraphUnsupported("zoom and pan require known frame size, apply fit_video_into_frame_size first")
+
+        width, height = stream.size
+
+        # Layers with non overlapping time windows are identity outside of their window,
+        # so each group of them collapses into a single zoompan filter.
+        groups: list[list[PanZoomEffectCriteria]] = []
+        for criteria in criteria_list:
+            if len(groups) > 0 and all(not self.windows_overlap(criteria, c) for c in groups[-1]):
+                groups[-1].append(criteria)
+            else:
+                groups.append([criteria])
+
+        for group in groups:
+            zoom_terms = []
+            pan_x_terms = []
+            pan_y_terms = []
+
+            for c in group:
+                active = f"gte(it,{c.start_time:.6f})*lt(it,{c.start_time + c.duration:.6f})"
+                eased = self.eased_progress(c)
+
+                zoom_terms.append(f"{active}*({c.start_zoom}+{c.end_zoom - c.start_zoom}*{eased}-1)")
+                pan_x_terms.append(f"{active}*({c.start_pan_position[0]}+trunc({c.end_pan_position[0]}*{eased}))")
+                pan_y_terms.append(f"{active}*({c.start_pan_position[1]}+trunc({c.end_pan_position[1]}*{eased}))")
+
+            zoom = "1+" + "+".join(zoom_terms)
+            x = f"clip((iw-iw/zoom)/2+{'+'.join(pan_x_terms)},0,iw-iw/zoom)"
+            y = f"clip((ih-ih/zoom)/2+{'+'.join(pan_y_terms)},0,ih-ih/zoom)"
+
+            stream = self.chain(stream, f"zoompan=z='{zoom}':x='{x}':y='{y}':d=1:s={width}x{height}:fps={self.fps}")
+
+        return stream
+
+    @staticmethod
+    def windows_overlap(a: PanZoomEffectCriteria, b: PanZoomEffectCriteria) -> bool:
+        return a.start_time < b.start_time + b.duration and b.start_time < a.start_time + a.duration
+
+    @staticmethod
+    def eased_progress(c: PanZoomEffectCriteria) -> str:
+        duration = c.duration if c.duration > 0 else 1e-6
+        progress = f"clip((it-{c.start_time:.6f})/{duration:.6f},0,1)"
+
+        if c.easing == "ease_in":
+            return f"(1-cos({progress}*PI/2))"
+
+        if c.easing == "ease_out":
+            return f"sin({progress}*PI/2)"
+
+        return progress
+
+    def flash(self, stream: _Stream, e: VideoSegmentEffect) -> _Stream:
+        width, height = self.require_size(stream, e)
+
+        if e.method == EffectMethod.FLASH:
+            effect_args: EffectArgs.FLASH.FLASH = e.args
+            flashing_times = [effect_args.time]
+            flash_duration = effect_args.flash_duration
+        elif e.method == EffectMethod.BURST_FLASH:
+            effect_args: EffectArgs.FLASH.BURST_FLASH = e.args
+            sub_duration = stream.duration / effect_args.flashes_count
+            flashing_times = [i * sub_duration for i in range(effect_args.flashes_count)]
+            flash_duration = sub_duration / 3.0
+        else:
+            raise FilterGraphUnsupported(f"Effect {e.effect_type} {e.method} has no ffmpeg filter equivalent")
+
+        color = pick_random_color() if effect_args.pick_random_flash_color else effect_args.color
+        hex_color = "0x{:02X}{:02X}{:02X}".format(*color)
+
+        for t in flashing_times:
+            flash_label = self.add(
+                [],
+                f"color=c={hex_color}:s={width}x{height}:r={self.fps}:d={stream.duration:.6f},format=rgba,"
+                f"fade=t=out:st={t:.6f}:d={flash_duration:.6f}:alpha=1",
+            )[0]
+            label = self.add(
+                [stream.label, flash_label],
+                f"overlay=enable='between(t,{t:.6f},{t + flash_duration:.6f})':format=auto",
+            )[0]
+            stream = _Stream(label=label, duration=stream.duration, size=stream.size)
+
+        return stream
+
+    def line_crop(self, stream: _Stream, total_lines: int, is_vertical: bool, line_index: str) -> _Stream:
+        width, height = stream.size
+
+        if is_vertical:
+            line_size = width / total_lines
+            crop = f"crop=w={int(line_size)}:h={height}:x='trunc({line_size:.6f}*{line_index})':y=0"
+            position = f"x='trunc({line_size:.6f}*{line_index})':y=0"
+        else:
+            line_size = height / total_lines
+            crop = f"crop=w={width}:h={int(line_size)}:x=0:y='trunc({line_size:.6f}*{line_index})'"
+            position = f"x=0:y='trunc({line_size:.6f}*{line_index})'"
+
+        line_label = self.chain(stream, crop).label
+        canvas = self.black_canvas(stream.duration)
+        label = self.add([canvas, line_label], f"overlay={position}:eof_action=repeat")[0]
+
+        return _Stream(label=label, duration=stream.duration, size=stream.size)
+
+    def ramp_speed(
+        self,
+        stream: _Stream,
+        start_speed: float,
+        end_speed: float,
+        ramps: int,
+        scale_speed_to_original_duration: bool = False,
+    ) -> _Stream:
+        # same sub clips as effects.playback.ramp_speed
+        sub_duration = stream.duration / ramps
+        speed_diff = (start_speed - end_speed) / ramps
+
+        speeds = [start_speed - (i * speed_diff) for i in range(ramps)]
+        if any(s <= 0 for s in speeds):
+            raise FilterGraphUnsupported("Ramp speed with zero or negative speed")
+
+        parts = self.split(stream, ramps)
+        ramp_labels = []
+        for i, part in enumerate(parts):
+            ramp_labels.append(
+                self.chain(
+                    part,
+                    f"trim=start={i * sub_duration:.6f}:duration={sub_duration:.6f},"
+                    f"setpts=(PTS-STARTPTS)/{speeds[i]:.6f}",
+                ).label
+            )
+
+        label = self.add(ramp_labels, f"concat=n={ramps}:v=1:a=0")[0]
+        ramped_duration = sum(sub_duration / s for s in speeds)
+
+        if scale_speed_to_original_duration:
+            label = self.add([label], f"setpts=PTS*{stream.duration / ramped_duration:.6f}")[0]
+
+        return self.normalize_frame_rate(_Stream(label=label, duration=stream.duration, size=stream.size))
+
+    def forward_reverse(self, stream: _Stream, start_speed: float) -> _Stream:
+        sub_duration = stream.duration / 2.0
+
+        half = self.chain(stream, "setpts=PTS*0.5")
+        half = self.normalize_frame_rate(_Stream(label=half.label, duration=sub_duration, size=stream.size))
+        half = self.ramp_speed(half, start_speed=start_speed, end_speed=0.1, ramps=5)
+
+        forward, backward = self.split(half, 2)
+        reversed_label = self.chain(backward, "reverse").label
+        label = self.add([forward.label, reversed_label], "concat=n=2:v=1:a=0")[0]
+
+        return self.normalize_frame_rate(_Stream(label=label, duration=stream.duration, size=stream.size))
+
+    def ramp_speed_segments(
+        self,
+        stream: _Stream,
+        speeds: list[float],
+        ramps_count_between_speed: int,
+        scale_speed_to_original_duration: bool,
+    ) -> _Stream:
+        segments_count = len(speeds) - 1
+        sub_duration = stream.duration / segments_count
+
+        ramped_labels = []
+        for i, part in enumerate(self.split(stream, segments_count)):
+            sub_stream = self.chain(
+                part, f"trim=start={i * sub_duration:.6f}:duration={sub_duration:.6f},setpts=PTS-STARTPTS"
+            )
+            sub_stream = _Stream(label=sub_stream.label, duration=sub_duration, size=stream.size)
+            ramped_labels.append(
+                self.ramp_speed(sub_stream, speeds[i], speeds[i + 1], ramps_count_between_speed).label
+            )
+
+        # ramped sub clips are already cut to sub_duration, so scaling to original duration is a no-op
+        label = self.add(ramped_labels, f"concat=n={segments_count}:v=1:a=0")[0]
+
+        return self.normalize_frame_rate(_Stream(label=label, duration=stream.duration, size=stream.size))
+
+    def add_debug_info(self, stream: _Stream, segment_config: TimelineSegmentConfig) -> _Stream:
+        return self.chain(
+            stream,
+            "drawbox=x=0:y=0:w=60:h=60:color=white:t=fill,"
+            f"drawtext=text='{segment_config.start_frame}':x=0:y=0:fontsize=14:fontcolor=black",
+        )
+
+
+def compile_segment_filtergraph(
+    segment_config: TimelineSegmentConfig,
+    global_effects: list[VideoSegmentEffect],
+    fps: int,
+    resolution: VideoResolution,
+    debug: bool = False,
+    resolve_source: Callable[[str], tuple[str, bool]] | None = None,
+    preview: bool = False,
+) -> SegmentFilterGraph:
+    compiler = SegmentFilterGraphCompiler(
+        fps=fps, resolution=resolution, debug=debug, resolve_source=resolve_source, preview=preview
+    )
+    return compiler.compile(segment_config, global_effects)
+
+
+def run_segment_filtergraph(graph: SegmentFilterGraph, output_path: str, fps: int, encoder_params: list[str]):
+    subprocess.run(graph.to_ffmpeg_args(output_path, fps, encoder_params), check=True)
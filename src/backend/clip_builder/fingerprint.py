@@ -0,0 +1,15 @@
+import hashlib
+import json
+import os
+
+
+def file_fingerprint(path: str) -> str:
+    """Cheap file identity based on size and modification time, changes whenever file content is replaced"""
+    stat = os.stat(path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def hash_value(value) -> str:
+    """Stable sha256 of a json serializable value, dict keys order does not matter"""
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
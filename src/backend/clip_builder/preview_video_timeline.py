@@ -84,7 +84,7 @@ class PreviewVideoTimeline:
         #     frame_transformations=frame_transformations,
         # )
 
-        # clip = apply_composition(clip, overlay_clips=get_flash_clips(self.resolution.size, [0], 0.15))
+        # clip = flash_frames(clip, [0], 0.15)
 
         # clip = line_crop(clip, segment.index % 5 + 1, 5,is_vertical_line=True)
 
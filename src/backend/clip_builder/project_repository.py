@@ -0,0 +1,151 @@
+import logging
+import os
+import threading
+from typing import Callable
+
+import yaml
+
+from .fingerprint import file_fingerprint
+from .timeline_config import (
+    SegmentNotFound,
+    TimelineConfig,
+    TimelinePatchError,
+    TimelineSegmentConfig,
+    TimelineVersionConflict,
+    get_change_log_path,
+    migrate_yaml_timeline,
+)
+from .video_project import VideoProjectSetup
+
+logger = logging.getLogger(__name__)
+
+
+class FileValueCache:
+    """
+    Parsed file values by path. An entry is valid while the file size and modification time are unchanged,
+    so files changed by other processes or by hand are parsed again on the next read.
+    """
+
+    def __init__(self, get_fingerprint: Callable[[str], str] = file_fingerprint):
+        self.get_fingerprint = get_fingerprint
+        self.entries: dict[str, tuple[str, object]] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, parse: Callable[[str], object]):
+        # fingerprint is taken before parsing, a file replaced during the parse is parsed again next time
+        fingerprint = self.get_fingerprint(path)
+
+        with self.lock:
+            entry = self.entries.get(path)
+
+            if entry is not None and entry[0] == fingerprint:
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+
+        value = parse(path)
+
+        with self.lock:
+            self.entries[path] = (fingerprint, value)
+
+        return value
+
+    def put(self, path: str, value):
+        """Stores a value which was just written into the file"""
+        with self.lock:
+            self.entries[path] = (self.get_fingerprint(path), value)
+
+    def discard(self, path: str):
+        with self.lock:
+            self.entries.pop(path, None)
+
+
+class ProjectRepository:
+    """
+    Process level store of project setups and timelines, hot reads skip yaml parsing.
+
+    Timelines are returned as shared objects and must not be mutated, changes are saved through save_timeline
+    and patch_segment. Setups are cached as parsed values and built on every read, so source file lists stay
+    up to date.
+    """
+
+    def __init__(self):
+        self.setups = FileValueCache()
+        self.timelines = FileValueCache(get_fingerprint=get_timeline_fingerprint)
+        # version check and write of a timeline change happen together
+        self.timeline_write_lock = threading.Lock()
+
+    def get_setup(self, project_name: str) -> VideoProjectSetup:
+        value = self.setups.get(VideoProjectSetup.get_setup_config_path(project_name), load_yaml)
+        setup = VideoProjectSetup.from_dict(value)
+
+        migrate_yaml_timeline(setup.timeline_path)
+        return setup
+
+    def save_setup(self, setup: VideoProjectSetup):
+        setup.save()
+        self.setups.put(VideoProjectSetup.get_setup_config_path(setup.project_name), setup.to_dict())
+
+    def get_timeline(self, path: str) -> TimelineConfig:
+        return self.timelines.get(path, TimelineConfig.load)
+
+    def save_timeline(self, path: str, timeline: TimelineConfig):
+        """Replaces the whole timeline, its version continues from the stored one"""
+        with self.timeline_write_lock:
+            if os.path.exists(path):
+                timeline.version = self.get_timeline(path).version + 1
+
+            timeline.save(path)
+            self.timelines.put(path, timeline)
+
+    def patch_segment(
+        self, path: str, segment_id: str, fields: dict, expected_version: int | None = None
+    ) -> tuple[TimelineConfig, TimelineSegmentConfig]:
+        """Changes fields of one segment, the change is appended to the change log of the timeline"""
+        with self.timeline_write_lock:
+            timeline = self.get_timeline(path)
+
+            if expected_version is not None and expected_version != timeline.version:
+                raise TimelineVersionConflict(
+                    f"Timeline version is {timeline.version}, change was made for version {expected_version}"
+                )
+
+            try:
+                patched_timeline, segment = timeline.patch_segment(path, segment_id, fields)
+            except (SegmentNotFound, TimelinePatchError):
+                # rejected before the change log was written
+                raise
+            except BaseException:
+                # change log can be ahead of the cached timeline, it is loaded again on the next read
+                self.timelines.discard(path)
+                raise
+
+            # readers holding the previous timeline keep an unchanged object
+            self.timelines.put(path, patched_timeline)
+            return patched_timeline, segment
+
+
+def get_timeline_fingerprint(path: str) -> str:
+    change_log_path = get_change_log_path(path)
+    change_log_fingerprint = file_fingerprint(change_log_path) if os.path.exists(change_log_path) else ""
+    return f"{file_fingerprint(path)}:{change_log_fingerprint}"
+
+
+def load_yaml(path: str):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+
+project_repository: ProjectRepository | None = None
+
+
+def get_project_repository() -> ProjectRepository:
+    global project_repository
+
+    if project_repository is None:
+        project_repository = ProjectRepository()
+
+    return project_repository
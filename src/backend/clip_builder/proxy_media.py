@@ -0,0 +1,129 @@
+import logging
+import os
+import pathlib
+import subprocess
+from dataclasses import dataclass
+from typing import Self
+
+from .video_resolution import VideoResolution
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProxyMedia:
+    """
+    Transcoded copies of a source video used for rendering instead of the original.
+
+    render_path has project resolution/fps with a short GOP, so random seeks decode only a few frames.
+    preview_path is a tiny version of it used in debug renders.
+    """
+
+    source_path: str
+    render_path: str | None
+    preview_path: str | None
+
+    def to_dict(self) -> dict:
+        return {
+            "source_path": self.source_path,
+            "render_path": self.render_path,
+            "preview_path": self.preview_path,
+        }
+
+    @staticmethod
+    def from_dict(value: dict) -> Self:
+        return ProxyMedia(
+            source_path=value["source_path"],
+            render_path=value.get("render_path"),
+            preview_path=value.get("preview_path"),
+        )
+
+
+def get_proxy_key(source_path: str) -> str:
+    # timeline stores glob paths ("./output/...") while uploads are written via pathlib ("output/...")
+    return os.path.abspath(source_path)
+
+
+def resolve_media_path(path: str, proxies: dict[str, ProxyMedia], debug: bool) -> tuple[str, bool]:
+    """Returns path that should be decoded for the source and whether it is the tiny preview proxy"""
+    proxy = proxies.get(get_proxy_key(path))
+
+    if proxy is None:
+        return path, False
+
+    proxy_path = proxy.preview_path if debug else proxy.render_path
+
+    if proxy_path is None or not os.path.exists(proxy_path):
+        return path, False
+
+    return proxy_path, debug
+
+
+def transcode_proxy(
+    source_path: str,
+    proxy_path: str,
+    resolution: VideoResolution,
+    fps: int,
+    gop_size: int,
+    encoder_params: list[str],
+):
+    # write next to the target and rename, so a half written proxy is never picked up by renders
+    partial_path = str(pathlib.Path(proxy_path).with_suffix(".partial.mp4"))
+
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-y",
+            "-loglevel",
+            "error",
+            "-i",
+            source_path,
+            "-an",
+            "-vf",
+            f"scale=w={resolution.width}:h={resolution.height}:force_original_aspect_ratio=increase"
+            f":force_divisible_by=2,fps={fps},format=yuv420p",
+            "-c:v",
+            "libx264",
+            "-g",
+            str(gop_size),
+            "-keyint_min",
+            str(gop_size),
+            "-sc_threshold",
+            "0",
+            "-bf",
+            "0",
+            "-pix_fmt",
+            "yuv420p",
+        ]
+        + encoder_params
+        + [partial_path],
+        check=True,
+    )
+
+    os.replace(partial_path, proxy_path)
+
+
+def generate_proxy_media(
+    source_path: str,
+    proxy_dir_path: str,
+    resolution: VideoResolution,
+    fps: int,
+    gop_size: int = 6,
+) -> ProxyMedia:
+    name = pathlib.Path(source_path).stem
+    render_path = f"{proxy_dir_path}/{name}.render.mp4"
+    preview_path = f"{proxy_dir_path}/{name}.preview.mp4"
+
+    logger.info(f"Generating proxies for {source_path}")
+
+    transcode_proxy(source_path, render_path, resolution, fps, gop_size, ["-preset", "veryfast", "-crf", "16"])
+    transcode_proxy(
+        source_path,
+        preview_path,
+        resolution.scaled_to_height(240),
+        fps,
+        gop_size,
+        ["-preset", "ultrafast", "-crf", "30"],
+    )
+
+    return ProxyMedia(source_path=source_path, render_path=render_path, preview_path=preview_path)
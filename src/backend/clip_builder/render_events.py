@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+from typing import Callable, Literal, Self
+
+RenderEventType = Literal["render_started", "segment_started", "segment_finished"]
+
+
+@dataclass
+class RenderEvent:
+    type: RenderEventType
+    segments_total: int = 0
+    segment_index: int | None = None
+    frames: int = 0  # frames of the segment, frames of the whole timeline for render_started
+    elapsed: float = 0.0
+    cache_hit: bool = False
+
+    def to_dict(self) -> dict:
+        return {
+            "type": self.type,
+            "segments_total": self.segments_total,
+            "segment_index": self.segment_index,
+            "frames": self.frames,
+            "elapsed": self.elapsed,
+            "cache_hit": self.cache_hit,
+        }
+
+    @staticmethod
+    def from_dict(value: dict) -> Self:
+        return RenderEvent(
+            type=value["type"],
+            segments_total=value["segments_total"],
+            segment_index=value["segment_index"],
+            frames=value["frames"],
+            elapsed=value["elapsed"],
+            cache_hit=value["cache_hit"],
+        )
+
+
+# Listeners are called synchronously by the builder, a listener raising an exception aborts the render
+RenderListener = Callable[[RenderEvent], None]
+
+
+class RenderCancelled(Exception):
+    pass
@@ -0,0 +1,448 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import logging
+import multiprocessing
+import time
+from typing import Literal, Self
+import uuid
+
+from .project_repository import get_project_repository
+from .render_events import RenderCancelled, RenderEvent
+from .timeline_config import TimelineConfig
+from .video_clip_builder import RenderBackend, VideoClipBuilder
+from .video_project import VideoProject
+
+logger = logging.getLogger(__name__)
+
+RenderJobKind = Literal["render", "preview"]
+RenderJobStatus = Literal["queued", "running", "done", "failed", "cancelled"]
+
+
+@dataclass
+class RenderJobRequest:
+    project_name: str
+    kind: RenderJobKind = "render"
+    debug: bool = False
+    workers: int = 1
+    backend: RenderBackend = "moviepy"
+    streaming: bool = False
+    segment_id: str | None = None  # preview jobs render this segment only
+    offset: float = 0.0  # preview starts at this time of the segment
+
+    def to_dict(self) -> dict:
+        return {
+            "project_name": self.project_name,
+            "kind": self.kind,
+            "debug": self.debug,
+            "workers": self.workers,
+            "backend": self.backend,
+            "streaming": self.streaming,
+            "segment_id": self.segment_id,
+            "offset": self.offset,
+        }
+
+    @staticmethod
+    def from_dict(value: dict) -> Self:
+        return RenderJobRequest(
+            project_name=value["project_name"],
+            kind=value["kind"],
+            debug=value["debug"],
+            workers=value["workers"],
+            backend=value["backend"],
+            streaming=value["streaming"],
+            segment_id=value["segment_id"],
+            offset=value["offset"],
+        )
+
+
+@dataclass
+class RenderJob:
+    id: str
+    request: RenderJobRequest
+    status: RenderJobStatus = "queued"
+    segments_total: int = 0
+    segments_done: int = 0
+    frames_total: int = 0
+    frames_done: int = 0
+    frames_rendered: int = 0
+    # segments a worker has started and not finished yet
+    segments_running: set[int] = field(default_factory=set)
+    output_path: str | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    cancel_requested: bool = False
+    # progress stream queues, None closes a stream
+    subscribers: list[asyncio.Queue] = field(default_factory=list)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def fps(self) -> float:
+        """Rendered frames per second of wall time, segments served from cache are not counted"""
+        if self.started_at is None:
+            return 0.0
+
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.frames_rendered / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        """Seconds left at the current fps, None until the first segment is rendered"""
+        if self.is_finished:
+            return 0.0
+
+        fps = self.fps
+        if fps == 0:
+            return None
+
+        return max(0, self.frames_total - self.frames_done) / fps
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "project_name": self.request.project_name,
+            "kind": self.request.kind,
+            "status": self.status,
+            "segments_total": self.segments_total,
+            "segments_done": self.segments_done,
+            "segments_running": sorted(self.segments_running),
+            "frames_total": self.frames_total,
+            "frames_done": self.frames_done,
+            "fps": self.fps,
+            "eta": self.eta,
+            "output_path": self.output_path,
+            "error": self.error,
+            "cancel_requested": self.cancel_requested,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    def apply_event(self, event: RenderEvent):
+        if event.type == "render_started":
+            self.segments_total = event.segments_total
+            self.frames_total = event.frames
+
+        if event.type == "segment_started":
+            self.segments_running.add(event.segment_index)
+
+        if event.type == "segment_finished":
+            self.segments_running.discard(event.segment_index)
+            self.segments_done += 1
+            self.frames_done += event.frames
+
+            if not event.cache_hit:
+                self.frames_rendered += event.frames
+
+        self.publish(
+            {
+                **event.to_dict(),
+                "job_id": self.id,
+                "segment_fps": event.frames / event.elapsed if event.elapsed > 0 else None,
+                "segments_done": self.segments_done,
+                "segments_running": sorted(self.segments_running),
+                "segments_total": self.segments_total,
+                "fps": self.fps,
+                "eta": self.eta,
+            }
+        )
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue of progress messages which starts with the current job state"""
+        queue = asyncio.Queue()
+        queue.put_nowait({**self.to_dict(), "type": "job_status"})
+
+        if self.is_finished:
+            queue.put_nowait(None)
+        else:
+            self.subscribers.append(queue)
+
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self.subscribers:
+            self.subscribers.remove(queue)
+
+    def publish(self, message: dict | None):
+        for queue in self.subscribers:
+            queue.put_nowait(message)
+
+
+class RenderQueueFull(Exception):
+    pass
+
+
+class RenderJobManager:
+    """
+    Runs render jobs in a pool of worker processes, so moviepy work never blocks the server event loop.
+
+    At most max_processes jobs run at once and at most max_jobs_per_project renders belong to one project,
+    renders of a project share its runtime dir. Previews write only into the segment cache and are not limited
+    per project. Jobs above that wait in a queue of max_queued jobs, submit raises RenderQueueFull once it is full.
+
+    Workers report builder events through a multiprocessing queue, cancellation is checked by the worker
+    at every builder event.
+
+    Finished jobs stay readable for finished_job_ttl seconds, at most max_finished_jobs of them are kept.
+    """
+
+    def __init__(
+        self,
+        max_processes: int = 2,
+        max_queued: int = 16,
+        max_jobs_per_project: int = 1,
+        max_finished_jobs: int = 256,
+        finished_job_ttl: float = 60 * 60,
+    ):
+        self.max_processes = max_processes
+        self.max_queued = max_queued
+        self.max_jobs_per_project = max_jobs_per_project
+        self.max_finished_jobs = max_finished_jobs
+        self.finished_job_ttl = finished_job_ttl
+
+        self.jobs: dict[str, RenderJob] = {}
+        # ids of finished jobs in finish order
+        self.finished: deque[str] = deque()
+        self.queued: deque[RenderJob] = deque()
+        self.running: set[str] = set()
+
+        self.executor: ProcessPoolExecutor | None = None
+        self.sync_manager = None
+        self.events = None
+        self.cancel_events: dict[str, object] = {}
+        self.futures: dict[str, asyncio.Future] = {}
+        self.events_task: asyncio.Task | None = None
+
+    def start(self):
+        if self.executor is not None:
+            return
+
+        self.sync_manager = multiprocessing.Manager()
+        self.events = self.sync_manager.Queue()
+        self.executor = ProcessPoolExecutor(max_workers=self.max_processes)
+        self.events_task = asyncio.get_running_loop().create_task(self.receive_events())
+
+    async def shutdown(self):
+        for job in list(self.queued):
+            self.finish(job, "cancelled")
+
+        self.queued.clear()
+
+        if self.executor is None:
+            return
+
+        for cancel_event in self.cancel_events.values():
+            cancel_event.set()
+
+        await asyncio.to_thread(self.executor.shutdown, wait=True, cancel_futures=True)
+
+        # running jobs are finished by receive_events, after the events their workers sent
+        await asyncio.gather(*[self.jobs[job_id].done.wait() for job_id in self.running])
+
+        self.events.put(None)
+        await self.events_task
+        self.sync_manager.shutdown()
+        self.executor = None
+
+    def submit(self, request: RenderJobRequest) -> RenderJob:
+        if len(self.queued) >= self.max_queued:
+            raise RenderQueueFull(f"Render queue is full ({self.max_queued} jobs)")
+
+        self.start()
+
+        job = RenderJob(id=str(uuid.uuid4()), request=request)
+        self.jobs[job.id] = job
+        self.queued.append(job)
+
+        logger.info(f"Render job {job.id} queued for {request.project_name} ({request.kind})")
+
+        self.dispatch()
+        return job
+
+    def get(self, job_id: str) -> RenderJob | None:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> RenderJob | None:
+        job = self.jobs.get(job_id)
+
+        if job is None or job.is_finished:
+            return job
+
+        job.cancel_requested = True
+
+        if job in self.queued:
+            self.queued.remove(job)
+            self.finish(job, "cancelled")
+            return job
+
+        self.cancel_events[job.id].set()
+        return job
+
+    def dispatch(self):
+        for job in list(self.queued):
+            if len(self.running) >= self.max_processes:
+                return
+
+            is_render = job.request.kind == "render"
+
+            if is_render and self.get_running_renders(job.request.project_name) >= self.max_jobs_per_project:
+                continue
+
+            self.queued.remove(job)
+            self.run(job)
+
+    def get_running_renders(self, project_name: str) -> int:
+        return sum(
+            1
+            for job_id in self.running
+            if self.jobs[job_id].request.kind == "render" and self.jobs[job_id].request.project_name == project_name
+        )
+
+    def run(self, job: RenderJob):
+        job.status = "running"
+        job.started_at = time.time()
+        self.running.add(job.id)
+
+        cancel_event = self.sync_manager.Event()
+        self.cancel_events[job.id] = cancel_event
+
+        future = asyncio.wrap_future(
+            self.executor.submit(run_render_job, job.id, job.request.to_dict(), self.events, cancel_event)
+        )
+        self.futures[job.id] = future
+        future.add_done_callback(lambda f: self.on_job_done(job))
+
+    def on_job_done(self, job: RenderJob):
+        # the marker is queued behind every event the worker sent, so progress is complete when the job finishes
+        self.events.put((job.id, None))
+
+    def complete(self, job: RenderJob):
+        future = self.futures.pop(job.id)
+        self.running.discard(job.id)
+        self.cancel_events.pop(job.id, None)
+
+        if future.cancelled():
+            self.finish(job, "cancelled")
+        elif isinstance(future.exception(), RenderCancelled):
+            self.finish(job, "cancelled")
+        elif future.exception() is not None:
+            logger.error(f"Render job {job.id} failed: {future.exception()!r}")
+            self.finish(job, "failed", error=repr(future.exception()))
+        else:
+            job.output_path = future.result()
+            self.finish(job, "done")
+
+        self.dispatch()
+
+    def finish(self, job: RenderJob, status: RenderJobStatus, error: str | None = None):
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        # segments left running by a cancelled or failed render are not tracked by the job anymore
+        job.segments_running.clear()
+        job.done.set()
+
+        job.publish({**job.to_dict(), "type": "job_finished"})
+        job.publish(None)
+        job.subscribers.clear()
+
+        logger.info(f"Render job {job.id} {status}")
+
+        self.finished.append(job.id)
+        self.drop_finished_jobs()
+
+    def drop_finished_jobs(self):
+        expired_at = time.time() - self.finished_job_ttl
+
+        while len(self.finished) > 0:
+            job = self.jobs[self.finished[0]]
+
+            if len(self.finished) <= self.max_finished_jobs and job.finished_at > expired_at:
+                return
+
+            self.finished.popleft()
+            del self.jobs[job.id]
+
+    async def receive_events(self):
+        while True:
+            message = await asyncio.to_thread(self.events.get)
+
+            if message is None:
+                return
+
+            job_id, event_value = message
+            job = self.jobs.get(job_id)
+
+            if job is None or job.is_finished:
+                continue
+
+            if event_value is None:
+                self.complete(job)
+            else:
+                job.apply_event(RenderEvent.from_dict(event_value))
+
+    async def wait(self, job: RenderJob) -> RenderJob:
+        # waits on the job object, a finished job can be dropped from jobs before the waiter resumes
+        await job.done.wait()
+        return job
+
+
+render_job_manager: RenderJobManager | None = None
+
+
+def get_render_job_manager() -> RenderJobManager:
+    global render_job_manager
+
+    if render_job_manager is None:
+        render_job_manager = RenderJobManager()
+
+    return render_job_manager
+
+
+def get_job_clip_builder(request: RenderJobRequest) -> tuple[VideoProject, TimelineConfig, VideoClipBuilder]:
+    project_setup = get_project_repository().get_setup(request.project_name)
+    timeline_config = get_project_repository().get_timeline(project_setup.timeline_path)
+    project = VideoProject(project_setup=project_setup)
+
+    clip_builder = project.get_clip_builder(workers=request.workers, backend=request.backend)
+    clip_builder.set_debug(request.debug)
+    clip_builder.set_preview(request.kind == "preview")
+
+    return project, timeline_config, clip_builder
+
+
+def get_cached_preview(request: RenderJobRequest) -> str | None:
+    """Path of an already rendered preview, so cached previews are answered without a job"""
+    _, timeline_config, clip_builder = get_job_clip_builder(request)
+    return clip_builder.get_cached_segment_preview(timeline_config, request.segment_id, request.offset)
+
+
+def run_render_job(job_id: str, request_value: dict, events, cancel_event) -> str:
+    """Entry point executed in worker process of RenderJobManager, returns the output clip path"""
+    request = RenderJobRequest.from_dict(request_value)
+    project, timeline_config, clip_builder = get_job_clip_builder(request)
+
+    def report(event: RenderEvent):
+        # checked on segment starts and finishes, so parallel renders stop after the segments in progress
+        if cancel_event.is_set():
+            raise RenderCancelled(f"Render job {job_id} cancelled")
+
+        events.put((job_id, event.to_dict()))
+
+    clip_builder.add_listener(report)
+
+    if request.kind == "preview":
+        return asyncio.run(clip_builder.build_segment_preview(timeline_config, request.segment_id, request.offset))
+
+    if request.streaming:
+        return asyncio.run(project.build_clip_with_audio_streaming(clip_builder, timeline_config))
+
+    clip_path = asyncio.run(clip_builder.build_clip(timeline_config))
+    return project.save_clip_with_audio(clip_path=clip_path)
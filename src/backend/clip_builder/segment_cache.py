@@ -0,0 +1,143 @@
+import logging
+import os
+import pathlib
+import time
+import uuid
+from typing import Callable
+
+from .fingerprint import file_fingerprint, hash_value
+from .timeline_config import TimelineSegmentConfig, VideoSegmentEffect
+
+logger = logging.getLogger(__name__)
+
+# files are named by content key, so a path never changes content
+SEGMENT_CACHE_PATH = "./cache/segments"
+
+
+def get_segment_cache_key(
+    segment: TimelineSegmentConfig,
+    global_effects: list[VideoSegmentEffect],
+    fps: int,
+    size: tuple[int, int],
+    debug: bool,
+    backend: str = "moviepy",
+    resolve_source: Callable[[str], tuple[str, bool]] | None = None,
+    preview: bool = False,
+) -> str:
+    """
+    Content hash of everything that affects rendered segment frames.
+
+    Ids and etags are left out so identical segments share the cache across renders and projects.
+    Segment position on the timeline only matters in debug mode where the start frame is drawn on video.
+    Sources are hashed by the file which is actually decoded (proxy or original).
+    """
+
+    def source_path(path: str) -> str:
+        return path if resolve_source is None else resolve_source(path)[0]
+
+    def effect_value(effect: VideoSegmentEffect) -> dict:
+        value = effect.to_dict()
+        value.pop("id")
+        return value
+
+    return hash_value(
+        {
+            "videos": [
+                {
+                    "path": str(pathlib.Path(source_path(v.path)).resolve()),
+                    "fingerprint": file_fingerprint(source_path(v.path)),
+                    "start_time": v.start_time,
+                }
+                for v in segment.videos
+            ],
+            "is_split_screen": segment.is_split_screen,
+            "duration": segment.duration,
+            "duration_frame": segment.duration_frame,
+            "start_frame": segment.start_frame if debug else None,
+            "effects": [effect_value(e) for e in global_effects + segment.effects],
+            "fps": fps,
+            "size": list(size),
+            "debug": debug,
+            "preview": preview,
+            "backend": backend,
+        }
+    )
+
+
+class SegmentCache:
+    """
+    Rendered segments stored by content key with a size budget.
+
+    Access time of a file is bumped on every hit, eviction removes least recently used files first.
+    """
+
+    def __init__(self, path: str = SEGMENT_CACHE_PATH, max_size_bytes: int = 20 * 1024**3):
+        self.path = path
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.path, exist_ok=True)
+
+    def get(self, key: str) -> str | None:
+        cache_path = self.get_cache_path(key)
+
+        try:
+            stat = os.stat(cache_path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        os.utime(cache_path, ns=(time.time_ns(), stat.st_mtime_ns))
+        self.hits += 1
+        return cache_path
+
+    def get_write_path(self, key: str) -> str:
+        # unique name, so concurrent renders of the same segment never write into the same file
+        return f"{self.path}/{key}.{uuid.uuid4()}.partial.mp4"
+
+    def put(self, key: str, written_path: str) -> str:
+        cache_path = self.get_cache_path(key)
+        os.replace(written_path, cache_path)
+        return cache_path
+
+    def discard(self, written_path: str):
+        pathlib.Path(written_path).unlink(missing_ok=True)
+
+    def evict(self, protected: set[str] | None = None):
+        protected_paths = {str(pathlib.Path(p).resolve()) for p in (protected or set())}
+
+        entries = []
+        total_size = 0
+
+        for p in pathlib.Path(self.path).glob("*.mp4"):
+            if p.name.endswith(".partial.mp4"):
+                continue
+
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                continue
+
+            total_size += stat.st_size
+            entries.append((stat.st_atime_ns, stat.st_size, p))
+
+        if total_size <= self.max_size_bytes:
+            return
+
+        for _, file_size, p in sorted(entries, key=lambda e: e[0]):
+            if total_size <= self.max_size_bytes:
+                break
+
+            if str(p.resolve()) in protected_paths:
+                continue
+
+            p.unlink(missing_ok=True)
+            total_size -= file_size
+            self.evictions += 1
+
+    def log_stats(self):
+        logger.info(f"Segment cache: {self.hits} hits, {self.misses} misses, {self.evictions} evictions")
+
+    def get_cache_path(self, key: str) -> str:
+        return f"{self.path}/{key}.mp4"
@@ -0,0 +1,74 @@
+import logging
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+from moviepy import VideoClip
+
+logger = logging.getLogger(__name__)
+
+
+class SourceClipPool:
+    """
+    Opened source clips shared between segments of a render.
+
+    Segments referencing the same source reuse its ffmpeg reader and seek within it instead of
+    probing and opening the file again. Clips handed out by the pool must not be closed by callers.
+
+    A clip is checked out by one use until release is called, cells of a segment reading the same source at
+    different times get separate readers, so they do not make one reader seek back and forth on every frame.
+    """
+
+    def __init__(self, max_size: int = 8):
+        self.max_size = max_size
+        self.clips: OrderedDict[Hashable, list[VideoClip]] = OrderedDict()
+        self.checked_out: set[int] = set()
+        self.opens = 0
+        self.reuses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, open_clip: Callable[[], VideoClip]) -> VideoClip:
+        clips = self.clips.setdefault(key, [])
+        self.clips.move_to_end(key)
+
+        for clip in clips:
+            if id(clip) not in self.checked_out:
+                self.checked_out.add(id(clip))
+                self.reuses += 1
+                return clip
+
+        clip = open_clip()
+        clips.append(clip)
+        self.checked_out.add(id(clip))
+        self.opens += 1
+        return clip
+
+    def release(self):
+        """Returns every checked out clip to the pool, call it when the previous segment is done"""
+        self.checked_out.clear()
+
+    def trim(self):
+        """Closes least recently used clips over the size limit, call it when no segment is being built"""
+        self.release()
+
+        while self.size > self.max_size:
+            key, clips = next(iter(self.clips.items()))
+            clips.pop(0).close()
+            self.evictions += 1
+
+            if len(clips) == 0:
+                del self.clips[key]
+
+    @property
+    def size(self) -> int:
+        return sum(len(clips) for clips in self.clips.values())
+
+    def close(self):
+        for clips in self.clips.values():
+            for clip in clips:
+                clip.close()
+
+        self.clips.clear()
+        self.checked_out.clear()
+
+    def log_stats(self):
+        logger.info(f"Source clip pool: {self.opens} opens, {self.reuses} opens avoided, {self.evictions} evictions")
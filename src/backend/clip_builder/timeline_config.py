@@ -1,14 +1,47 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 import logging
+import os
+import pathlib
 from typing import Self
-import uuid
 
+import orjson
 import yaml
 
 from .effects_descriptor import EffectArgsBase, EffectMethod, EffectType, build_effect_args
 
 logger = logging.getLogger(__name__)
 
+# libyaml bindings are an optional part of PyYAML builds, pure Python ones are used without them
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+# segment fields changed by patches, fields which move other segments on the timeline are set by upsert only
+PATCHABLE_SEGMENT_FIELDS = ["effects", "videos", "is_split_screen", "etag"]
+
+# change log entries after which the timeline file is rewritten and the log removed
+TIMELINE_COMPACT_CHANGES = 200
+
+
+def is_yaml_path(path: str) -> bool:
+    return str(path).lower().endswith((".yaml", ".yml"))
+
+
+def get_change_log_path(path: str) -> str:
+    return str(pathlib.Path(path).with_suffix(".changes.jsonl"))
+
+
+class SegmentNotFound(Exception):
+    pass
+
+
+class TimelinePatchError(Exception):
+    pass
+
+
+class TimelineVersionConflict(Exception):
+    pass
+
 
 @dataclass
 class AudioSegment:
@@ -174,9 +207,17 @@ class TimelineConfig:
     fps: int
     size: tuple[int, int]
     audio_segments: list[AudioSegment]
+    # incremented by every saved change, patches of an older version are rejected
+    version: int = 0
+    # change log entries on top of the timeline file
+    changes_since_snapshot: int = field(default=0, compare=False, repr=False)
+
+    def __post_init__(self):
+        self.segment_positions: dict[str, int] = {s.id: i for i, s in enumerate(self.segments)}
 
     def to_dict(self) -> dict:
         return {
+            "version": self.version,
             "fps": self.fps,
             "size": list(self.size),
             "duration": self.duration,
@@ -201,35 +242,158 @@ class TimelineConfig:
 
         return TimelineConfig(
             duration=timeline_duration,
-            effects=[VideoSegmentEffect.from_dict(x) for x in value.get("effects", [])],
+            effects=[VideoSegmentEffect.from_dict(x) for x in value.get("effects") or []],
             segments=segments,
             fps=value["fps"],
             size=(value["size"][0], value["size"][1]),
             audio_segments=[AudioSegment.from_dict(x) for x in value.get("audio_segments", [])],
+            version=value.get("version", 0),
         )
 
     def save(self, path: str):
-        with open(path, "w") as f:
-            f.write(yaml.dump(self.to_dict(), sort_keys=False, indent=2))
+        """
+        Timeline file is json by default, .yaml and .yml paths are written as YAML.
+
+        Json file is replaced atomically and contains every change, so the change log next to it is removed.
+        """
+        if is_yaml_path(path):
+            self.save_yaml(path)
+            return
+
+        partial_path = f"{path}.partial"
+        with open(partial_path, "wb") as f:
+            f.write(orjson.dumps(self.to_dict()))
+
+        os.replace(partial_path, path)
+
+        if os.path.exists(get_change_log_path(path)):
+            os.remove(get_change_log_path(path))
+
+        self.changes_since_snapshot = 0
 
     @staticmethod
     def load(path):
         logger.info(f"Load timeline config {path}")
+
+        if is_yaml_path(path):
+            return TimelineConfig.load_yaml(path)
+
+        with open(path, "rb") as f:
+            timeline = TimelineConfig.from_dict(value=orjson.loads(f.read()))
+
+        timeline.replay_change_log(get_change_log_path(path))
+        return timeline
+
+    def replay_change_log(self, change_log_path: str):
+        if not os.path.exists(change_log_path):
+            return
+
+        with open(change_log_path, "rb") as f:
+            for line in f:
+                try:
+                    change = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # entry of an interrupted write, changes appended after it are still valid
+                    logger.warning(f"Skip incomplete change in {change_log_path}")
+                    continue
+
+                # changes up to the file version are already in it when compaction was interrupted
+                if change["version"] <= self.version:
+                    continue
+
+                self.apply_change(change)
+                self.changes_since_snapshot += 1
+
+    def apply_change(self, change: dict):
+        """Replaces the patched segment with a new object, readers holding the old segment are not affected"""
+        fields: dict = change["fields"]
+        unknown_fields = [f for f in fields if f not in PATCHABLE_SEGMENT_FIELDS]
+
+        if len(unknown_fields) > 0:
+            raise TimelinePatchError(f"Segment fields {unknown_fields} can not be patched")
+
+        position = self.get_segment_position(change["segment_id"])
+        segment_value = {**self.segments[position].to_dict(), **fields}
+
+        try:
+            segment = TimelineSegmentConfig.from_dict(segment_value, index=position)
+        except Exception as e:
+            # effects and their args raise plain exceptions on malformed values
+            raise TimelinePatchError(f"Invalid segment patch: {e!r}") from e
+
+        self.segments[position] = segment
+        self.version = change["version"]
+
+    def patch_segment(self, path: str, segment_id: str, fields: dict) -> tuple[Self, TimelineSegmentConfig]:
+        """
+        Returns a patched copy of the timeline and appends the change to the change log, the timeline file is
+        rewritten only on compaction. The copy gets its own segments list, so this timeline stays unchanged.
+        """
+        change = {"version": self.version + 1, "segment_id": segment_id, "fields": fields}
+
+        timeline = replace(self, segments=list(self.segments))
+        timeline.apply_change(change)
+
+        append_change_log_line(get_change_log_path(path), orjson.dumps(change) + b"\n")
+
+        timeline.changes_since_snapshot += 1
+
+        if timeline.changes_since_snapshot >= TIMELINE_COMPACT_CHANGES:
+            logger.info(f"Compact timeline config {path}, {timeline.changes_since_snapshot} changes")
+            timeline.save(path)
+
+        return timeline, timeline.get_segment(segment_id)
+
+    def save_yaml(self, path: str):
+        with open(path, "w") as f:
+            f.write(self.to_yaml())
+
+    @staticmethod
+    def load_yaml(path):
         with open(path, "r") as f:
-            return TimelineConfig.from_dict(value=yaml.safe_load(f))
+            return TimelineConfig.from_yaml(f.read())
 
-    def copy_to_single_segment_timeline(self, segment_id: str):
+    def to_yaml(self) -> str:
+        return yaml.dump(self.to_dict(), Dumper=YamlDumper, sort_keys=False, indent=2)
 
-        segment = [s for s in self.segments if s.id == segment_id][0]
-        segment.start_time = 0
-        segment.end_time = segment.duration
-        segment.etag = str(uuid.uuid4())
+    @staticmethod
+    def from_yaml(value: str) -> Self:
+        return TimelineConfig.from_dict(value=yaml.load(value, Loader=YamlLoader))
 
-        return TimelineConfig(
-            effects=self.effects,
-            duration=segment.duration,
-            fps=self.fps,
-            segments=[segment],
-            size=self.size,
-            audio_segments=self.audio_segments,
-        )
+    def get_segment_position(self, segment_id: str) -> int:
+        position = self.segment_positions.get(segment_id)
+
+        if position is None:
+            raise SegmentNotFound(f"Segment {segment_id} does not exists")
+
+        return position
+
+    def get_segment(self, segment_id: str) -> TimelineSegmentConfig:
+        return self.segments[self.get_segment_position(segment_id)]
+
+
+def append_change_log_line(change_log_path: str, line: bytes):
+    """Appends a line to the change log, a partial last line left by an interrupted write is cut off first"""
+    with open(change_log_path, "ab+") as f:
+        size = f.seek(0, os.SEEK_END)
+
+        if size > 0:
+            f.seek(size - 1)
+
+            if f.read(1) != b"\n":
+                # log is bounded by compaction, so reading it whole is cheap
+                f.seek(0)
+                f.truncate(f.read().rfind(b"\n") + 1)
+
+        f.write(line)
+
+
+def migrate_yaml_timeline(path: str):
+    """Converts timeline.yaml of projects created before json storage into the json timeline at path"""
+    yaml_path = str(pathlib.Path(path).with_suffix(".yaml"))
+
+    if os.path.exists(path) or not os.path.exists(yaml_path):
+        return
+
+    logger.info(f"Migrate timeline config {yaml_path} to {path}")
+    TimelineConfig.load_yaml(yaml_path).save(path)
@@ -1,8 +1,15 @@
 import asyncio
 import logging
-from dataclasses import dataclass
-
-from moviepy import ColorClip, VideoClip, VideoFileClip, vfx, concatenate_videoclips, TextClip, CompositeVideoClip
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Literal, Self
+
+import numpy as np
+from moviepy import ColorClip, VideoClip, VideoFileClip, concatenate_videoclips, TextClip, CompositeVideoClip
 from tqdm import tqdm
 import pathlib
 import subprocess
@@ -14,14 +21,28 @@ from .effect_presets import pan as pan_effect_preset
 from .effect_presets import zoom as zoom_effect_preset
 from .effects import crop as crop_effects
 from .effects import playback as playback_effects
+from .effects.frame_buffer import FrameBufferPool, FrameBufferStats, FrameRingBuffer, with_frame_buffer_pool
 from .effects.split_screen import split_screen_clips, get_positions_from_layout, SplitScreenCriteria
-from .timeline_config import TimelineConfig, EffectType, EffectMethod, VideoSegmentEffect
-from .video_project import TimelineSegmentConfig
+from .timeline_config import TimelineConfig, EffectType, EffectMethod, VideoSegmentEffect, TimelineSegmentConfig
 from .video_resolution import VideoResolution
 from .effects_descriptor import EffectArgs
+from .ffmpeg_filtergraph import FilterGraphUnsupported, compile_segment_filtergraph, run_segment_filtergraph
+from .proxy_media import ProxyMedia, get_proxy_key, resolve_media_path
+from .render_events import RenderEvent, RenderListener
+from .fingerprint import hash_value
+from .segment_cache import SegmentCache, get_segment_cache_key
+from .source_clip_pool import SourceClipPool
 
 logger = logging.getLogger(__name__)
 
+RenderBackend = Literal["moviepy", "ffmpeg"]
+
+# how often parallel renders collect segment starts reported by workers
+SEGMENT_STARTED_POLL_SECONDS = 0.5
+
+# preview renders match the height of preview proxies, so proxies are decoded without scaling
+PREVIEW_HEIGHT = 240
+
 
 @dataclass
 class VideoClipBuilder:
@@ -29,6 +50,48 @@ class VideoClipBuilder:
     resolution: VideoResolution
     temp_path: str
     debug: bool = False
+    preview: bool = False
+    workers: int = 1
+    backend: RenderBackend = "moviepy"
+    segment_cache: SegmentCache = field(default_factory=SegmentCache)
+    source_clip_pool: SourceClipPool = field(default_factory=SourceClipPool)
+    proxies: dict[str, ProxyMedia] = field(default_factory=dict)
+    # memory budget of a reverse playback frame buffer, frames above it spill into temp_path
+    reverse_frame_buffer_bytes: int = 256 * 1024**2
+    frame_buffer_stats: FrameBufferStats = field(default_factory=FrameBufferStats)
+    # effects write output frames into preallocated pool buffers instead of new arrays
+    reuse_frame_buffers: bool = False
+    frame_buffer_pool: FrameBufferPool = field(default_factory=FrameBufferPool)
+    # progress listeners of the render, not shipped to worker processes
+    listeners: list[RenderListener] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "fps": self.fps,
+            "size": list(self.resolution.size),
+            "temp_path": self.temp_path,
+            "debug": self.debug,
+            "preview": self.preview,
+            "backend": self.backend,
+            "proxies": [p.to_dict() for p in self.proxies.values()],
+            "reverse_frame_buffer_bytes": self.reverse_frame_buffer_bytes,
+            "reuse_frame_buffers": self.reuse_frame_buffers,
+        }
+
+    @staticmethod
+    def from_dict(value: dict) -> Self:
+        # resolution is stored already scaled by set_debug, so debug flag is applied as is
+        return VideoClipBuilder(
+            fps=value["fps"],
+            resolution=VideoResolution(size=(value["size"][0], value["size"][1])),
+            temp_path=value["temp_path"],
+            debug=value["debug"],
+            preview=value["preview"],
+            backend=value["backend"],
+            proxies={get_proxy_key(p["source_path"]): ProxyMedia.from_dict(p) for p in value["proxies"]},
+            reverse_frame_buffer_bytes=value["reverse_frame_buffer_bytes"],
+            reuse_frame_buffers=value["reuse_frame_buffers"],
+        )
 
     async def build_clip(self, config: TimelineConfig) -> str:
         segments = await self.build_segment_clips(config)
@@ -57,76 +120,489 @@ class VideoClipBuilder:
 
         return chained_clip_path
 
+    async def build_clip_with_audio_streaming(self, config: TimelineConfig, audio_path: str, output_path: str) -> str:
+        """
+        Single pass render: frames of every segment are piped into one long-lived ffmpeg encoder which also
+        muxes the audio track, so no intermediate segment files, concat or mux passes are needed.
+
+        Segments are produced sequentially, segment cache and worker processes are not used in this mode.
+        """
+        width, height = self.resolution.size
+
+        args = (
+            [
+                "ffmpeg",
+                "-y",
+                "-loglevel",
+                "error",
+                "-f",
+                "rawvideo",
+                "-pix_fmt",
+                "rgb24",
+                "-s",
+                f"{width}x{height}",
+                "-r",
+                str(self.fps),
+                "-i",
+                "-",
+                "-i",
+                audio_path,
+                "-map",
+                "0:v:0",
+                "-map",
+                "1:a:0",
+            ]
+            + self.get_encoder_params()
+            + ["-c:a", "aac", "-shortest", output_path]
+        )
+
+        process = subprocess.Popen(args, stdin=subprocess.PIPE)
+
+        progress_bar = tqdm(total=len(config.segments))
+        progress_bar.set_description("Streaming segments")
+
+        try:
+            self.emit(
+                RenderEvent(
+                    type="render_started",
+                    segments_total=len(config.segments),
+                    frames=sum(s.duration_frame for s in config.segments),
+                )
+            )
+
+            for segment in config.segments:
+                self.emit(RenderEvent(type="segment_started", segment_index=segment.index))
+                started_at = time.perf_counter()
+
+                segment_clip = self.compose_segment_clip(segment, config.effects)
+
+                # frame count comes from the timeline grid, so segments never drift from the audio
+                for i in range(segment.duration_frame):
+                    frame = segment_clip.get_frame(i / self.fps)
+
+                    if frame.shape[0] != height or frame.shape[1] != width:
+                        raise Exception(
+                            f"Segment {segment.index} frame size {frame.shape[1]}x{frame.shape[0]} "
+                            f"does not match output size {width}x{height}"
+                        )
+
+                    process.stdin.write(np.ascontiguousarray(frame[:, :, :3], dtype=np.uint8).data)
+
+                self.source_clip_pool.trim()
+                progress_bar.update(1)
+
+                self.emit(
+                    RenderEvent(
+                        type="segment_finished",
+                        segment_index=segment.index,
+                        frames=segment.duration_frame,
+                        elapsed=time.perf_counter() - started_at,
+                    )
+                )
+                await asyncio.sleep(0)
+
+            process.stdin.close()
+            return_code = process.wait()
+
+            if return_code != 0:
+                raise subprocess.CalledProcessError(return_code, args)
+
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+
+        finally:
+            progress_bar.close()
+            self.source_clip_pool.close()
+
+        self.source_clip_pool.log_stats()
+        self.log_frame_buffer_stats()
+
+        return output_path
+
+    def log_frame_buffer_stats(self):
+        stats = self.frame_buffer_stats
+        logger.info(
+            f"Reverse frame buffers: {stats.seeks_avoided} seeks avoided, {stats.frames_decoded} frames decoded, "
+            f"{stats.frames_spilled} frames spilled to disk"
+        )
+
+        if self.reuse_frame_buffers:
+            logger.info(
+                f"Frame buffer pool: {self.frame_buffer_pool.allocations} allocations, "
+                f"{self.frame_buffer_pool.reuses} reuses"
+            )
+
+    def add_listener(self, listener: RenderListener):
+        self.listeners.append(listener)
+
+    def emit(self, event: RenderEvent):
+        for listener in self.listeners:
+            listener(event)
+
     def set_debug(self, debug: bool):
         self.debug = debug
 
         if not debug:
             return
 
-        debug_height = 240
-        scale = self.resolution.height / debug_height
-        debug_width = int(self.resolution.width / scale)
-        if debug_width % 2 != 0:
-            debug_width += 1
+        self.resolution = self.resolution.scaled_to_height(240)
+
+    def set_preview(self, preview: bool):
+        """Preview renders decode preview proxies at low resolution and encode with the fastest preset"""
+        self.preview = preview
+
+        if not preview:
+            return
+
+        self.resolution = self.resolution.scaled_to_height(PREVIEW_HEIGHT)
+
+    def get_segment_preview_cache_key(self, config: TimelineConfig, segment_id: str, offset: float) -> tuple[str, int]:
+        """Cache key of a segment preview and its first frame, offset is rounded to the nearest frame"""
+        segment = config.get_segment(segment_id)
+        offset_frame = min(max(0, round(offset * self.fps)), max(0, segment.duration_frame - 1))
+
+        segment_key = self.get_segment_cache_key(segment, config.effects)
+        return (segment_key if offset_frame == 0 else hash_value([segment_key, offset_frame])), offset_frame
+
+    def get_cached_segment_preview(self, config: TimelineConfig, segment_id: str, offset: float = 0.0) -> str | None:
+        cache_key, _ = self.get_segment_preview_cache_key(config, segment_id, offset)
+        return self.segment_cache.get(cache_key)
+
+    async def build_segment_preview(self, config: TimelineConfig, segment_id: str, offset: float = 0.0) -> str:
+        """
+        Renders one segment into the segment cache and returns the cached file, no concat pass is needed.
+
+        With offset the preview starts at that frame of the segment, effects keep their timing of the full segment.
+        """
+        cache_key, offset_frame = self.get_segment_preview_cache_key(config, segment_id, offset)
+        segment = config.get_segment(segment_id)
+
+        self.emit(
+            RenderEvent(type="render_started", segments_total=1, frames=segment.duration_frame - offset_frame)
+        )
+
+        preview_path = self.segment_cache.get(cache_key)
+        cache_hit = preview_path is not None
+        started_at = time.perf_counter()
+
+        if preview_path is None:
+            self.emit(RenderEvent(type="segment_started", segment_index=segment.index))
+            write_path = self.segment_cache.get_write_path(cache_key)
+
+            try:
+                segment_clip = self.compose_segment_clip(segment, config.effects)
+
+                if offset_frame > 0:
+                    segment_clip = segment_clip.subclipped(offset_frame / self.fps)
+
+                self.write_video_file(segment_clip, write_path)
+            except BaseException:
+                self.segment_cache.discard(write_path)
+                raise
+
+            finally:
+                self.source_clip_pool.close()
 
-        self.resolution = VideoResolution(size=(debug_width, debug_height))
+            preview_path = self.segment_cache.put(cache_key, write_path)
+
+            self.segment_cache.evict(protected={preview_path})
+            self.segment_cache.log_stats()
+
+        self.emit(
+            RenderEvent(
+                type="segment_finished",
+                segment_index=segment.index,
+                frames=segment.duration_frame - offset_frame,
+                elapsed=time.perf_counter() - started_at,
+                cache_hit=cache_hit,
+            )
+        )
+
+        await asyncio.sleep(0)
+        return preview_path
 
     async def build_segment_clips(self, config: TimelineConfig):
+        if self.workers > 1:
+            return await self.build_segment_clips_in_parallel(config)
 
         progress_bar = tqdm(total=len(config.segments))
         progress_bar.set_description("Building segments")
         segment_clips: list[str] = []
 
         try:
+            self.emit(
+                RenderEvent(
+                    type="render_started",
+                    segments_total=len(config.segments),
+                    frames=sum(s.duration_frame for s in config.segments),
+                )
+            )
+
             for segment in config.segments:
-                segment_clip_path = f"{self.temp_path}/{segment.etag}.mp4"
+                cache_key = self.get_segment_cache_key(segment, config.effects)
+                segment_clip_path = self.segment_cache.get(cache_key)
+                cache_hit = segment_clip_path is not None
+                started_at = time.perf_counter()
+
+                if segment_clip_path is None:
+                    self.emit(RenderEvent(type="segment_started", segment_index=segment.index))
+                    write_path = self.segment_cache.get_write_path(cache_key)
+
+                    try:
+                        await self.write_segment_clip(write_path, segment, config.effects)
+                    except BaseException:
+                        self.segment_cache.discard(write_path)
+                        raise
+
+                    segment_clip_path = self.segment_cache.put(cache_key, write_path)
+                    self.source_clip_pool.trim()
 
                 segment_clips.append(segment_clip_path)
                 progress_bar.update(1)
 
-                if pathlib.Path(segment_clip_path).exists():
-                    continue
+                self.emit(
+                    RenderEvent(
+                        type="segment_finished",
+                        segment_index=segment.index,
+                        frames=segment.duration_frame,
+                        elapsed=time.perf_counter() - started_at,
+                        cache_hit=cache_hit,
+                    )
+                )
+
+        finally:
+            progress_bar.close()
+            self.source_clip_pool.close()
+
+        self.source_clip_pool.log_stats()
+        self.log_frame_buffer_stats()
+
+        self.segment_cache.evict(protected=set(segment_clips))
+        self.segment_cache.log_stats()
+
+        return segment_clips
+
+    async def build_segment_clips_in_parallel(self, config: TimelineConfig):
+        """
+        Renders segments in a pool of worker processes.
 
-                if segment.is_split_screen:
-                    await self.write_spit_screen_clip(segment_clip_path, segment, config.effects)
-                else:
-                    await self.write_single_panel_clip(segment_clip_path, segment, config.effects)
+        Segments and global effects are shipped to workers as dicts, the returned list keeps timeline order
+        so it can be passed to the concat step as is.
+        """
+        cache_keys = [self.get_segment_cache_key(s, config.effects) for s in config.segments]
+        cached_paths: dict[str, str] = {}
+        pending: dict[str, TimelineSegmentConfig] = {}
 
-            return segment_clips
+        for segment, cache_key in zip(config.segments, cache_keys):
+            if cache_key in cached_paths or cache_key in pending:
+                continue
+
+            cached_path = self.segment_cache.get(cache_key)
+
+            if cached_path is None:
+                pending[cache_key] = segment
+            else:
+                cached_paths[cache_key] = cached_path
+
+        builder_value = self.to_dict()
+        global_effects_values = [e.to_dict() for e in config.effects]
+
+        progress_bar = tqdm(total=len(pending))
+        progress_bar.set_description(f"Building segments ({self.workers} workers)")
+
+        loop = asyncio.get_running_loop()
+        # every segment is submitted at once, workers report when they actually start one
+        mp_context = multiprocessing.get_context()
+        started_segments = mp_context.Queue()
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp_context,
+            initializer=init_segment_worker,
+            initargs=(started_segments,),
+        )
+        results: list[SegmentRenderResult] = []
+        reported_started: set[int] = set()
+        started_at = time.perf_counter()
+
+        async def render(cache_key: str, segment: TimelineSegmentConfig) -> tuple[str, SegmentRenderResult]:
+            write_path = self.segment_cache.get_write_path(cache_key)
+
+            try:
+                result = await loop.run_in_executor(
+                    executor,
+                    render_segment_in_worker,
+                    builder_value,
+                    segment.to_dict(),
+                    segment.index,
+                    global_effects_values,
+                    write_path,
+                )
+            except BaseException:
+                self.segment_cache.discard(write_path)
+                raise
+
+            return cache_key, result
+
+        def report_started(segment_index: int):
+            if segment_index not in reported_started:
+                reported_started.add(segment_index)
+                self.emit(RenderEvent(type="segment_started", segment_index=segment_index))
+
+        def report_started_segments():
+            while True:
+                try:
+                    segment_index = started_segments.get_nowait()
+                except queue.Empty:
+                    return
+
+                report_started(segment_index)
+
+        tasks = {asyncio.ensure_future(render(k, s)) for k, s in pending.items()}
+
+        try:
+            self.emit(
+                RenderEvent(
+                    type="render_started",
+                    segments_total=len(config.segments),
+                    frames=sum(s.duration_frame for s in config.segments),
+                )
+            )
+
+            # segments sharing a cache key are rendered once and reported as cache hits
+            for segment, cache_key in zip(config.segments, cache_keys):
+                if pending.get(cache_key) is not segment:
+                    self.emit(
+                        RenderEvent(
+                            type="segment_finished",
+                            segment_index=segment.index,
+                            frames=segment.duration_frame,
+                            cache_hit=True,
+                        )
+                    )
+
+            running = set(tasks)
+
+            while running:
+                # listeners raise from start and finish events to abort the render, e.g. on cancel
+                done, running = await asyncio.wait(
+                    running, timeout=SEGMENT_STARTED_POLL_SECONDS, return_when=asyncio.FIRST_COMPLETED
+                )
+                report_started_segments()
+
+                for task in done:
+                    cache_key, result = task.result()
+                    cached_paths[cache_key] = self.segment_cache.put(cache_key, result.path)
+                    results.append(result)
+                    progress_bar.update(1)
+
+                    # the start message can still be in flight when the result arrives
+                    report_started(result.index)
+                    self.emit(
+                        RenderEvent(
+                            type="segment_finished",
+                            segment_index=result.index,
+                            frames=result.frames,
+                            elapsed=result.elapsed,
+                        )
+                    )
+
+        except BaseException:
+            # segments not picked by a worker yet are dropped, running ones finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
 
         finally:
             progress_bar.close()
 
-    async def write_single_panel_clip(
-        self, path: str, segment_config: TimelineSegmentConfig, global_effects: list[VideoSegmentEffect]
-    ) -> tuple[int, str]:
-        video = segment_config.videos[0]
+        executor.shutdown(wait=True)
 
-        merged_clip = self.load_clip(video.path)
+        log_worker_throughput(results, wall_time=time.perf_counter() - started_at)
 
-        subclip = self.get_subclip(merged_clip, video.start_time, segment_config.duration_frame, self.fps)
+        segment_clips = [cached_paths[k] for k in cache_keys]
 
-        segment_clip = self.apply_effects(subclip, global_effects + segment_config.effects)
-        segment_clip = self.add_debug_info_if_requested(segment_clip, segment_config)
-        self.write_video_file(segment_clip, path)
+        self.segment_cache.evict(protected=set(segment_clips))
+        self.segment_cache.log_stats()
 
-        segment_clip.close()
-        subclip.close()
-        merged_clip.close()
+        return segment_clips
 
-        await asyncio.sleep(0)
-        return (segment_config.index, path)
+    def get_segment_cache_key(self, segment: TimelineSegmentConfig, global_effects: list[VideoSegmentEffect]) -> str:
+        return get_segment_cache_key(
+            segment=segment,
+            global_effects=global_effects,
+            fps=self.fps,
+            size=self.resolution.size,
+            debug=self.debug,
+            backend=self.backend,
+            resolve_source=self.resolve_source,
+            preview=self.preview,
+        )
 
-    async def write_spit_screen_clip(
+    async def write_segment_clip(
         self, path: str, segment_config: TimelineSegmentConfig, global_effects: list[VideoSegmentEffect]
     ) -> tuple[int, str]:
+        if self.backend == "ffmpeg":
+            try:
+                graph = compile_segment_filtergraph(
+                    segment_config,
+                    global_effects,
+                    fps=self.fps,
+                    resolution=self.resolution,
+                    debug=self.debug,
+                    resolve_source=self.resolve_source,
+                    preview=self.preview,
+                )
+            except FilterGraphUnsupported as e:
+                logger.info(f"Segment {segment_config.index} falls back to moviepy: {e}")
+            else:
+                run_segment_filtergraph(graph, path, fps=self.fps, encoder_params=self.get_encoder_params())
+                await asyncio.sleep(0)
+                return (segment_config.index, path)
+
+        segment_clip = self.compose_segment_clip(segment_config, global_effects)
+        self.write_video_file(segment_clip, path)
+
+        await asyncio.sleep(0)
+        return (segment_config.index, path)
+
+    def compose_segment_clip(
+        self, segment_config: TimelineSegmentConfig, global_effects: list[VideoSegmentEffect]
+    ) -> VideoClip:
+        # readers of the previous segment are done, each source use of this segment checks out its own reader
+        self.source_clip_pool.release()
+
+        if segment_config.is_split_screen:
+            segment_clip = self.compose_split_screen_clip(segment_config)
+        else:
+            segment_clip = self.compose_single_panel_clip(segment_config)
+
+        if self.reuse_frame_buffers:
+            segment_clip = with_frame_buffer_pool(segment_clip, self.frame_buffer_pool)
+
+        segment_clip = self.apply_effects(segment_clip, global_effects + segment_config.effects)
+        return self.add_debug_info_if_requested(segment_clip, segment_config)
+
+    def compose_single_panel_clip(self, segment_config: TimelineSegmentConfig) -> VideoClip:
+        video = segment_config.videos[0]
+
+        merged_clip = self.load_clip(video.path)
+
+        return self.get_subclip(merged_clip, video.start_time, segment_config.duration_frame, self.fps)
 
+    def compose_split_screen_clip(self, segment_config: TimelineSegmentConfig) -> VideoClip:
         if segment_config.videos is None or len(segment_config.videos) == 0:
             raise Exception("Videos list is empty or null")
 
         if len(segment_config.videos) == 1:
             video = segment_config.videos[0]
             clip = self.load_clip(video.path)
+            # one source is shown in every cell, split_screen_clips decodes it once per frame
             subclipped = self.get_subclip(clip, video.start_time, segment_config.duration_frame, self.fps)
 
             position_layout = (1, 3) if self.resolution.is_vertical else (3, 1)
@@ -147,24 +623,17 @@ class VideoClipBuilder:
                         position=clip_positions[1],
                     ),
                     SplitScreenCriteria(
-                        clip=subclipped.with_effects([vfx.MirrorX()]),
+                        clip=subclipped,
                         position=clip_positions[2],
                         scale_factor=0.95,
+                        mirror_x=True,
                     ),
                 ],
                 position_layout=position_layout,
                 clip_duration=segment_config.duration,
             )
 
-            segment_clip = self.apply_effects(segment_clip, global_effects + segment_config.effects)
-            segment_clip = self.add_debug_info_if_requested(segment_clip, segment_config)
-            self.write_video_file(segment_clip, path)
-
-            subclipped.close()
-            clip.close()
-
-            await asyncio.sleep(0)
-            return (segment_config.index, path)
+            return segment_clip
 
         if len(segment_config.videos) == 2:
             video_1 = segment_config.videos[0]
@@ -173,6 +642,7 @@ class VideoClipBuilder:
             clip_1 = self.load_clip(video_1.path)
             clip_2 = self.load_clip(video_2.path)
 
+            # first source is shown in two cells, split_screen_clips decodes it once per frame
             subclipped_1: VideoClip = self.get_subclip(
                 clip_1, video_1.start_time, segment_config.duration_frame, self.fps
             )
@@ -198,26 +668,17 @@ class VideoClipBuilder:
                         position=clip_positions[1],
                     ),
                     SplitScreenCriteria(
-                        clip=subclipped_1.with_effects([vfx.MirrorX()]),
+                        clip=subclipped_1,
                         position=clip_positions[2],
                         scale_factor=0.95,
+                        mirror_x=True,
                     ),
                 ],
                 position_layout=position_layout,
                 clip_duration=segment_config.duration,
             )
 
-            segment_clip = self.apply_effects(segment_clip, global_effects + segment_config.effects)
-            segment_clip = self.add_debug_info_if_requested(segment_clip, segment_config)
-            self.write_video_file(segment_clip, path)
-
-            subclipped_1.close()
-            subclipped_2.close()
-            clip_1.close()
-            clip_2.close()
-
-            await asyncio.sleep(0)
-            return (segment_config.index, path)
+            return segment_clip
 
         position_layout = (
             (1, len(segment_config.videos)) if self.resolution.is_vertical else (len(segment_config.videos), 1)
@@ -225,14 +686,10 @@ class VideoClipBuilder:
         clip_positions = get_positions_from_layout(position_layout)
 
         split_screen_criteria = []
-        clips: list[VideoClip] = []
-        subclips: list[VideoClip] = []
 
         for i, v in enumerate(segment_config.videos):
             c = self.load_clip(v.path)
             s = self.get_subclip(c, v.start_time, segment_config.duration_frame, self.fps)
-            clips.append(c)
-            subclips.append(s)
             split_screen_criteria.append(SplitScreenCriteria(clip=s, position=clip_positions[i], scale_factor=1))
 
         segment_clip: VideoClip = split_screen_clips(
@@ -243,15 +700,7 @@ class VideoClipBuilder:
             clip_duration=segment_config.duration,
         )
 
-        segment_clip = self.apply_effects(segment_clip, global_effects + segment_config.effects)
-        segment_clip = self.add_debug_info_if_requested(segment_clip, segment_config)
-        self.write_video_file(segment_clip, path)
-
-        for c in subclips + clips:
-            c.close()
-
-        await asyncio.sleep(0)
-        return (segment_config.index, path)
+        return segment_clip
 
     # def get_clip_padding(self, duration: float):
     #     requires_frame_drift = duration <= 0.55
@@ -356,7 +805,15 @@ class VideoClipBuilder:
                 if e.method == EffectMethod.FORWARD_REVERSE:
                     effect_args: EffectArgs.PLAYBACK.FORWARD_REVERSE = e.args
                     segment_clip = playback_effects.forward_reverse(
-                        clip=segment_clip, start_speed=float(effect_args.start_speed), fast_slow_mode=True
+                        clip=segment_clip,
+                        start_speed=float(effect_args.start_speed),
+                        fast_slow_mode=True,
+                        fps=self.fps,
+                        frame_buffer=FrameRingBuffer(
+                            max_memory_bytes=self.reverse_frame_buffer_bytes,
+                            spill_dir=self.temp_path,
+                            stats=self.frame_buffer_stats,
+                        ),
                     )
 
                 if e.method == EffectMethod.RAMP_SPEED_SEGMENTS:
@@ -366,6 +823,7 @@ class VideoClipBuilder:
                         speeds=effect_args.speeds,
                         scale_speed_to_original_duration=effect_args.scale_speed_to_original_duration,
                         ramps_count_between_speed=effect_args.ramps_count_between_speed,
+                        fps=self.fps,
                     )
 
         return segment_clip
@@ -404,6 +862,27 @@ class VideoClipBuilder:
 
         return segment_clip
 
+    def get_encoder_params(self) -> list[str]:
+        # ffmpeg equivalent of write_video_file settings
+        if self.debug:
+            return ["-c:v", "libx264", "-preset", "ultrafast", "-crf", "34", "-pix_fmt", "yuv420p"]
+
+        if self.preview:
+            return [
+                "-c:v",
+                "libx264",
+                "-preset",
+                "ultrafast",
+                "-tune",
+                "zerolatency",
+                "-crf",
+                "30",
+                "-pix_fmt",
+                "yuv420p",
+            ]
+
+        return ["-c:v", "libx264", "-pix_fmt", "yuv420p"]
+
     def write_video_file(self, clip: VideoClip, path: str):
 
         if self.debug:
@@ -417,10 +896,123 @@ class VideoClipBuilder:
             )
             return
 
+        if self.preview:
+            clip.write_videofile(
+                path,
+                audio=None,
+                logger=None,
+                fps=self.fps,
+                preset="ultrafast",
+                ffmpeg_params=["-tune", "zerolatency", "-crf", "30", "-pix_fmt", "yuv420p"],
+            )
+            return
+
         clip.write_videofile(path, audio=None, logger=None, fps=self.fps)
 
-    def load_clip(self, path):
-        if self.debug:
+    def resolve_source(self, path: str) -> tuple[str, bool]:
+        return resolve_media_path(path, self.proxies, self.debug or self.preview)
+
+    def load_clip(self, path) -> VideoClip:
+        source_path, is_preview_proxy = self.resolve_source(path)
+
+        # clips are owned by the pool and closed once the render is done, every call of a segment gets its own reader
+        return self.source_clip_pool.get(
+            (source_path, self.debug or self.preview), lambda: self.open_clip(source_path, is_preview_proxy)
+        )
+
+    def open_clip(self, path, is_preview_proxy: bool = False) -> VideoClip:
+        if self.debug or self.preview:
+            if is_preview_proxy:
+                return VideoFileClip(path, audio=False)
+
             return VideoFileClip(path, audio=False, resize_algorithm="fast_bilinear").resized(0.1)
 
-        return VideoFileClip(path)
+        return VideoFileClip(path, audio=False)
+
+
+@dataclass
+class SegmentRenderResult:
+    index: int
+    path: str
+    worker_pid: int
+    frames: int
+    elapsed: float
+    source_opens: int
+    source_reuses: int
+    seeks_avoided: int
+
+
+# Each worker process keeps its own pool, so consecutive segments of the same source handled by
+# a worker share one reader
+worker_source_clip_pool: SourceClipPool | None = None
+
+# queue of segment indexes the worker started, set by init_segment_worker
+worker_started_segments = None
+
+
+def init_segment_worker(started_segments):
+    global worker_started_segments
+    worker_started_segments = started_segments
+
+
+def render_segment_in_worker(
+    builder_value: dict,
+    segment_value: dict,
+    segment_index: int,
+    global_effects_values: list[dict],
+    path: str,
+) -> SegmentRenderResult:
+    """Entry point executed in worker process of VideoClipBuilder.build_segment_clips_in_parallel"""
+    global worker_source_clip_pool
+
+    if worker_source_clip_pool is None:
+        worker_source_clip_pool = SourceClipPool()
+
+    if worker_started_segments is not None:
+        worker_started_segments.put(segment_index)
+
+    builder = VideoClipBuilder.from_dict(builder_value)
+    builder.source_clip_pool = worker_source_clip_pool
+    segment = TimelineSegmentConfig.from_dict(segment_value, index=segment_index)
+    global_effects = [VideoSegmentEffect.from_dict(e) for e in global_effects_values]
+
+    opens, reuses = worker_source_clip_pool.opens, worker_source_clip_pool.reuses
+    started_at = time.perf_counter()
+
+    asyncio.run(builder.write_segment_clip(path, segment, global_effects))
+    worker_source_clip_pool.trim()
+
+    return SegmentRenderResult(
+        index=segment_index,
+        path=path,
+        worker_pid=os.getpid(),
+        frames=segment.duration_frame,
+        elapsed=time.perf_counter() - started_at,
+        source_opens=worker_source_clip_pool.opens - opens,
+        source_reuses=worker_source_clip_pool.reuses - reuses,
+        seeks_avoided=builder.frame_buffer_stats.seeks_avoided,
+    )
+
+
+def log_worker_throughput(results: list[SegmentRenderResult], wall_time: float):
+    per_worker: dict[int, list[SegmentRenderResult]] = {}
+
+    for r in results:
+        per_worker.setdefault(r.worker_pid, []).append(r)
+
+    for pid, worker_results in sorted(per_worker.items()):
+        frames = sum(r.frames for r in worker_results)
+        busy_time = sum(r.elapsed for r in worker_results)
+        fps = frames / busy_time if busy_time > 0 else 0
+        source_opens = sum(r.source_opens for r in worker_results)
+        source_reuses = sum(r.source_reuses for r in worker_results)
+        seeks_avoided = sum(r.seeks_avoided for r in worker_results)
+
+        logger.info(
+            f"Worker {pid}: {len(worker_results)} segments, {frames} frames in {busy_time:.1f}s ({fps:.1f} fps), "
+            f"{source_opens} source opens, {source_reuses} opens avoided, {seeks_avoided} reverse seeks avoided"
+        )
+
+    total_frames = sum(r.frames for r in results)
+    total_fps = total_frames / wall_time if wall_time > 0 else 0
+    logger.info(f"Rendered {len(results)} segments, {total_frames} frames in {wall_time:.1f}s ({total_fps:.1f} fps)")
@@ -1,15 +1,22 @@
 from typing import Callable, Self
 from .video_resolution import VideoResolution
-from .data_analysis.video_analyzer import SceneInfo
+from .data_analysis.video_analyzer import (
+    SceneDetection,
+    SceneInfo,
+    analyze_on_static_scenes,
+    analyze_video_scenes,
+    video_details,
+)
 
 
 class VideoNode:
-    def __init__(self, path: str, scenes: list[SceneInfo], resolution: VideoResolution, fps: int):
+    def __init__(self, path: str, scenes: list[SceneInfo], resolution: VideoResolution, fps: int, duration: float):
         self.path: str = path
         self.name: str = path.split("/")[-1]
         self.scenes: list[SceneInfo] = scenes
         self.resolution: VideoResolution = resolution
         self.fps: int = fps
+        self.duration: float = duration
         self.next = None
 
     def find_next(self, predicate: Callable[[Self], bool]) -> Self:  # type: ignore
@@ -28,6 +35,7 @@ class VideoNode:
             "path": self.path,
             "resolution": self.resolution.size,
             "fps": self.fps,
+            "duration": self.duration,
             "scenes": [s.to_json() for s in self.scenes],
         }
 
@@ -37,5 +45,30 @@ class VideoNode:
             path=value["path"],
             resolution=VideoResolution(value["resolution"]),
             fps=value["fps"],
+            duration=value["duration"],
             scenes=[SceneInfo.from_json(s) for s in value["scenes"]],
         )
+
+
+def analyze_video_node(path: str, scene_detection: SceneDetection | None, shards: int = 1) -> dict:
+    """
+    Reads video metadata and detects scenes. Runs in worker processes, so the result is returned as json.
+
+    Scene detection of a long video can be split into time shards analyzed in parallel.
+    """
+    details = video_details(path)
+
+    if scene_detection == "static":
+        scenes = analyze_on_static_scenes(path, shards=shards).scenes
+    elif scene_detection == "content":
+        scenes = analyze_video_scenes(path, shards=shards).scenes
+    else:
+        scenes = []
+
+    return VideoNode(
+        path=path,
+        scenes=scenes,
+        resolution=VideoResolution(details.resolution),
+        fps=details.fps,
+        duration=details.duration,
+    ).to_json()
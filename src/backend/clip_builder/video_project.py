@@ -1,3 +1,4 @@
+from concurrent.futures import ProcessPoolExecutor
 import datetime
 import glob
 import json
@@ -5,10 +6,11 @@ import logging
 import os
 import random
 import shutil
-from typing import Callable, Self
+from typing import Self
 import uuid
 import subprocess
 import pathlib
+import threading
 
 
 import yaml
@@ -19,13 +21,10 @@ from .data_analysis.audio_analyzer import (
     analyze_music_for_editing,
     AudioAnalyzeResult,
 )
-from .data_analysis.video_analyzer import (
-    VideoFileDetails,
-    analyze_on_static_scenes,
-    video_details,
-    SceneInfo,
-)
+from .data_analysis.video_analyzer import SceneDetection
+from .fingerprint import file_fingerprint, hash_value
 from .json_cache import JsonCache
+from .proxy_media import ProxyMedia, generate_proxy_media, get_proxy_key
 from .timeline_config import (
     AudioSegment,
     TimelineConfig,
@@ -35,8 +34,8 @@ from .timeline_config import (
     EffectType,
     EffectMethod,
 )
-from .video_clip_builder import VideoClipBuilder
-from .video_node import VideoNode
+from .video_clip_builder import RenderBackend, VideoClipBuilder
+from .video_node import VideoNode, analyze_video_node
 from .video_resolution import VideoResolution
 from .effects_descriptor import EffectArgs
 
@@ -76,6 +75,7 @@ class VideoProjectSetup:
         fps: int,
         project_name: str | None = None,
         source_files_dir_path: str | None = None,
+        proxies: list[ProxyMedia] | None = None,
     ):
         self.project_name = (
             datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S") if project_name is None else project_name
@@ -87,19 +87,22 @@ class VideoProjectSetup:
         self.project_dir_path = f"./output/projects/{self.project_name}"
         self.runtime_dir_path = f"{self.project_dir_path}/runtime"
         self.analysis_dir_path = f"{self.project_dir_path}/analysis"
-        self.timeline_path = f"{self.project_dir_path}/timeline.yaml"
+        self.proxy_dir_path = f"{self.project_dir_path}/proxy"
+        self.timeline_path = f"{self.project_dir_path}/timeline.json"
         self.source_files_dir_path = (
             f"{self.project_dir_path}/source" if source_files_dir_path is None else source_files_dir_path
         )
 
         self.audio_path = get_first_path(self.source_files_dir_path, audio_exts)
         self.videos_path_list = get_path_list(self.source_files_dir_path, video_exts)
+        self.proxies: dict[str, ProxyMedia] = {get_proxy_key(p.source_path): p for p in proxies or []}
 
     def setup_dirs(self):
         shutil.rmtree(self.project_dir_path, ignore_errors=True)
         os.makedirs(self.project_dir_path)
         os.makedirs(self.runtime_dir_path)
         os.makedirs(self.analysis_dir_path)
+        os.makedirs(self.proxy_dir_path)
         os.makedirs(self.source_files_dir_path, exist_ok=True)
         os.makedirs(self.setup_dir_path, exist_ok=True)
 
@@ -116,6 +119,7 @@ class VideoProjectSetup:
             "project_name": self.project_name,
             "fps": self.fps,
             "resolution": [self.resolution.width, self.resolution.height],
+            "proxies": [p.to_dict() for p in self.proxies.values()],
         }
 
     @staticmethod
@@ -126,6 +130,7 @@ class VideoProjectSetup:
             resolution=(resolution[0], resolution[1]),
             fps=value["fps"],
             project_name=value["project_name"],
+            proxies=[ProxyMedia.from_dict(p) for p in value.get("proxies", [])],
         )
 
     def save(self):
@@ -141,6 +146,31 @@ class VideoProjectSetup:
             return VideoProjectSetup.from_dict(value)
 
 
+# Proxies of different uploads are generated concurrently, setup file update must not lose entries
+setup_update_lock = threading.Lock()
+
+
+def generate_source_proxies(project_name: str, source_paths: list[str]):
+    """Import-time stage, transcodes uploaded videos into render/preview proxies and records them in the setup"""
+    setup = VideoProjectSetup.load(project_name)
+    os.makedirs(setup.proxy_dir_path, exist_ok=True)
+
+    for source_path in source_paths:
+        if pathlib.Path(source_path).suffix.lstrip(".").lower() not in video_exts:
+            continue
+
+        try:
+            proxy = generate_proxy_media(source_path, setup.proxy_dir_path, setup.resolution, setup.fps)
+        except subprocess.CalledProcessError:
+            logger.exception(f"Proxy generation failed for {source_path}, original file will be used")
+            continue
+
+        with setup_update_lock:
+            setup = VideoProjectSetup.load(project_name)
+            setup.proxies[get_proxy_key(proxy.source_path)] = proxy
+            setup.save()
+
+
 class VideoProject:
     def __init__(
         self,
@@ -166,17 +196,29 @@ class VideoProject:
         if project_setup is None:
             self.setup.setup_dirs()
 
-    def get_clip_builder(self) -> VideoClipBuilder:
+    def get_clip_builder(self, workers: int = 1, backend: RenderBackend = "moviepy") -> VideoClipBuilder:
         return VideoClipBuilder(
             fps=self.setup.fps,
             resolution=self.setup.resolution,
             temp_path=self.setup.runtime_dir_path,
+            workers=workers,
+            backend=backend,
+            proxies=self.setup.proxies,
         )
 
+    def get_output_clip_path(self) -> str:
+        return str(pathlib.Path(self.setup.project_dir_path).joinpath(f"output-{str(uuid.uuid4())}.mp4").resolve())
+
+    async def build_clip_with_audio_streaming(self, clip_builder: VideoClipBuilder, config: TimelineConfig) -> str:
+        output_clip_path = self.get_output_clip_path()
+        audio_full_path = str(pathlib.Path(self.setup.audio_path).resolve())
+
+        logger.info(f"Streaming clip {output_clip_path}")
+
+        return await clip_builder.build_clip_with_audio_streaming(config, audio_full_path, output_clip_path)
+
     def save_clip_with_audio(self, clip_path) -> str:
-        output_clip_path = str(
-            pathlib.Path(self.setup.project_dir_path).joinpath(f"output-{str(uuid.uuid4())}.mp4").resolve()
-        )
+        output_clip_path = self.get_output_clip_path()
         clip_full_path = str(pathlib.Path(clip_path).resolve())
         audio_full_path = str(pathlib.Path(self.setup.audio_path).resolve())
 
@@ -221,12 +263,41 @@ class VideoProject:
 
         return AudioAnalyzeResult.from_json(cached_value)
 
-    def get_video_analysis(self) -> list[VideoFileDetails]:
-        res: list[VideoFileDetails] = []
+    def get_video_analysis(
+        self, scene_detection: SceneDetection | None = None, workers: int | None = None
+    ) -> list[VideoNode]:
+        """
+        Video metadata of every source, linked into a ring in source order. Scenes are detected only when
+        scene_detection is set, it decodes every frame of the sources.
 
-        for i, p in enumerate(self.setup.videos_path_list):
-            logger.info(f"Analyzing video {self.get_file_name(p)}")
-            res.append(video_details(p))
+        Results are cached by file fingerprint, files which are not cached yet are analyzed in a process pool.
+        """
+        paths = self.setup.videos_path_list
+        cache_keys = [self.get_video_analysis_cache_key(p, scene_detection) for p in paths]
+        values: list[dict | None] = [self.json_cache.get(k) for k in cache_keys]
+
+        missing = [i for i, v in enumerate(values) if v is None]
+
+        if len(missing) > 0:
+            logger.info(f"Analyzing {len(missing)} of {len(paths)} videos")
+
+        max_workers = workers or os.cpu_count() or 1
+
+        if len(missing) == 1:
+            # single file gets all workers as time shards
+            values[missing[0]] = analyze_video_node(paths[missing[0]], scene_detection, shards=max_workers)
+        elif len(missing) > 1:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(missing))) as executor:
+                futures = {i: executor.submit(analyze_video_node, paths[i], scene_detection) for i in missing}
+
+                for i, future in futures.items():
+                    values[i] = future.result()
+                    logger.info(f"Analyzed video {self.get_file_name(paths[i])}")
+
+        for i in missing:
+            self.json_cache.set(cache_keys[i], values[i])
+
+        res = [VideoNode.from_json(v) for v in values]
 
         for i in range(0, len(res) - 1):
             res[i].next = res[i + 1]
@@ -235,13 +306,24 @@ class VideoProject:
 
         return res
 
+    @staticmethod
+    def get_video_analysis_cache_key(path: str, scene_detection: SceneDetection | None) -> str:
+        value_hash = hash_value(
+            {
+                "path": str(pathlib.Path(path).resolve()),
+                "fingerprint": file_fingerprint(path),
+                "scene_detection": scene_detection,
+            }
+        )
+        return f"video_{value_hash}"
+
     def analyze_source_and_generate_timeline(self) -> TimelineConfig:
         audio_analysis = self.get_audio_analysis()
         video_analysis = self.get_video_analysis()
 
         self.store_analysis_to_temp(audio_analysis)
 
-        video_details = video_analysis[0]
+        video_node = video_analysis[0]
 
         timeline_segments = []
         audio_segments: list[AudioSegment] = []
@@ -250,7 +332,7 @@ class VideoProject:
             return round(t * fps, ndigits=None)
 
         for beat_segment in audio_analysis.beat_segments:
-            start_time = self.get_video_start_time(video_details, beat_segment)
+            start_time = self.get_video_start_time(video_node, beat_segment)
 
             audio_segments.append(
                 AudioSegment(
@@ -271,18 +353,7 @@ class VideoProject:
             segment_end_frame = time_to_frame(beat_segment.end_time, self.setup.fps)
             segment_frame_duration = segment_end_frame - segment_start_frame
 
-            video_resolution = VideoResolution(video_details.resolution)
-
-            def find_next_video(predicate: Callable[[VideoFileDetails], bool]) -> VideoFileDetails:
-                current: VideoFileDetails = video_details.next
-                path = video_details.path
-
-                while current.path != path:
-                    if predicate(current):
-                        return current
-                    current = current.next
-
-                return video_details
+            video_resolution = video_node.resolution
 
             if video_resolution.matches_aspect_ratio(self.setup.resolution):
 
@@ -291,7 +362,7 @@ class VideoProject:
                         id=str(uuid.uuid4()),
                         index=beat_segment.index,
                         is_split_screen=False,
-                        videos=[VideoItem(id=str(uuid.uuid4()), path=video_details.path, start_time=start_time)],
+                        videos=[VideoItem(id=str(uuid.uuid4()), path=video_node.path, start_time=start_time)],
                         effects=[],
                         duration=beat_segment.duration,
                         start_time=beat_segment.start_time,
@@ -303,10 +374,8 @@ class VideoProject:
                     )
                 )
             else:
-                video_details_2 = find_next_video(
-                    lambda v: VideoResolution(v.resolution).matches_aspect_ratio(video_resolution)
-                )
-                start_time_2 = self.get_video_start_time(video_details_2, beat_segment)
+                video_node_2 = video_node.find_next(lambda v: v.resolution.matches_aspect_ratio(video_resolution))
+                start_time_2 = self.get_video_start_time(video_node_2, beat_segment)
 
                 timeline_segments.append(
                     TimelineSegmentConfig(
@@ -314,8 +383,8 @@ class VideoProject:
                         index=beat_segment.index,
                         is_split_screen=True,
                         videos=[
-                            VideoItem(id=str(uuid.uuid4()), path=video_details.path, start_time=start_time),
-                            VideoItem(id=str(uuid.uuid4()), path=video_details_2.path, start_time=start_time_2),
+                            VideoItem(id=str(uuid.uuid4()), path=video_node.path, start_time=start_time),
+                            VideoItem(id=str(uuid.uuid4()), path=video_node_2.path, start_time=start_time_2),
                         ],
                         effects=[],
                         duration=beat_segment.duration,
@@ -328,7 +397,7 @@ class VideoProject:
                     )
                 )
 
-            video_details = video_details.next
+            video_node = video_node.next
 
         return TimelineConfig(
             size=self.setup.resolution.size,
@@ -359,7 +428,7 @@ class VideoProject:
         )
 
     @staticmethod
-    def get_video_start_time(video: VideoFileDetails, beat_segment: BeatSegment):
+    def get_video_start_time(video: VideoNode, beat_segment: BeatSegment):
         return random.random() * (video.duration - beat_segment.duration - 0.1)
 
     @staticmethod
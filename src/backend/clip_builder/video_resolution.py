@@ -14,3 +14,11 @@ class VideoResolution:
         return (resolution.aspect_ration >= 1 and self.aspect_ration >= 1) or (
             resolution.aspect_ration < 1 and self.aspect_ration < 1
         )
+
+    def scaled_to_height(self, height: int) -> Self:
+        scale = self.height / height
+        width = int(self.width / scale)
+        if width % 2 != 0:
+            width += 1
+
+        return VideoResolution(size=(width, height))
@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
+
+from backend.clip_builder.render_jobs import RenderJob, get_render_job_manager
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+# comment line sent when no event came for a while, so proxies keep the stream open during long segments
+SSE_KEEPALIVE_SECONDS = 15
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    return get_job_or_raise(job_id).to_dict()
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Server-Sent Events stream of the job progress: job_status first, then render_started, segment_started and
+    segment_finished (with cache_hit, segment_fps, fps and eta), the stream ends with job_finished.
+    segment_started is sent when a worker begins the segment, segments_running lists segments in progress.
+    """
+    job = get_job_or_raise(job_id)
+    queue = job.subscribe()
+
+    async def stream():
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if message is None:
+                    return
+
+                yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            job.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    get_job_or_raise(job_id)
+    return get_render_job_manager().cancel(job_id).to_dict()
+
+
+@router.get("/{job_id}/output")
+async def get_job_output(job_id: str):
+    job = get_job_or_raise(job_id)
+
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job.status}")
+
+    return FileResponse(job.output_path)
+
+
+def get_job_or_raise(job_id: str) -> RenderJob:
+    job = get_render_job_manager().get(job_id)
+
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} does not exists")
+
+    return job
@@ -1,9 +1,152 @@
-from fastapi import APIRouter
-from fastapi.responses import FileResponse
+from email.utils import formatdate, parsedate_to_datetime
+import mimetypes
+import os
+import pathlib
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from backend.clip_builder.fingerprint import file_fingerprint, hash_value
+from backend.clip_builder.segment_cache import SEGMENT_CACHE_PATH
 
 router = APIRouter(prefix="/api/media", tags=["media"])
 
+# content addressed files, a path is never rewritten with other content
+IMMUTABLE_MEDIA_DIRS = [SEGMENT_CACHE_PATH]
+
+MEDIA_CHUNK_SIZE = 1024 * 1024  # 1MB
+
 
 @router.get("/")
-async def import_media(file_path: str):
-    return FileResponse(file_path)
+async def get_media(file_path: str, request: Request):
+    """
+    Serves a media file with ETag/Last-Modified validators, conditional 304 responses and single byte ranges,
+    so players seek without downloading the whole file and browser caches revalidate cheaply.
+    """
+    if not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail=f"Media {file_path} does not exists")
+
+    stat = os.stat(file_path)
+    size = stat.st_size
+    etag = get_media_etag(file_path)
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": get_cache_control(file_path),
+        "Accept-Ranges": "bytes",
+    }
+
+    if is_not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+    byte_range = get_requested_range(request, etag, last_modified, size)
+
+    if byte_range is None:
+        return StreamingResponse(
+            read_file_range(file_path, 0, size),
+            media_type=media_type,
+            headers={**headers, "Content-Length": str(size)},
+        )
+
+    if byte_range == "unsatisfiable":
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    start, end = byte_range
+    return StreamingResponse(
+        read_file_range(file_path, start, end - start + 1),
+        status_code=206,
+        media_type=media_type,
+        headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(end - start + 1)},
+    )
+
+
+def get_media_etag(file_path: str) -> str:
+    """Strong validator, changes with path, size or modification time of the file"""
+    path = str(pathlib.Path(file_path).resolve())
+    return '"' + hash_value({"path": path, "fingerprint": file_fingerprint(file_path)})[:32] + '"'
+
+
+def get_cache_control(file_path: str) -> str:
+    path = pathlib.Path(file_path).resolve()
+
+    for media_dir in IMMUTABLE_MEDIA_DIRS:
+        if path.is_relative_to(pathlib.Path(media_dir).resolve()):
+            return "public, max-age=31536000, immutable"
+
+    # sources and renders can be replaced under the same path, so browsers revalidate every time
+    return "no-cache"
+
+
+def is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+
+    # If-Modified-Since is ignored when If-None-Match is present
+    if if_none_match is not None:
+        # weak comparison (RFC 9110), W/"x" matches "x"
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return if_none_match.strip() == "*" or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+
+    if if_modified_since is None:
+        return False
+
+    try:
+        return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def get_requested_range(request: Request, etag: str, last_modified: str, size: int):
+    """
+    Inclusive (start, end) of a single range request, "unsatisfiable" for ranges outside the file,
+    None when the whole file is served. Multiple ranges and stale If-Range are served as the whole file.
+    """
+    range_header = request.headers.get("range")
+
+    if range_header is None or not range_header.startswith("bytes="):
+        return None
+
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range not in (etag, last_modified):
+        return None
+
+    ranges = range_header[len("bytes=") :].split(",")
+    if len(ranges) != 1:
+        return None
+
+    start_value, _, end_value = ranges[0].strip().partition("-")
+
+    try:
+        if start_value == "":
+            # suffix range, last N bytes
+            length = int(end_value)
+            if length == 0:
+                return "unsatisfiable"
+            start, end = max(0, size - length), size - 1
+        else:
+            start = int(start_value)
+            end = min(int(end_value), size - 1) if end_value != "" else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or start > end:
+        return "unsatisfiable"
+
+    return start, end
+
+
+def read_file_range(file_path: str, start: int, length: int):
+    with open(file_path, "rb") as f:
+        f.seek(start)
+
+        while length > 0:
+            chunk = f.read(min(MEDIA_CHUNK_SIZE, length))
+            if not chunk:
+                return
+
+            length -= len(chunk)
+            yield chunk
@@ -1,11 +1,25 @@
+import asyncio
 import glob
 from pathlib import Path
 import uuid
-from fastapi import APIRouter, UploadFile
+from fastapi import APIRouter, BackgroundTasks, HTTPException, UploadFile
 from fastapi.responses import FileResponse
 
-from backend.clip_builder.timeline_config import TimelineConfig
-from backend.clip_builder.video_project import VideoProject, VideoProjectSetup, get_path_list
+from backend.clip_builder.project_repository import get_project_repository
+from backend.clip_builder.render_jobs import (
+    RenderJob,
+    RenderJobRequest,
+    RenderQueueFull,
+    get_cached_preview,
+    get_render_job_manager,
+)
+from backend.clip_builder.timeline_config import SegmentNotFound
+from backend.clip_builder.video_clip_builder import RenderBackend
+from backend.clip_builder.video_project import (
+    VideoProjectSetup,
+    generate_source_proxies,
+    get_path_list,
+)
 from backend.endpoints.project.models import NewProjectRequest
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
@@ -21,7 +35,7 @@ async def new_project(request: NewProjectRequest):
     )
 
     setup.setup_dirs()
-    setup.save()
+    get_project_repository().save_setup(setup)
 
 
 @router.get("/search")
@@ -37,12 +51,13 @@ async def search(name: str | None = None):
     if name is not None:
         project_names = [p for p in project_names if name in p]
 
-    return [VideoProjectSetup.load(n).to_dict() for n in project_names]
+    return [get_project_repository().get_setup(n).to_dict() for n in project_names]
 
 
 @router.post("/{project_name}/media")
-async def import_media(project_name: str, files: list[UploadFile]):
-    project_setup: VideoProjectSetup = VideoProjectSetup.load(project_name)
+async def import_media(project_name: str, files: list[UploadFile], background_tasks: BackgroundTasks):
+    project_setup: VideoProjectSetup = get_project_repository().get_setup(project_name)
+    written_paths: list[str] = []
 
     for media_file in files:
         file_name = str(uuid.uuid4()) + Path(media_file.filename).suffix
@@ -61,44 +76,85 @@ async def import_media(project_name: str, files: list[UploadFile]):
         finally:
             await media_file.close()
 
+        written_paths.append(str(write_file_path))
+
+    # runs in a thread after response is sent, renders use originals until proxies are recorded in setup
+    background_tasks.add_task(generate_source_proxies, project_name, written_paths)
+
 
 @router.get("/{project_name}/media")
 async def get_project_media_info(project_name: str):
-    project_setup: VideoProjectSetup = VideoProjectSetup.load(project_name)
+    project_setup: VideoProjectSetup = get_project_repository().get_setup(project_name)
     files = project_setup.videos_path_list + [project_setup.audio_path]
     file_names = [f for f in files if f != "" and f != None]
     return file_names
 
 
-@router.post("/{project_name}/render")
-async def render_project(project_name: str, debug: bool = False):
-    project_setup: VideoProjectSetup = VideoProjectSetup.load(project_name)
-
-    timeline_config = TimelineConfig.load(project_setup.timeline_path)
-    project = VideoProject(project_setup=project_setup)
-    clip_builder = project.get_clip_builder()
+@router.post("/{project_name}/render/jobs")
+async def submit_render_job(
+    project_name: str,
+    debug: bool = False,
+    workers: int = 1,
+    backend: RenderBackend = "moviepy",
+    streaming: bool = False,
+):
+    request = RenderJobRequest(
+        project_name=project_name, debug=debug, workers=workers, backend=backend, streaming=streaming
+    )
+    return submit_job_or_raise(request).to_dict()
 
-    clip_builder.set_debug(debug)
 
-    clip_path = await clip_builder.build_clip(timeline_config)
+@router.post("/{project_name}/segment/{segment_id}/render/preview/jobs")
+async def submit_preview_job(project_name: str, segment_id: str, debug: bool = False, offset: float = 0.0):
+    request = RenderJobRequest(
+        project_name=project_name, kind="preview", debug=debug, segment_id=segment_id, offset=offset
+    )
+    return submit_job_or_raise(request).to_dict()
 
-    output_clip_path = project.save_clip_with_audio(clip_path=clip_path)
 
-    return output_clip_path
+@router.post("/{project_name}/render")
+async def render_project(
+    project_name: str,
+    debug: bool = False,
+    workers: int = 1,
+    backend: RenderBackend = "moviepy",
+    streaming: bool = False,
+):
+    # web client expects the output path, the render itself runs as a job outside the event loop
+    request = RenderJobRequest(
+        project_name=project_name, debug=debug, workers=workers, backend=backend, streaming=streaming
+    )
+    return await wait_for_job_output(submit_job_or_raise(request))
 
 
 @router.post("/{project_name}/segment/{segment_id}/render/preview")
-async def render_project(project_name: str, segment_id: str, debug: bool = False):
-    project_setup: VideoProjectSetup = VideoProjectSetup.load(project_name)
+async def render_segment_preview(project_name: str, segment_id: str, debug: bool = False, offset: float = 0.0):
+    request = RenderJobRequest(
+        project_name=project_name, kind="preview", debug=debug, segment_id=segment_id, offset=offset
+    )
+
+    try:
+        cached_preview_path = await asyncio.to_thread(get_cached_preview, request)
+    except SegmentNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if cached_preview_path is not None:
+        return cached_preview_path
+
+    return await wait_for_job_output(submit_job_or_raise(request))
+
 
-    timeline_config: TimelineConfig = TimelineConfig.load(project_setup.timeline_path)
-    project = VideoProject(project_setup=project_setup)
-    clip_builder = project.get_clip_builder()
+def submit_job_or_raise(request: RenderJobRequest) -> RenderJob:
+    try:
+        return get_render_job_manager().submit(request)
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
 
-    clip_builder.set_debug(debug)
 
-    single_segment_timeline_config = timeline_config.copy_to_single_segment_timeline(segment_id)
+async def wait_for_job_output(job: RenderJob) -> str:
+    job = await get_render_job_manager().wait(job)
 
-    clip_path = await clip_builder.build_clip(single_segment_timeline_config)
+    if job.status != "done":
+        raise HTTPException(status_code=500, detail=f"Render job {job.id} {job.status}: {job.error}")
 
-    return clip_path
+    return job.output_path
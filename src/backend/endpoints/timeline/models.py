@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+
+
+class SegmentPatchRequest(BaseModel):
+    # version the change was made for, omitted version skips the conflict check
+    version: int | None = None
+    fields: dict
+
+
+class SegmentEffectsRequest(BaseModel):
+    version: int | None = None
+    effects: list[dict]
+
+
+class SegmentVideosRequest(BaseModel):
+    version: int | None = None
+    videos: list[dict]
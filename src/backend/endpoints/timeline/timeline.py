@@ -1,8 +1,16 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
 import os
 
-from backend.clip_builder.timeline_config import TimelineConfig
+from backend.clip_builder.project_repository import get_project_repository
+from backend.clip_builder.timeline_config import (
+    SegmentNotFound,
+    TimelineConfig,
+    TimelinePatchError,
+    TimelineVersionConflict,
+)
 from backend.clip_builder.video_project import VideoProject, VideoProjectSetup
+from backend.endpoints.timeline.models import SegmentEffectsRequest, SegmentPatchRequest, SegmentVideosRequest
 
 router = APIRouter(prefix="/api/{project_name}/timeline", tags=["timeline"])
 
@@ -11,9 +19,9 @@ router = APIRouter(prefix="/api/{project_name}/timeline", tags=["timeline"])
 async def get_timeline(project_name: str):
     raise_error_if_project_does_not_exists(project_name)
 
-    project_setup: VideoProjectSetup = VideoProjectSetup.load(project_name)
+    project_setup: VideoProjectSetup = get_project_repository().get_setup(project_name)
     if os.path.exists(project_setup.timeline_path):
-        timeline: TimelineConfig = TimelineConfig.load(project_setup.timeline_path)
+        timeline: TimelineConfig = get_project_repository().get_timeline(project_setup.timeline_path)
         return timeline.to_dict()
 
     raise HTTPException(status_code=404, detail=f"Timeline for {project_name} does not exists")
@@ -23,11 +31,11 @@ async def get_timeline(project_name: str):
 async def create_timeline(project_name: str):
     raise_error_if_project_does_not_exists(project_name)
 
-    project_setup: VideoProjectSetup = VideoProjectSetup.load(project_name)
+    project_setup: VideoProjectSetup = get_project_repository().get_setup(project_name)
     project = VideoProject(project_setup=project_setup)
 
     timeline = project.analyze_source_and_generate_timeline()
-    timeline.save(project_setup.timeline_path)
+    get_project_repository().save_timeline(project_setup.timeline_path, timeline)
     return timeline.to_dict()
 
 
@@ -35,14 +43,79 @@ async def create_timeline(project_name: str):
 async def upsert_timeline(project_name: str, request: dict):
     raise_error_if_project_does_not_exists(project_name)
 
-    project_setup: VideoProjectSetup = VideoProjectSetup.load(project_name)
+    project_setup: VideoProjectSetup = get_project_repository().get_setup(project_name)
 
     timeline: TimelineConfig = TimelineConfig.from_dict(request)
-    timeline.save(project_setup.timeline_path)
+    get_project_repository().save_timeline(project_setup.timeline_path, timeline)
 
     return timeline.to_dict()
 
 
+@router.patch("/segments/{segment_id}")
+async def patch_segment(project_name: str, segment_id: str, request: SegmentPatchRequest):
+    return patch_segment_fields(project_name, segment_id, request.fields, request.version)
+
+
+@router.put("/segments/{segment_id}/effects")
+async def set_segment_effects(project_name: str, segment_id: str, request: SegmentEffectsRequest):
+    return patch_segment_fields(project_name, segment_id, {"effects": request.effects}, request.version)
+
+
+@router.put("/segments/{segment_id}/videos")
+async def set_segment_videos(project_name: str, segment_id: str, request: SegmentVideosRequest):
+    return patch_segment_fields(project_name, segment_id, {"videos": request.videos}, request.version)
+
+
+@router.get("/yaml")
+async def export_timeline_yaml(project_name: str):
+    raise_error_if_project_does_not_exists(project_name)
+
+    project_setup: VideoProjectSetup = get_project_repository().get_setup(project_name)
+    if not os.path.exists(project_setup.timeline_path):
+        raise HTTPException(status_code=404, detail=f"Timeline for {project_name} does not exists")
+
+    timeline: TimelineConfig = get_project_repository().get_timeline(project_setup.timeline_path)
+    return Response(
+        content=timeline.to_yaml(),
+        media_type="application/yaml",
+        headers={"Content-Disposition": f'attachment; filename="{project_name}-timeline.yaml"'},
+    )
+
+
+@router.post("/yaml")
+async def import_timeline_yaml(project_name: str, request: Request):
+    raise_error_if_project_does_not_exists(project_name)
+
+    project_setup: VideoProjectSetup = get_project_repository().get_setup(project_name)
+
+    timeline: TimelineConfig = TimelineConfig.from_yaml((await request.body()).decode("utf-8"))
+    get_project_repository().save_timeline(project_setup.timeline_path, timeline)
+
+    return timeline.to_dict()
+
+
+def patch_segment_fields(project_name: str, segment_id: str, fields: dict, version: int | None) -> dict:
+    """Only the changed segment is returned with the new timeline version, clients keep the rest as is"""
+    raise_error_if_project_does_not_exists(project_name)
+
+    project_setup: VideoProjectSetup = get_project_repository().get_setup(project_name)
+    if not os.path.exists(project_setup.timeline_path):
+        raise HTTPException(status_code=404, detail=f"Timeline for {project_name} does not exists")
+
+    try:
+        timeline, segment = get_project_repository().patch_segment(
+            project_setup.timeline_path, segment_id, fields, expected_version=version
+        )
+    except SegmentNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TimelinePatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TimelineVersionConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {"version": timeline.version, "segment": segment.to_dict()}
+
+
 def raise_error_if_project_does_not_exists(project_name):
     project_path = VideoProjectSetup.get_setup_config_path(project_name)
 
@@ -1,11 +1,23 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from .clip_builder.render_jobs import get_render_job_manager
 from .endpoints.timeline import timeline
 from .endpoints.project import project_endpoints
 from .endpoints.media import media_endpoints
+from .endpoints.jobs import job_endpoints
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # running renders are cancelled at their next segment
+    await get_render_job_manager().shutdown()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],
@@ -16,6 +28,7 @@ app.add_middleware(
 app.include_router(timeline.router)
 app.include_router(project_endpoints.router)
 app.include_router(media_endpoints.router)
+app.include_router(job_endpoints.router)
 
 
 @app.get("/health")
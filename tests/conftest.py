@@ -0,0 +1,33 @@
+import pathlib
+import sys
+
+import pytest
+
+# server modules import each other as backend.*, as when the server is started from src
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+VIDEO_FPS = 25
+VIDEO_FRAMES = 150
+
+
+@pytest.fixture(scope="session")
+def video_path(tmp_path_factory):
+    """Real encoded clip where every frame differs: moving bar over noise blocks which change with the frame index"""
+    np = pytest.importorskip("numpy")
+    cv2 = pytest.importorskip("cv2")
+
+    path = str(tmp_path_factory.mktemp("video") / "clip.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), VIDEO_FPS, (320, 240))
+
+    if not writer.isOpened():
+        pytest.skip("mp4v encoder is not available")
+
+    rng = np.random.default_rng(0)
+    for i in range(VIDEO_FRAMES):
+        blocks = rng.integers(0, 256, (24, 32, 3), dtype=np.uint8)
+        frame = cv2.resize(blocks, (320, 240), interpolation=cv2.INTER_NEAREST)
+        cv2.rectangle(frame, ((i * 7) % 320, 0), ((i * 7) % 320 + 20, 240), (255, 255, 255), -1)
+        writer.write(frame)
+
+    writer.release()
+    return path
@@ -0,0 +1,53 @@
+import shutil
+
+import pytest
+
+np = pytest.importorskip("numpy")
+librosa = pytest.importorskip("librosa")
+soundfile = pytest.importorskip("soundfile")
+
+from src.backend.clip_builder.data_analysis.audio_analyzer import (
+    FfmpegAudioStream,
+    extract_audio_features,
+    extract_audio_features_streaming,
+)
+
+SAMPLE_RATE = 22050
+
+
+@pytest.fixture
+def audio_path(tmp_path):
+    # tone with a loudness ramp and clicks, long enough for many small blocks
+    rng = np.random.default_rng(0)
+    t = np.arange(int(SAMPLE_RATE * 3.3)) / SAMPLE_RATE
+    y = 0.3 * np.sin(2 * np.pi * 440 * t) * np.linspace(0.1, 1, len(t)) + 0.01 * rng.standard_normal(len(t))
+    y[:: SAMPLE_RATE // 4] += 0.5
+
+    path = tmp_path / "track.wav"
+    soundfile.write(path, y.astype(np.float32), SAMPLE_RATE)
+    return str(path)
+
+
+def test_streaming_rms_matches_in_memory_rms(audio_path):
+    in_memory = extract_audio_features(audio_path, hop_length=512, n_mfcc=5)
+    streaming = extract_audio_features_streaming(audio_path, hop_length=512, n_mfcc=5, block_length=16)
+
+    assert streaming.sample_rate == in_memory.sample_rate
+    assert streaming.duration == pytest.approx(in_memory.duration)
+    assert streaming.rms.shape == in_memory.rms.shape
+    assert streaming.onset_env.shape == in_memory.onset_env.shape
+    assert streaming.mfcc.shape == in_memory.mfcc.shape
+    np.testing.assert_allclose(streaming.rms, in_memory.rms, rtol=1e-4, atol=1e-6)
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_ffmpeg_stream_blocks_match_librosa_stream(audio_path):
+    expected = list(librosa.stream(audio_path, block_length=16, frame_length=2048, hop_length=512, fill_value=0))
+    stream = FfmpegAudioStream(audio_path, sample_rate=SAMPLE_RATE, block_length=16, frame_length=2048, hop_length=512)
+    blocks = list(stream)
+
+    assert stream.n_samples == soundfile.info(audio_path).frames
+    assert len(blocks) == len(expected)
+
+    for block, expected_block in zip(blocks, expected):
+        np.testing.assert_allclose(block, expected_block, atol=1e-6)
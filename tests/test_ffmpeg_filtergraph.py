@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("moviepy")
+pytest.importorskip("cv2")
+
+from src.backend.clip_builder import video_clip_builder
+from src.backend.clip_builder.effects_descriptor import EffectArgs, EffectMethod, EffectType
+from src.backend.clip_builder.ffmpeg_filtergraph import FilterGraphUnsupported, compile_segment_filtergraph
+from src.backend.clip_builder.segment_cache import SegmentCache
+from src.backend.clip_builder.timeline_config import TimelineSegmentConfig, VideoItem, VideoSegmentEffect
+from src.backend.clip_builder.video_clip_builder import VideoClipBuilder
+from src.backend.clip_builder.video_resolution import VideoResolution
+
+PREVIEW_SCALE = "scale=w='trunc(iw/20)*2':h='trunc(ih/20)*2'"
+
+
+def make_segment(effects=None, videos_count: int = 1, is_split_screen: bool = False) -> TimelineSegmentConfig:
+    return TimelineSegmentConfig(
+        id="segment",
+        index=0,
+        effects=effects or [],
+        duration=1.0,
+        videos=[VideoItem(id=f"video-{i}", path=f"source-{i}.mp4", start_time=2.0) for i in range(videos_count)],
+        is_split_screen=is_split_screen,
+        start_time=0.0,
+        end_time=1.0,
+        etag="etag",
+        start_frame=0,
+        end_frame=25,
+        duration_frame=25,
+    )
+
+
+def fit() -> VideoSegmentEffect:
+    return VideoSegmentEffect(
+        id="fit",
+        effect_type=EffectType.CROP,
+        method=EffectMethod.FIT_VIDEO_INTO_FRAME_SIZE,
+        args=EffectArgs.CROP.FIT_VIDEO_INTO_FRAME_SIZE(),
+    )
+
+
+def line_crop() -> VideoSegmentEffect:
+    return VideoSegmentEffect(
+        id="line_crop",
+        effect_type=EffectType.CROP,
+        method=EffectMethod.LINE_CROP,
+        args=EffectArgs.CROP.LINE_CROP(line_number=2, total_lines=4, is_vertical=True),
+    )
+
+
+def compile_graph(segment: TimelineSegmentConfig, effects=None, **kwargs):
+    return compile_segment_filtergraph(segment, effects or [], fps=25, resolution=VideoResolution((640, 360)), **kwargs)
+
+
+@pytest.mark.parametrize(
+    "preview, debug, is_preview_proxy, scaled",
+    [
+        (False, False, False, False),
+        (True, False, False, True),
+        (False, True, False, True),
+        (True, False, True, False),
+    ],
+)
+def test_sources_without_preview_proxy_are_downscaled_like_moviepy(preview, debug, is_preview_proxy, scaled):
+    graph = compile_graph(
+        make_segment(),
+        preview=preview,
+        debug=debug,
+        resolve_source=lambda path: (f"proxy/{path}" if is_preview_proxy else path, is_preview_proxy),
+    )
+
+    assert any(PREVIEW_SCALE in f for f in graph.filters) == scaled
+    assert graph.inputs[0].path == ("proxy/source-0.mp4" if is_preview_proxy else "source-0.mp4")
+
+
+def test_line_crop_after_fit_compiles_into_single_graph():
+    graph = compile_graph(make_segment(effects=[line_crop()]), effects=[fit()])
+
+    assert [i.path for i in graph.inputs] == ["source-0.mp4"]
+    assert any("force_original_aspect_ratio=increase,crop=640:360" in f for f in graph.filters)
+    assert any("crop=w=160:h=360:x='trunc(160.000000*1)':y=0" in f for f in graph.filters)
+    assert graph.filters[-1].endswith(f"[{graph.output_label}]")
+
+
+def test_line_crop_of_unknown_frame_size_is_unsupported():
+    with pytest.raises(FilterGraphUnsupported):
+        compile_graph(make_segment(effects=[line_crop()]))
+
+
+def make_builder(tmp_path, monkeypatch) -> tuple[VideoClipBuilder, list[str]]:
+    builder = VideoClipBuilder(
+        fps=25,
+        resolution=VideoResolution((640, 360)),
+        temp_path=str(tmp_path),
+        backend="ffmpeg",
+        segment_cache=SegmentCache(path=str(tmp_path / "cache")),
+    )
+    calls = []
+
+    monkeypatch.setattr(
+        video_clip_builder, "run_segment_filtergraph", lambda graph, path, fps, encoder_params: calls.append("ffmpeg")
+    )
+    monkeypatch.setattr(builder, "compose_segment_clip", lambda segment, effects: calls.append("compose"))
+    monkeypatch.setattr(builder, "write_video_file", lambda clip, path: calls.append("moviepy"))
+
+    return builder, calls
+
+
+def test_ffmpeg_backend_renders_supported_segment_with_filtergraph(tmp_path, monkeypatch):
+    builder, calls = make_builder(tmp_path, monkeypatch)
+
+    result = asyncio.run(builder.write_segment_clip("out.mp4", make_segment(effects=[line_crop()]), [fit()]))
+
+    assert result == (0, "out.mp4")
+    assert calls == ["ffmpeg"]
+
+
+def test_ffmpeg_backend_falls_back_to_moviepy_for_unsupported_segment(tmp_path, monkeypatch):
+    builder, calls = make_builder(tmp_path, monkeypatch)
+
+    result = asyncio.run(builder.write_segment_clip("out.mp4", make_segment(effects=[line_crop()]), []))
+
+    assert result == (0, "out.mp4")
+    assert calls == ["compose", "moviepy"]
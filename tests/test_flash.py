@@ -0,0 +1,51 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("moviepy")
+
+from moviepy import VideoClip
+
+from src.backend.clip_builder.effects.flash import flash_frames
+
+FLASH_COLOR = (255, 200, 0)
+
+
+def make_clip() -> VideoClip:
+    # every 8 bit level appears in every channel
+    frame = np.stack([np.tile(np.arange(256, dtype=np.uint8), (16, 1))] * 3, axis=-1)
+    frame[..., 1] = 255 - frame[..., 1]
+    return VideoClip(frame_function=lambda t: frame.copy(), duration=1.0)
+
+
+def blend_reference(frame: np.ndarray, t: float, flashing_times: list[float], flash_duration: float) -> np.ndarray:
+    for start in flashing_times:
+        if start <= t < start + flash_duration:
+            alpha = (start + flash_duration - t) / flash_duration
+            return frame * (1 - alpha) + np.array(FLASH_COLOR) * alpha
+    return frame.astype(np.float64)
+
+
+@pytest.mark.parametrize("t", [0.0, 0.01, 0.05, 0.1, 0.149, 0.5, 0.51, 0.6])
+def test_flash_blend_matches_float_blend(t):
+    clip = make_clip()
+    flashed = flash_frames(clip, [0.0, 0.5], 0.15, color=FLASH_COLOR)
+
+    frame = flashed.get_frame(t)
+    expected = blend_reference(clip.get_frame(t), t, [0.0, 0.5], 0.15)
+
+    assert frame.dtype == np.uint8
+    assert np.abs(frame.astype(np.float64) - expected).max() <= 2
+
+
+@pytest.mark.parametrize("t", [0.15, 0.3, 0.65, 0.9])
+def test_frames_outside_flash_windows_are_unchanged(t):
+    clip = make_clip()
+    flashed = flash_frames(clip, [0.0, 0.5], 0.15, color=FLASH_COLOR)
+
+    np.testing.assert_array_equal(flashed.get_frame(t), clip.get_frame(t))
+
+
+def test_flash_starts_at_full_color():
+    flashed = flash_frames(make_clip(), [0.0], 0.15, color=FLASH_COLOR)
+
+    assert (flashed.get_frame(0.0) == np.array(FLASH_COLOR, dtype=np.uint8)).all()
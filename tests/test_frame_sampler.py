@@ -0,0 +1,75 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("skimage")
+
+from src.backend.clip_builder.data_analysis.frame_sampler import FrameSampler
+from src.backend.clip_builder.data_analysis.video_analyzer import (
+    SCENE_ANALYSIS_SCALE,
+    analyze_on_static_scenes,
+    collect_scene_metrics,
+    collect_scene_metrics_in_worker,
+    get_shard_ranges,
+    merge_shard_metrics,
+)
+
+
+def read_all_frames(video_path: str) -> list[np.ndarray]:
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+
+    cap.release()
+    return frames
+
+
+@pytest.mark.parametrize("mode", ["grab", "seek"])
+def test_frames_after_seek_are_the_requested_frames(video_path, mode):
+    expected = read_all_frames(video_path)
+    sampler = FrameSampler(video_path, frame_step=7, mode=mode)
+
+    frames = list(sampler.frames(start_frame=61, end_frame=130))
+
+    assert [i for i, _ in frames] == list(range(63, 130, 7))
+    for frame_idx, frame in frames:
+        np.testing.assert_array_equal(frame, expected[frame_idx])
+
+
+@pytest.mark.parametrize("mode", ["grab", "seek"])
+def test_sharded_metrics_match_sequential_metrics(video_path, mode):
+    sampler = FrameSampler(video_path, frame_step=2, scale=SCENE_ANALYSIS_SCALE, mode=mode, default_fps=24)
+    sequential = collect_scene_metrics(sampler)
+
+    shard_ranges = get_shard_ranges(sampler, shards=3, min_shard_duration=1)
+    assert len(shard_ranges) == 3
+
+    sharded = merge_shard_metrics(
+        [
+            collect_scene_metrics_in_worker(video_path, sampler.frame_step, mode, start, end)[0]
+            for start, end in shard_ranges
+        ]
+    )
+
+    np.testing.assert_allclose(sharded.times, sequential.times)
+    np.testing.assert_allclose(sharded.hist_diffs, sequential.hist_diffs)
+    np.testing.assert_allclose(sharded.ssim_diffs, sequential.ssim_diffs)
+    np.testing.assert_allclose(sharded.edge_diffs, sequential.edge_diffs)
+    np.testing.assert_allclose(sharded.flow_mags, sequential.flow_mags)
+    np.testing.assert_allclose(sharded.brightnesses, sequential.brightnesses)
+
+
+@pytest.mark.parametrize("mode", ["grab", "seek"])
+def test_sharded_static_scenes_match_sequential_scenes(video_path, mode):
+    sequential = analyze_on_static_scenes(video_path, sampling=mode, scene_duration_threshold=0.5)
+    sharded = analyze_on_static_scenes(
+        video_path, sampling=mode, scene_duration_threshold=0.5, shards=3, min_shard_duration=1
+    )
+
+    assert [s.to_json() for s in sharded.scenes] == [s.to_json() for s in sequential.scenes]
+    assert sharded.sampling.frames_analyzed == sequential.sampling.frames_analyzed + 2
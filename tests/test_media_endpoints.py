@@ -0,0 +1,105 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.endpoints.media import media_endpoints
+
+CONTENT = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(media_endpoints.router)
+    return TestClient(app)
+
+
+@pytest.fixture
+def media_path(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(CONTENT)
+    return str(path)
+
+
+def get(client, media_path, headers=None):
+    return client.get("/api/media/", params={"file_path": media_path}, headers=headers or {})
+
+
+def test_whole_file_with_validators(client, media_path):
+    response = get(client, media_path)
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"].startswith('"')
+    assert response.headers["cache-control"] == "no-cache"
+
+
+@pytest.mark.parametrize(
+    "range_header, start, end",
+    [
+        ("bytes=0-9", 0, 9),
+        ("bytes=1000-", 1000, 1023),
+        ("bytes=-24", 1000, 1023),
+        ("bytes=1020-5000", 1020, 1023),
+    ],
+)
+def test_single_range(client, media_path, range_header, start, end):
+    response = get(client, media_path, {"Range": range_header})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[start : end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert response.headers["content-length"] == str(end - start + 1)
+
+
+@pytest.mark.parametrize("range_header", ["bytes=1024-", "bytes=-0", "bytes=10-5"])
+def test_unsatisfiable_range(client, media_path, range_header):
+    response = get(client, media_path, {"Range": range_header})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_multiple_ranges_and_stale_if_range_serve_whole_file(client, media_path):
+    assert get(client, media_path, {"Range": "bytes=0-1,5-6"}).status_code == 200
+    assert get(client, media_path, {"Range": "bytes=0-1", "If-Range": '"stale"'}).status_code == 200
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", 'W/{etag}', '"other", {etag}', "*"])
+def test_if_none_match_returns_not_modified(client, media_path, if_none_match):
+    etag = get(client, media_path).headers["etag"]
+
+    response = get(client, media_path, {"If-None-Match": if_none_match.format(etag=etag)})
+
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_changed_file_does_not_match_old_etag(client, media_path):
+    etag = get(client, media_path).headers["etag"]
+
+    with open(media_path, "ab") as f:
+        f.write(b"more")
+
+    assert get(client, media_path, {"If-None-Match": etag}).status_code == 200
+
+
+def test_if_modified_since(client, media_path):
+    last_modified = get(client, media_path).headers["last-modified"]
+
+    assert get(client, media_path, {"If-Modified-Since": last_modified}).status_code == 304
+    assert get(client, media_path, {"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"}).status_code == 200
+
+
+def test_segment_cache_files_are_immutable(tmp_path, monkeypatch):
+    monkeypatch.setattr(media_endpoints, "IMMUTABLE_MEDIA_DIRS", [str(tmp_path / "segments")])
+
+    assert media_endpoints.get_cache_control(str(tmp_path / "segments" / "key.mp4")) == (
+        "public, max-age=31536000, immutable"
+    )
+    assert media_endpoints.get_cache_control(str(tmp_path / "source.mp4")) == "no-cache"
@@ -0,0 +1,174 @@
+from concurrent.futures import Future
+import threading
+
+import pytest
+
+pytest.importorskip("moviepy")
+
+from src.backend.clip_builder.render_events import RenderCancelled, RenderEvent
+from src.backend.clip_builder.render_jobs import RenderJob, RenderJobManager, RenderJobRequest, RenderQueueFull
+
+
+class RecordingRenderJobManager(RenderJobManager):
+    """Dispatch logic of RenderJobManager without worker processes, started jobs only get a cancel event"""
+
+    def start(self):
+        pass
+
+    def run(self, job: RenderJob):
+        job.status = "running"
+        self.running.add(job.id)
+        self.cancel_events[job.id] = threading.Event()
+        self.futures[job.id] = Future()
+
+
+def render(project_name: str = "project", kind: str = "render") -> RenderJobRequest:
+    return RenderJobRequest(project_name=project_name, kind=kind, segment_id="segment" if kind == "preview" else None)
+
+
+def complete(manager: RenderJobManager, job: RenderJob, result: str | None = None, error: Exception | None = None):
+    if error is None:
+        manager.futures[job.id].set_result(result)
+    else:
+        manager.futures[job.id].set_exception(error)
+
+    manager.complete(job)
+
+
+def test_jobs_run_up_to_max_processes():
+    manager = RecordingRenderJobManager(max_processes=2)
+
+    jobs = [manager.submit(render(f"project-{i}")) for i in range(3)]
+
+    assert [j.status for j in jobs] == ["running", "running", "queued"]
+
+    complete(manager, jobs[0], result="output.mp4")
+
+    assert jobs[0].status == "done"
+    assert jobs[0].output_path == "output.mp4"
+    assert jobs[2].status == "running"
+
+
+def test_renders_of_one_project_run_one_at_a_time_and_previews_are_not_limited():
+    manager = RecordingRenderJobManager(max_processes=4, max_jobs_per_project=1)
+
+    first = manager.submit(render())
+    second = manager.submit(render())
+    preview = manager.submit(render(kind="preview"))
+    other_project = manager.submit(render("other"))
+
+    assert first.status == "running"
+    assert second.status == "queued"
+    assert preview.status == "running"
+    assert other_project.status == "running"
+
+    complete(manager, first, result="output.mp4")
+
+    assert second.status == "running"
+
+
+def test_submit_raises_when_queue_is_full():
+    manager = RecordingRenderJobManager(max_processes=1, max_queued=1)
+
+    manager.submit(render("a"))
+    manager.submit(render("b"))
+
+    with pytest.raises(RenderQueueFull):
+        manager.submit(render("c"))
+
+
+def test_cancel_queued_job_finishes_it_at_once():
+    manager = RecordingRenderJobManager(max_processes=1)
+    manager.submit(render("a"))
+    queued = manager.submit(render("b"))
+
+    manager.cancel(queued.id)
+
+    assert queued.status == "cancelled"
+    assert queued.done.is_set()
+    assert queued not in manager.queued
+
+
+def test_cancel_running_job_signals_worker_and_finishes_on_render_cancelled():
+    manager = RecordingRenderJobManager(max_processes=1)
+    job = manager.submit(render())
+    cancel_event = manager.cancel_events[job.id]
+
+    manager.cancel(job.id)
+
+    assert cancel_event.is_set()
+    assert job.cancel_requested
+    assert job.status == "running"
+
+    complete(manager, job, error=RenderCancelled("cancelled"))
+
+    assert job.status == "cancelled"
+
+
+def test_failed_job_keeps_error():
+    manager = RecordingRenderJobManager(max_processes=1)
+    job = manager.submit(render())
+
+    complete(manager, job, error=RuntimeError("broken"))
+
+    assert job.status == "failed"
+    assert "broken" in job.error
+
+
+def test_progress_follows_segments_actually_started():
+    job = RenderJob(id="job", request=render())
+    queue = job.subscribe()
+
+    job.apply_event(RenderEvent(type="render_started", segments_total=3, frames=75))
+    job.apply_event(RenderEvent(type="segment_finished", segment_index=0, frames=25, cache_hit=True))
+    job.apply_event(RenderEvent(type="segment_started", segment_index=2))
+
+    assert job.segments_running == {2}
+    assert job.segments_done == 1
+    assert job.frames_done == 25
+    assert job.frames_rendered == 0
+
+    job.apply_event(RenderEvent(type="segment_finished", segment_index=2, frames=25, elapsed=1.0))
+
+    assert job.segments_running == set()
+    assert job.segments_done == 2
+    assert job.frames_rendered == 25
+
+    messages = [queue.get_nowait() for _ in range(queue.qsize())]
+
+    assert [m["type"] for m in messages] == [
+        "job_status",
+        "render_started",
+        "segment_finished",
+        "segment_started",
+        "segment_finished",
+    ]
+    assert messages[3]["segments_running"] == [2]
+    assert messages[4]["segment_fps"] == 25.0
+
+
+def test_finished_jobs_above_cap_are_dropped():
+    manager = RecordingRenderJobManager(max_processes=1, max_finished_jobs=2)
+    jobs = []
+
+    for i in range(3):
+        job = manager.submit(render())
+        complete(manager, job, result=f"output-{i}.mp4")
+        jobs.append(job)
+
+    assert manager.get(jobs[0].id) is None
+    assert manager.get(jobs[1].id) is jobs[1]
+    assert manager.get(jobs[2].id) is jobs[2]
+
+
+def test_finished_jobs_are_dropped_after_ttl():
+    manager = RecordingRenderJobManager(max_processes=1, finished_job_ttl=60)
+    old = manager.submit(render())
+    complete(manager, old, result="old.mp4")
+    old.finished_at -= 120
+
+    new = manager.submit(render())
+    complete(manager, new, result="new.mp4")
+
+    assert manager.get(old.id) is None
+    assert manager.get(new.id) is new
@@ -0,0 +1,186 @@
+from dataclasses import replace
+import json
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+from src.backend.clip_builder.effects_descriptor import EffectArgs, EffectMethod, EffectType
+from src.backend.clip_builder.segment_cache import SegmentCache, get_segment_cache_key
+from src.backend.clip_builder.timeline_config import TimelineSegmentConfig, VideoItem, VideoSegmentEffect
+
+ROOT_PATH = pathlib.Path(__file__).resolve().parent.parent
+
+
+def zoom_bump(zoom_factor: float = 1.2, effect_id: str = "effect") -> VideoSegmentEffect:
+    return VideoSegmentEffect(
+        id=effect_id,
+        effect_type=EffectType.ZOOM,
+        method=EffectMethod.ZOOM_BUMP,
+        args=EffectArgs.ZOOM.ZOOM_BUMP(zoom_factor=zoom_factor, bump_count=2),
+    )
+
+
+@pytest.fixture
+def sources(tmp_path):
+    paths = []
+    for name in ["a.mp4", "b.mp4"]:
+        path = tmp_path / name
+        path.write_bytes(name.encode())
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def segment(sources) -> TimelineSegmentConfig:
+    return TimelineSegmentConfig(
+        id="segment",
+        index=3,
+        effects=[zoom_bump()],
+        duration=1.0,
+        videos=[VideoItem(id="video", path=sources[0], start_time=2.0)],
+        is_split_screen=False,
+        start_time=10.0,
+        end_time=11.0,
+        etag="etag",
+        start_frame=250,
+        end_frame=275,
+        duration_frame=25,
+    )
+
+
+def get_key(segment: TimelineSegmentConfig, **kwargs) -> str:
+    args = {"global_effects": [], "fps": 25, "size": (1280, 720), "debug": False, **kwargs}
+    return get_segment_cache_key(segment, **args)
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda s, sources: (replace(s, videos=[replace(s.videos[0], path=sources[1])]), {}),
+        lambda s, sources: (replace(s, videos=[replace(s.videos[0], start_time=2.04)]), {}),
+        lambda s, sources: (replace(s, videos=s.videos * 2), {}),
+        lambda s, sources: (replace(s, is_split_screen=True), {}),
+        lambda s, sources: (replace(s, duration=1.2), {}),
+        lambda s, sources: (replace(s, duration_frame=30), {}),
+        lambda s, sources: (replace(s, effects=[]), {}),
+        lambda s, sources: (replace(s, effects=[zoom_bump(zoom_factor=1.3)]), {}),
+        lambda s, sources: (s, {"global_effects": [zoom_bump()]}),
+        lambda s, sources: (s, {"fps": 30}),
+        lambda s, sources: (s, {"size": (720, 1280)}),
+        lambda s, sources: (s, {"debug": True}),
+        lambda s, sources: (s, {"preview": True}),
+        lambda s, sources: (s, {"backend": "ffmpeg"}),
+        lambda s, sources: (s, {"resolve_source": lambda path: (sources[1], True)}),
+    ],
+)
+def test_render_relevant_change_changes_key(segment, sources, change):
+    changed_segment, kwargs = change(segment, sources)
+
+    assert get_key(changed_segment, **kwargs) != get_key(segment)
+
+
+def test_replaced_source_file_changes_key(segment, sources):
+    key = get_key(segment)
+
+    with open(sources[0], "ab") as f:
+        f.write(b"new content")
+
+    assert get_key(segment) != key
+
+
+def test_ids_etag_and_timeline_position_do_not_change_key(segment):
+    moved = replace(
+        segment,
+        id="other",
+        index=7,
+        etag="other",
+        start_time=20.0,
+        end_time=21.0,
+        start_frame=500,
+        end_frame=525,
+        effects=[zoom_bump(effect_id="other")],
+        videos=[replace(segment.videos[0], id="other")],
+    )
+
+    assert get_key(moved) == get_key(segment)
+
+
+def test_start_frame_changes_key_in_debug_mode(segment):
+    assert get_key(replace(segment, start_frame=500), debug=True) != get_key(segment, debug=True)
+
+
+def test_key_is_the_same_in_another_process(segment):
+    script = (
+        "import json, sys\n"
+        "from src.backend.clip_builder.segment_cache import get_segment_cache_key\n"
+        "from src.backend.clip_builder.timeline_config import TimelineSegmentConfig\n"
+        "value = json.loads(sys.argv[1])\n"
+        "segment = TimelineSegmentConfig.from_dict(value['segment'], index=value['index'])\n"
+        "print(get_segment_cache_key(segment, [], fps=25, size=(1280, 720), debug=False))\n"
+    )
+    argument = json.dumps({"segment": segment.to_dict(), "index": segment.index})
+
+    output = subprocess.run(
+        [sys.executable, "-c", script, argument],
+        cwd=ROOT_PATH,
+        env={**os.environ, "PYTHONHASHSEED": "random"},
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+    assert output.strip() == get_key(segment)
+
+
+def write_entry(cache: SegmentCache, key: str, size: int, accessed_at: int) -> str:
+    write_path = cache.get_write_path(key)
+    pathlib.Path(write_path).write_bytes(b"x" * size)
+    cache_path = cache.put(key, write_path)
+    os.utime(cache_path, ns=(accessed_at * 10**9, accessed_at * 10**9))
+    return cache_path
+
+
+def test_evict_removes_least_recently_used_entries_over_budget(tmp_path):
+    cache = SegmentCache(path=str(tmp_path), max_size_bytes=250)
+    oldest = write_entry(cache, "oldest", 100, accessed_at=1)
+    older = write_entry(cache, "older", 100, accessed_at=2)
+    newest = write_entry(cache, "newest", 100, accessed_at=3)
+
+    cache.evict()
+
+    assert not os.path.exists(oldest)
+    assert os.path.exists(older)
+    assert os.path.exists(newest)
+    assert cache.evictions == 1
+
+
+def test_evict_keeps_protected_and_recently_hit_entries(tmp_path):
+    cache = SegmentCache(path=str(tmp_path), max_size_bytes=200)
+    protected = write_entry(cache, "protected", 100, accessed_at=1)
+    hit = write_entry(cache, "hit", 100, accessed_at=2)
+    other = write_entry(cache, "other", 100, accessed_at=3)
+
+    # a hit bumps the access time
+    assert cache.get("hit") == hit
+
+    cache.evict(protected={protected})
+
+    assert os.path.exists(protected)
+    assert os.path.exists(hit)
+    assert not os.path.exists(other)
+
+
+def test_evict_skips_partial_files_and_discard_removes_them(tmp_path):
+    cache = SegmentCache(path=str(tmp_path), max_size_bytes=0)
+    write_path = cache.get_write_path("key")
+    pathlib.Path(write_path).write_bytes(b"x" * 100)
+
+    cache.evict()
+    assert os.path.exists(write_path)
+
+    cache.discard(write_path)
+    assert not os.path.exists(write_path)
+    assert cache.get("key") is None
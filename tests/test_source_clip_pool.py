@@ -0,0 +1,55 @@
+import pytest
+
+pytest.importorskip("moviepy")
+
+from src.backend.clip_builder.source_clip_pool import SourceClipPool
+
+
+class OpenedClip:
+    def __init__(self, path: str):
+        self.path = path
+        self.position = 0.0
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_cells_of_one_segment_read_same_source_through_separate_readers():
+    pool = SourceClipPool()
+
+    # split screen cells of one segment, same source at different offsets
+    first_cell = pool.get(("a.mp4", False), lambda: OpenedClip("a.mp4"))
+    second_cell = pool.get(("a.mp4", False), lambda: OpenedClip("a.mp4"))
+
+    first_cell.position = 1.0
+    second_cell.position = 30.0
+
+    assert first_cell is not second_cell
+    assert first_cell.position == 1.0
+    assert pool.opens == 2
+
+
+def test_readers_are_reused_by_next_segment():
+    pool = SourceClipPool()
+
+    first = pool.get(("a.mp4", False), lambda: OpenedClip("a.mp4"))
+    second = pool.get(("a.mp4", False), lambda: OpenedClip("a.mp4"))
+    pool.release()
+
+    assert pool.get(("a.mp4", False), lambda: OpenedClip("a.mp4")) is first
+    assert pool.get(("a.mp4", False), lambda: OpenedClip("a.mp4")) is second
+    assert pool.opens == 2
+    assert pool.reuses == 2
+
+
+def test_trim_closes_least_recently_used_readers():
+    pool = SourceClipPool(max_size=2)
+
+    old = pool.get(("a.mp4", False), lambda: OpenedClip("a.mp4"))
+    pool.get(("b.mp4", False), lambda: OpenedClip("b.mp4"))
+    pool.get(("b.mp4", False), lambda: OpenedClip("b.mp4"))
+    pool.trim()
+
+    assert old.closed
+    assert pool.size == 2
@@ -0,0 +1,108 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("moviepy")
+
+from moviepy import VideoClip
+
+from src.backend.clip_builder.effects.split_screen import SplitScreenCriteria, get_cell_geometry, split_screen_clips
+
+
+class CountingClip:
+    """Stand-in for a source clip which counts decoded frames"""
+
+    def __init__(self, frame: np.ndarray, duration: float = 1.0):
+        self.frame = frame
+        self.size = (frame.shape[1], frame.shape[0])
+        self.duration = duration
+        self.frames_decoded = 0
+
+    def get_frame(self, t):
+        self.frames_decoded += 1
+        return self.frame
+
+
+def make_source(width: int = 1280, height: int = 720) -> np.ndarray:
+    # horizontal gradient, so crops and mirroring are visible
+    row = np.linspace(0, 255, width).astype(np.uint8)
+    return np.stack([np.tile(row, (height, 1))] * 3, axis=-1)
+
+
+def cover_and_crop_reference(frame: np.ndarray, size: tuple[int, int]) -> np.ndarray:
+    """Scales the whole frame to cover size and crops the center, the way cells were rendered before geometry"""
+    width, height = size
+    source_height, source_width = frame.shape[:2]
+    scale = max(width / source_width, height / source_height)
+    scaled_size = (round(source_width * scale), round(source_height * scale))
+    scaled = cv2.resize(frame, scaled_size, interpolation=cv2.INTER_AREA)
+    x1 = (scaled.shape[1] - width) // 2
+    y1 = (scaled.shape[0] - height) // 2
+    return scaled[y1 : y1 + height, x1 : x1 + width]
+
+
+def test_cell_geometry_crops_source_center_to_cell():
+    geometry = get_cell_geometry(640, 360, clip_size=(1280, 720), position=(1, 1), position_layout=(3, 1))
+
+    assert geometry.source_box == (427, 0, 853, 720)
+    assert geometry.size == (213, 360)
+    assert geometry.position == (0, 0)
+
+
+def test_cell_matches_cover_and_crop_of_whole_frame():
+    source = make_source()
+    clip = CountingClip(source)
+
+    canvas = split_screen_clips(640, 360, [SplitScreenCriteria(clip, position=(2, 1))], position_layout=(3, 1))
+    frame = canvas.get_frame(0)
+
+    expected = cover_and_crop_reference(source, (213, 360))
+
+    assert np.abs(frame[:, 213:426].astype(int) - expected.astype(int)).max() <= 2
+
+
+def test_each_distinct_clip_is_decoded_once_per_frame():
+    first = CountingClip(make_source())
+    second = CountingClip(make_source())
+
+    clip = split_screen_clips(
+        640,
+        360,
+        [SplitScreenCriteria(first), SplitScreenCriteria(first, mirror_x=True), SplitScreenCriteria(second)],
+        position_layout=(3, 1),
+    )
+    clip.get_frame(0)
+    clip.get_frame(0.5)
+
+    assert first.frames_decoded == 2
+    assert second.frames_decoded == 2
+
+
+def test_mirrored_cell_is_flipped_horizontally():
+    clip = CountingClip(make_source())
+
+    frame = split_screen_clips(
+        640, 360, [SplitScreenCriteria(clip), SplitScreenCriteria(clip, mirror_x=True)], position_layout=(2, 1)
+    ).get_frame(0)
+
+    np.testing.assert_array_equal(frame[:, 320:640], frame[:, 0:320][:, ::-1])
+
+
+def test_scaled_cell_is_clipped_to_canvas():
+    clip = CountingClip(make_source())
+
+    frame = split_screen_clips(
+        640, 360, [SplitScreenCriteria(clip, position=(1, 1), scale_factor=1.1)], position_layout=(2, 1)
+    ).get_frame(0)
+
+    assert frame.shape == (360, 640, 3)
+    # the cell overflows left and top edges by 16 and 18 pixels, it covers the canvas up to 320 + 16
+    assert frame[:, :336].min() > 0
+    assert (frame[:, 336:] == 0).all()
+
+
+def test_canvas_is_a_moviepy_clip_of_first_clip_duration():
+    clip = split_screen_clips(640, 360, [SplitScreenCriteria(CountingClip(make_source(), 2.5))], position_layout=(1, 1))
+
+    assert isinstance(clip, VideoClip)
+    assert clip.duration == 2.5
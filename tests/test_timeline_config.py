@@ -0,0 +1,107 @@
+import pytest
+
+from src.backend.clip_builder.timeline_config import TimelineConfig, TimelinePatchError
+
+
+def make_timeline() -> TimelineConfig:
+    return TimelineConfig.from_dict(
+        {
+            "version": 3,
+            "fps": 25,
+            "size": [1280, 720],
+            "duration": 2.0,
+            "effects": [],
+            "segments": [
+                {
+                    "id": f"segment-{i}",
+                    "start_time": float(i),
+                    "end_time": float(i + 1),
+                    "duration": 1.0,
+                    "videos": [{"id": f"video-{i}", "path": f"source-{i}.mp4", "start_time": 0.0}],
+                    "etag": f"etag-{i}",
+                    "duration_frame": 25,
+                }
+                for i in range(2)
+            ],
+        }
+    )
+
+
+def test_patch_segment_returns_patched_copy_and_keeps_timeline(tmp_path):
+    path = str(tmp_path / "timeline.json")
+    timeline = make_timeline()
+    timeline.save(path)
+
+    segments = timeline.segments
+    segment = timeline.segments[1]
+
+    patched_timeline, patched_segment = timeline.patch_segment(path, "segment-1", {"etag": "changed"})
+
+    assert patched_segment.etag == "changed"
+    assert patched_timeline.version == 4
+    assert patched_timeline.get_segment("segment-1") is patched_segment
+    assert patched_timeline.segments[0] is segments[0]
+
+    assert timeline.version == 3
+    assert timeline.segments is segments
+    assert timeline.segments[1] is segment
+    assert segment.etag == "etag-1"
+
+    assert TimelineConfig.load(path) == patched_timeline
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {"effects": [{"id": "effect"}]},
+        {"effects": [{"id": "effect", "effect_type": "unknown", "method": "unknown"}]},
+        {"effects": ["zoom"]},
+        {"videos": [{"id": "video"}]},
+        {"videos": None},
+    ],
+)
+def test_malformed_patch_raises_patch_error_and_writes_nothing(tmp_path, fields):
+    path = str(tmp_path / "timeline.json")
+    timeline = make_timeline()
+    timeline.save(path)
+
+    with pytest.raises(TimelinePatchError):
+        timeline.patch_segment(path, "segment-0", fields)
+
+    assert not (tmp_path / "timeline.changes.jsonl").exists()
+    assert TimelineConfig.load(path) == timeline
+
+
+def test_patch_after_interrupted_write_keeps_every_change(tmp_path):
+    path = str(tmp_path / "timeline.json")
+    timeline = make_timeline()
+    timeline.save(path)
+
+    timeline, _ = timeline.patch_segment(path, "segment-0", {"etag": "first"})
+
+    # interrupted append of the next change
+    with open(tmp_path / "timeline.changes.jsonl", "ab") as f:
+        f.write(b'{"version": 5, "segment_id": "segm')
+
+    timeline, _ = timeline.patch_segment(path, "segment-1", {"etag": "second"})
+
+    loaded = TimelineConfig.load(path)
+
+    assert loaded == timeline
+    assert loaded.get_segment("segment-0").etag == "first"
+    assert loaded.get_segment("segment-1").etag == "second"
+    assert loaded.version == 5
+
+
+def test_replay_skips_undecodable_change_and_applies_later_ones(tmp_path):
+    path = str(tmp_path / "timeline.json")
+    make_timeline().save(path)
+
+    with open(tmp_path / "timeline.changes.jsonl", "wb") as f:
+        f.write(b'{"version": 4, "segment_id": "segm\n')
+        f.write(b'{"version": 5, "segment_id": "segment-1", "fields": {"etag": "after"}}\n')
+
+    loaded = TimelineConfig.load(path)
+
+    assert loaded.get_segment("segment-1").etag == "after"
+    assert loaded.version == 5